@@ -0,0 +1,44 @@
+"""
+Benchmark: cost of adding one line to a figure which already has many lines.
+
+"full" is the previous Window.show path (vstack all lines, renormalize,
+upload everything), "append" is the GrowableBuffer path (copy the new line in
+the reserved capacity and upload it only). No OpenGL needed: the upload cost
+is reported as a number of bytes.
+"""
+import time
+import numpy as np
+from growablebuffer import GrowableBuffer
+
+n = 100000
+nlines = 50
+lines = [np.array(np.vstack((np.arange(n), np.random.randn(n))).T, np.float32)
+         for _ in range(nlines + 1)]
+
+def full(lines):
+    fulldata = np.vstack(lines)
+    x, y = fulldata[:,0], -fulldata[:,1]
+    fulldata[:,0] = (x - x.min()) / (x.max() - x.min())
+    fulldata[:,1] = (y - y.min()) / (y.max() - y.min())
+    return fulldata.nbytes
+
+def append(vertices, line):
+    vertices.append(line)
+    nbytes, uploads = vertices.get_uploads()
+    return sum(data.nbytes for offset, data in uploads)
+
+vertices = GrowableBuffer(2)
+for line in lines[:nlines]:
+    append(vertices, line)
+
+t0 = time.time()
+nbytes_full = full(lines)
+t_full = time.time() - t0
+
+t0 = time.time()
+nbytes_append = append(vertices, lines[nlines])
+t_append = time.time() - t0
+
+print("Adding line %d (%d points each)" % (nlines + 1, n))
+print("  full:   %8.2f ms, %10d bytes uploaded" % (1000 * t_full, nbytes_full))
+print("  append: %8.2f ms, %10d bytes uploaded" % (1000 * t_append, nbytes_append))
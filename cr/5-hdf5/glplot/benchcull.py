@@ -0,0 +1,43 @@
+"""
+Benchmark: number of vertices submitted per frame as a function of the zoom
+level, with and without culling to the visible x range.
+
+Only the CPU side of DataDisplay is used (load, set_view, get_range), no
+OpenGL context is needed. Zooming is centered on the middle of the data.
+"""
+import time
+import numpy as np
+from navigation import Navigation
+from datadisplay import DataDisplay
+
+n = 1000000
+nlines = 8
+x = np.arange(n)
+data = np.vstack([np.array(np.vstack((x, np.random.randn(n))).T, np.float32)
+                  for _ in range(nlines)])
+databounds = [i * n for i in range(nlines + 1)]
+options = [dict(mode="line", lw=1.0, color=(1., 1., 1.))] * nlines
+
+display = DataDisplay()
+display.load(data, databounds, options)
+nav = Navigation()
+
+def frame(cull):
+    display.sx = nav.sx
+    if cull:
+        x0, _ = nav.get_data_coordinates(0., 0.)
+        x1, _ = nav.get_data_coordinates(1., 0.)
+        display.set_view(x0, x1)
+    else:
+        display.view = None
+    t0 = time.time()
+    count = sum(display.get_range(i)[1] for i in range(len(display.levels)))
+    return count, time.time() - t0
+
+print("%d lines of %d points, %d pixels wide" % (nlines, n, display.width))
+print("%8s %14s %14s %10s" % ("zoom", "vertices", "culled", "ms/frame"))
+for zoom in [1, 4, 16, 64, 256, 1024, 4096]:
+    nav.sx = zoom
+    full, _ = frame(False)
+    culled, t = frame(True)
+    print("%8d %14d %14d %10.3f" % (zoom, full, culled, 1000 * t))
@@ -0,0 +1,64 @@
+from growablebuffer import GrowableBuffer
+
+class VertexStore(object):
+    """
+    Vertex data of a DataDisplay (CPU mirror, GPU buffer name, lines and
+    levels of detail), which can be shared by several displays whose GL
+    contexts share their objects.
+    """
+    def __init__(self, ncols=2):
+        # raw (x, y, ...) vertices of all lines, uploaded incrementally
+        self.vertices = GrowableBuffer(ncols)
+        # GPU buffer name, None until generated
+        self.buffer = None
+        self.databounds = [0]
+        self.options = []
+        # per line: list of (first, count) for each level of detail
+        self.levels = []
+        # per line: x span (first x, last x)
+        self.spans = []
+        # per line: SortedIndex of each level, or None if x is not sorted
+        self.indices = []
+        self.databox = None
+        # x of the vertices is relative to origin (float64)
+        self.origin = 0.
+
+class BufferRegistry(object):
+    """
+    Reference-counted registry of the vertex stores shared between windows.
+    """
+    def __init__(self):
+        # key: [store, refcount]
+        self.entries = {}
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def register(self, key, store):
+        if key in self.entries:
+            raise KeyError("A vertex store is already registered as %r" % (key,))
+        self.entries[key] = [store, 1]
+
+    def acquire(self, key):
+        entry = self.entries[key]
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, key):
+        """
+        Drop one reference. Return the store when it is not used anymore (its
+        GPU buffer must then be deleted), None otherwise.
+        """
+        entry = self.entries[key]
+        entry[1] -= 1
+        if entry[1] > 0:
+            return None
+        del self.entries[key]
+        return entry[0]
+
+    def refcount(self, key):
+        if key not in self.entries:
+            return 0
+        return self.entries[key][1]
+
+REGISTRY = BufferRegistry()
@@ -0,0 +1,112 @@
+"""
+Check of the data loading of GLWidgetBuffered, without PyQt4, OpenGL nor
+h5py: these modules are replaced by stubs whose GL functions do nothing, so
+that only the Python side of the widget is exercised.
+
+A 10 channel recording is loaded with load_data, then the view is moved far
+enough for paintGL to load another data buffer:
+
+  load:    the MultiChannelDisplay accepts the origin given by update_data
+           (the x offset of the data buffer)
+  origin:  the vertices are relative to the origin of the display, which
+           follows the data buffer, and their absolute x are the sample times
+  layout:  every channel is one line of the data buffer
+"""
+import sys
+import types
+import numpy as np
+
+
+class Stub(object):
+    """ Stands for any Qt class or object """
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        return Stub()
+
+    def __getattr__(self, name):
+        return Stub()
+
+
+def stub_module(name, **names):
+    module = types.ModuleType(name)
+    module.__dict__.update(names)
+    module.__all__ = list(names)
+    sys.modules[name] = module
+    return module
+
+
+def nothing(*args):
+    return 1
+
+gl = dict((name, nothing) for name in """glBindBuffer glBindTexture
+    glBufferData glBufferSubData glClear glClearColor glColor glDeleteBuffers
+    glDeleteProgram glDisableVertexAttribArray glDrawArrays
+    glEnableClientState glEnableVertexAttribArray glFlush glGenBuffers
+    glGenTextures glGetAttribLocation glGetUniformLocation glLineWidth
+    glLoadIdentity glMatrixMode glMultiDrawArrays glOrtho glPointSize
+    glReadBuffer glScalef glTexImage1D glTexParameteri glTranslatef
+    glUniform1f glUniform1i glUniform2f glUniform4fv glUseProgram
+    glVertexAttribPointer glVertexPointer glViewport""".split())
+gl.update((name, 0) for name in """GL_ARRAY_BUFFER GL_CLAMP_TO_EDGE
+    GL_COLOR_BUFFER_BIT GL_DEPTH_BUFFER_BIT GL_DYNAMIC_DRAW GL_FALSE GL_FLOAT
+    GL_FRAGMENT_SHADER GL_FRONT GL_LINE_STRIP GL_MODELVIEW GL_NEAREST
+    GL_POINTS GL_PROJECTION GL_RGBA GL_TEXTURE_1D GL_TEXTURE_MAG_FILTER
+    GL_TEXTURE_MIN_FILTER GL_TEXTURE_WRAP_S GL_VERTEX_ARRAY
+    GL_VERTEX_SHADER""".split())
+shaders = stub_module("OpenGL.GL.shaders", compileProgram=nothing,
+                      compileShader=nothing)
+gl["shaders"] = shaders
+stub_module("OpenGL")
+stub_module("OpenGL.GL", **gl)
+stub_module("OpenGL.GLU")
+QtCore = stub_module("PyQt4.QtCore", QObject=Stub, QTimer=Stub, QSize=Stub,
+                     pyqtSignal=Stub)
+QtGui = stub_module("PyQt4.QtGui")
+QtOpenGL = stub_module("PyQt4.QtOpenGL", QGLWidget=Stub)
+stub_module("PyQt4", QtCore=QtCore, QtGui=QtGui, QtOpenGL=QtOpenGL)
+stub_module("h5py", Dataset=None)
+
+from glwidgetbuffered import GLWidgetBuffered
+
+freq = 1000.
+channels = 10
+duration = 20.
+samples = int(duration * freq) + 1
+y = np.random.randn(samples, channels).astype(np.float32)
+
+
+def check_display(widget):
+    """ Loaded vertices against the samples of the data buffer """
+    display = widget.dataDisplay
+    x0, x1 = widget.dynamicviewport.databuffer
+    assert display.origin == widget.nav.offsetx == x0
+    i0, i1 = int(round(x0 * freq)), int(round(x1 * freq))
+    n = i1 - i0 + 1
+    assert display.databounds == [c * n for c in range(channels + 1)]
+    vertices = display.vertices.array
+    for c in range(channels):
+        line = vertices[c * n:(c + 1) * n]
+        assert np.allclose(display.origin + line[:,0],
+                           np.arange(i0, i1 + 1) / freq, atol=1e-5)
+        assert (line[:,1] == y[i0:i1 + 1, c]).all()
+        assert (line[:,2] == c).all()
+
+
+widget = GLWidgetBuffered()
+widget.load_data(y, freq)
+widget.initializeGL()
+widget.resizeGL(1000, 600)
+widget.paintGL()
+assert widget.dynamicviewport.databuffer == (0., 3.)
+check_display(widget)
+
+# far from the first data buffer: another one is loaded at paint
+widget.nav.tx = -12.
+widget.paintGL()
+x0, x1 = widget.dynamicviewport.databuffer
+assert x0 > 10.
+check_display(widget)
+
+print("GLWidgetBuffered: ok")
@@ -0,0 +1,44 @@
+"""
+Check of the x precision for long recordings, on the CPU (no OpenGL needed).
+
+A 3 day recording at 20 kHz is browsed with 100 samples on a 1000 pixel wide
+screen, at several time offsets. The error on the screen position of the
+samples (in pixels) is computed for:
+
+  absolute: float32 absolute times, translation in the float32 modelview
+  block:    times relative to the data buffer origin, the translations being
+            summed in float64 (DataDisplay.transform)
+  split:    times relative to the data buffer origin, view origin sent as a
+            (hi, lo) pair (MultiChannelDisplay vertex shader)
+
+The errors are relative to the exact float64 positions. The rounding error
+of the split transform itself (from the float32 relative times) must stay
+below error_bound, and the total error below a hundredth of the distance between two samples.
+"""
+import numpy as np
+from precision import transform_x, transform_x_matrix, error_bound
+
+freq = 20000.
+duration = 3 * 86400.
+width = 1000  # pixels
+nvisible = 100  # samples on screen
+scale = width * freq / nvisible  # pixels per second
+
+print("%12s %14s %14s %14s %14s" % ("time (s)", "absolute (px)", "block (px)",
+                                   "split (px)", "bound (px)"))
+for t in [1., 3600., 86400., duration - 1.]:
+    # samples around t, the data buffer starting 1s before the view
+    i = np.arange(int(t * freq) - nvisible, int(t * freq) + nvisible)
+    times = i / freq
+    origin = t - 1.
+    exact = (times - t) * scale
+    relative = np.array(times - origin, dtype=np.float32)
+    absolute = transform_x_matrix(np.array(times, dtype=np.float32), t, scale)
+    block = transform_x_matrix(relative, t - origin, scale)
+    split = transform_x(relative, t - origin, scale)
+    bound = error_bound(relative, t - origin, scale)
+    errors = [np.abs(x - exact).max() for x in (absolute, block, split)]
+    print("%12.0f %14.4g %14.4g %14.4g %14.4g" % tuple([t] + errors + [bound.max()]))
+    view = np.float64(t - origin)
+    assert (np.abs(split - (relative - view) * scale) <= bound).all()
+    assert errors[2] < .01 * width / nvisible
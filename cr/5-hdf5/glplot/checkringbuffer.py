@@ -0,0 +1,144 @@
+"""
+Check of the RingBuffer indexing and offset math, on the CPU (no OpenGL
+needed).
+
+Blocks of samples are written to a small ring and checked against the list
+of all the samples written so far:
+
+  write:    slot (head - 1 - k) % size holds the k-th newest sample, for
+            wrap-around writes and writes larger than the ring
+  uploads:  the (byte offset, array) regions cover exactly the slots written
+            since the last upload, before and after a wrap, and the seam
+            row whenever slot 0 is sent
+  segments: drawn with their x offsets, the newest sample is at x = size - 1
+            and a sample of age k at x = size - 1 - k, before and after the
+            ring is full; the offsets match the (x - head) % size of the
+            vertex shader and, when wrapped, the seam row mirroring slot 0
+            joins the two laps
+"""
+import numpy as np
+from ringbuffer import RingBuffer
+
+size, channels = 10, 3
+
+
+def block(first, m):
+    """ m samples, sample i of channel c being 100 * i + c """
+    i = np.arange(first, first + m).reshape((-1, 1))
+    return (100 * i + np.arange(channels)).astype(np.float32)
+
+
+def check_contents(ring, samples):
+    """ Newest samples of the ring against all the samples written """
+    assert ring.count == len(samples)
+    for k in range(ring.filled):
+        slot = (ring.head - 1 - k) % size
+        assert (ring.array[slot,:,1] == samples[-1 - k]).all(), (k, slot)
+    # x is never rewritten, the seam row follows slot 0
+    assert (ring.array[:,:,0] == np.arange(size + 1).reshape((-1, 1))).all()
+    assert (ring.array[size,:,1] == ring.array[0,:,1]).all()
+
+
+def check_uploads(ring, expected):
+    """ Upload regions against the expected (start, end) slot regions """
+    rowsize = ring.array.itemsize * 2 * channels
+    nbytes, uploads = ring.get_uploads()
+    assert [(offset, len(array)) for offset, array in uploads] == \
+           [(start * rowsize, end - start) for start, end in expected], uploads
+    for offset, array in uploads:
+        start = offset // rowsize
+        assert (array == ring.array[start:start + len(array)]).all()
+    assert ring.pending == 0
+    return nbytes
+
+
+def check_segments(ring):
+    """ Displayed x of every drawn slot against the age of its sample """
+    drawn = []
+    for first, count, offset in ring.segments():
+        for slot in range(first, first + count):
+            x = ring.array[slot, 0, 0]
+            age = (ring.head - 1 - slot) % size
+            assert x + offset == size - 1 - age, (slot, offset)
+            assert x + offset == (x - ring.head) % size, (slot, offset)
+            drawn.append(slot % size)
+    # the seam repeats the first sample of the current lap, at the end of
+    # the previous one
+    if drawn and ring.segments()[0][0] + ring.segments()[0][1] == size + 1:
+        seam = len(drawn) - ring.head - 1
+        assert drawn[seam] == 0 and ring.segments()[1][0] == 0
+        del drawn[seam]
+    # every filled slot is drawn once, oldest first
+    assert len(drawn) == len(set(drawn)) == ring.filled
+    ages = [(ring.head - 1 - slot) % size for slot in drawn]
+    assert ages == sorted(ages, reverse=True)
+
+
+ring = RingBuffer(size, channels)
+samples = np.zeros((0, channels), dtype=np.float32)
+
+
+def write(m):
+    global samples
+    new = block(len(samples), m)
+    ring.write(new)
+    samples = np.concatenate([samples, new])
+    check_contents(ring, samples)
+    check_segments(ring)
+
+
+# empty ring
+assert ring.segments() == []
+assert check_uploads(ring, [(0, size + 1)]) == ring.nbytes
+
+# partial fill: not wrapped, one segment
+write(4)
+assert ring.head == 4 and ring.segments() == [(0, 4, 6)]
+assert check_uploads(ring, [(0, 4), (size, size + 1)]) is None
+
+# wrap-around write: 4 + 7 = 11 slots, two regions
+write(7)
+assert ring.head == 1 and ring.filled == size
+assert ring.get_regions(4, 7) == [(4, 10), (0, 1)]
+assert check_uploads(ring, [(4, 11), (0, 1)]) is None
+assert ring.segments() == [(1, 10, -1), (0, 1, 9)]
+
+# exactly full lap: head does not move, everything uploaded from head
+write(size)
+assert ring.head == 1
+assert check_uploads(ring, [(1, 11), (0, 1)]) is None
+
+# write larger than the ring: only the last size samples are kept
+write(2 * size + 3)
+assert ring.head == 1
+assert check_uploads(ring, [(1, 11), (0, 1)]) is None
+
+# several writes between two uploads, more than the ring in total
+write(6)
+write(8)
+assert ring.pending == size
+assert check_uploads(ring, [(5, 11), (0, 5)]) is None
+
+# nothing written: nothing uploaded
+assert check_uploads(ring, []) is None
+
+# head back at 0 after a wrap: previous lap only
+write(size - ring.head)
+assert ring.head == 0 and ring.segments() == [(0, size, 0)]
+assert check_uploads(ring, [(5, 10)]) is None
+
+# write starting at slot 0: the seam row is sent on its own
+write(2)
+assert check_uploads(ring, [(0, 2), (size, size + 1)]) is None
+assert ring.segments() == [(2, 9, -2), (0, 2, 8)]
+
+# not full yet, ring written past its end in several blocks
+ring = RingBuffer(size, channels)
+samples = np.zeros((0, channels), dtype=np.float32)
+for m in (3, 3, 3):
+    write(m)
+    assert len(ring.segments()) == 1
+write(3)
+assert ring.head == 2 and ring.segments() == [(2, 9, -2), (0, 2, 8)]
+
+print("RingBuffer: ok")
@@ -0,0 +1,34 @@
+import numpy as np
+
+class SortedIndex(object):
+    """
+    Find the index range of the samples of a line with sorted x lying in a
+    given x interval, with a binary search (np.searchsorted).
+
+    Only one x every `step` samples is copied in a contiguous array (the
+    coarse index), the search is then refined within one step of the line.
+    The line itself is passed at search time since the vertex array it lives
+    in may be reallocated when lines are appended.
+    """
+    def __init__(self, x, step=256):
+        self.n = len(x)
+        self.step = step
+        self.coarse = np.array(x[::step])
+
+    def find(self, x, value, side="left"):
+        """
+        Same as np.searchsorted(x, value, side).
+        """
+        j = np.searchsorted(self.coarse, value, side)
+        lo = max(j - 1, 0) * self.step
+        hi = min(j * self.step + 1, self.n)
+        return lo + np.searchsorted(x[lo:hi], value, side)
+
+    def get_range(self, x, x0, x1):
+        """
+        Return (i0, i1) such that x[i0:i1] covers [x0, x1], including one
+        sample on each side so that lines reach the borders of the view.
+        """
+        i0 = max(self.find(x, x0, "left") - 1, 0)
+        i1 = min(self.find(x, x1, "right") + 1, self.n)
+        return i0, max(i1, i0)
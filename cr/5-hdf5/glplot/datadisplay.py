@@ -10,19 +10,121 @@ except ImportError:
             "PyOpenGL must be installed to run this example.")
     sys.exit(1)
 
+import numpy as np
+from bufferregistry import VertexStore, REGISTRY
+from lod import build_pyramid, select_level
+from culling import SortedIndex
+
+def stored(name):
+    """
+    Attribute kept in the (possibly shared) vertex store of the display.
+    """
+    return property(lambda self: getattr(self.store, name),
+                    lambda self, value: setattr(self.store, name, value))
+
 class DataDisplay(object):
-    buffer = None
     bgcolor = (0, 0, 0, 0) # RGB 0-255
     tz0 = -10.
+    
+    # level of detail: min/max pyramid for lines with sorted x
+    lod = True
+    lodfactor = 4
+    lodminsize = 4096
+    width = 1024
+    sx = 1.
+    
+    # culling: only the samples within the visible x range are drawn, for
+    # lines with sorted x; view is the visible (x0, x1) in data coordinates
+    cull = True
+    view = None
+    
+    # vertex data, see VertexStore
+    buffer = stored("buffer")
+    vertices = stored("vertices")
+    databounds = stored("databounds")
+    options = stored("options")
+    levels = stored("levels")
+    spans = stored("spans")
+    indices = stored("indices")
+    databox = stored("databox")
+    origin = stored("origin")
+    
+    # key of the store in the registry, None if not shared
+    key = None
+    # number of float32 per vertex, x and y being the first two
+    ncols = 2
+
+    def __init__(self):
+        self.store = VertexStore(self.ncols)
+        self.set_bounds(0., 1., 0., 1.)
+        
+    def share(self, key):
+        """
+        Share the vertex data under key: the store registered under key is
+        used if there is one, otherwise the store of this display is
+        registered. The GL contexts of the displays must share their objects.
+        """
+        if self.key is not None:
+            if key is self.key:
+                return
+            # the store shared under the previous key is released first
+            self.release()
+        if key in REGISTRY:
+            self.release()
+            self.store = REGISTRY.acquire(key)
+            if self.databox is not None:
+                self.set_bounds(*self.databox)
+        else:
+            REGISTRY.register(key, self.store)
+        self.key = key
+        
+    def release(self):
+        """
+        Drop the vertex data. The GPU buffer is deleted when no other display
+        uses it, the GL context must be current.
+        """
+        store = self.store
+        if self.key is not None:
+            store = REGISTRY.release(self.key)
+            self.key = None
+        if store is not None and store.buffer is not None:
+            glDeleteBuffers(1, [store.buffer])
+            store.buffer = None
+        self.store = VertexStore(self.ncols)
+
+    def set_bounds(self, xmin, xmax, ymin, ymax):
+        """
+        Set the data box mapped to [0,1]^2 (y being reversed). Data is
+        normalized by the modelview transform, so changing the bounds does
+        not require to upload the data again.
+        """
+        if xmin == xmax:
+            xmin, xmax = xmin - .5, xmax + .5
+        if ymin == ymax:
+            ymin, ymax = ymin - .5, ymax + .5
+        self.xmin, self.xmax, self.ymin, self.ymax = xmin, xmax, ymin, ymax
 
-    def load(self, data, databounds=None, options=None, renormalize=True):
+    def load(self, data, databounds=None, options=None, renormalize=True,
+             origin=0.):
+        """
+        x of data is relative to origin: large offsets (long recordings) are
+        kept in float64 instead of being rounded in the float32 vertices.
+        """
         self.data = data
+        self.origin = origin
         if databounds==None:
             databounds = [0, len(data)]
         if options is None:
             options = [None] * (len(databounds)-1)
-        self.options = options
-        self.databounds = databounds
+        self.options = list(options)
+        self.databounds = list(databounds)
+        self.vertices.clear()
+        self.vertices.append(data)
+        self.levels = []
+        self.spans = []
+        self.indices = []
+        for i in xrange(len(self.databounds) - 1):
+            self.add_levels(self.databounds[i], self.databounds[i+1], self.options[i])
         x = self.data[:,0]
         # -data because the coordinate systems of the screen and the data
         # are y-reversed
@@ -31,38 +133,124 @@ class DataDisplay(object):
         if renormalize is not False:
             # renormalization x,y \in [0,1]
             if type(renormalize) is not tuple:
-                self.xmin, self.xmax, self.ymin, self.ymax = min(x), max(x), min(y), max(y)
+                self.databox = [origin + x.min(), origin + x.max(), y.min(), y.max()]
             elif len(renormalize) == 2:
-                self.xmin, self.xmax = renormalize
-                self.ymin, self.ymax = min(y), max(y)
+                self.databox = list(renormalize) + [y.min(), y.max()]
             elif len(renormalize) == 4:
-                self.xmin, self.xmax, self.ymin, self.ymax = renormalize
-            if self.xmin == self.xmax:
-                self.xmin = self.xmin - .5
-                self.xmax = self.xmax + .5
-            if self.ymin == self.ymax:
-                self.ymin = self.ymin - .5
-                self.ymax = self.ymax + .5
-        self.data[:,0] = (x-self.xmin)/(self.xmax-self.xmin)
-        self.data[:,1] = (y-self.ymin)/(self.ymax-self.ymin)
+                self.databox = list(renormalize)
+            self.set_bounds(*self.databox)
+
+    def append(self, data, options=None):
+        """
+        Add a line without touching the previous ones: only the new data is
+        uploaded, and the bounds are updated incrementally. x is relative to
+        the origin given to load.
+        """
+        start, end = self.vertices.append(data)
+        self.options.append(options)
+        self.add_levels(start, end, options)
+        self.data = self.vertices.data
+        x = data[:,0]
+        y = -data[:,1]
+        box = [self.origin + x.min(), self.origin + x.max(), y.min(), y.max()]
+        if self.databox is not None and start > 0:
+            box = [min(box[0], self.databox[0]), max(box[1], self.databox[1]),
+                   min(box[2], self.databox[2]), max(box[3], self.databox[3])]
+        self.databox = box
+        self.set_bounds(*self.databox)
+        
+    def add_levels(self, i0, i1, options):
+        """
+        Build the level of detail pyramid of the line [i0, i1) and append its
+        levels to the vertex buffer (after the line itself).
+        """
+        line = self.vertices.array[i0:i1]
+        self.spans.append((line[0,0], line[-1,0]) if i1 > i0 else (0., 0.))
+        levels = [(i0, i1 - i0)]
+        issorted = np.all(np.diff(line[:,0]) >= 0)
+        if (self.lod and i1 - i0 >= self.lodminsize and
+            (options is None or options["mode"] == "line") and issorted):
+            for level in build_pyramid(line, self.lodfactor, self.lodminsize / 4):
+                start, end = self.vertices.append(level)
+                levels.append((start, end - start))
+        self.levels.append(levels)
+        if self.cull and issorted:
+            x = self.vertices.array[:,0]
+            self.indices.append([SortedIndex(x[first:first + count])
+                                 for first, count in levels])
+        else:
+            self.indices.append(None)
+        
+    def set_view(self, x0, x1):
+        """
+        Set the visible x range, in normalized coordinates ([0,1] being the
+        data box). The view is stored relative to the origin, like the
+        vertices.
+        """
+        self.view = (self.xmin - self.origin + x0 * (self.xmax - self.xmin),
+                     self.xmin - self.origin + x1 * (self.xmax - self.xmin))
+        
+    def get_range(self, i):
+        """
+        Return (first, count) of the level of detail of line i matching the
+        current x scaling and widget width, restricted to the visible x range
+        when the line has sorted x.
+        """
+        levels = self.levels[i]
+        indices = self.indices[i]
+        n = levels[0][1]
+        cull = indices is not None and self.view is not None
+        # number of samples of the line within the visible x range
+        if cull:
+            x = self.vertices.array[:,0]
+            first, count = levels[0]
+            i0, i1 = indices[0].get_range(x[first:first + count], *self.view)
+            n = i1 - i0
+        else:
+            span = (self.spans[i][1] - self.spans[i][0]) / (self.xmax - self.xmin)
+            if span > 0:
+                n = n * min(1., 1. / (self.sx * span))
+        level = 0
+        if len(levels) > 1:
+            level = select_level(n, self.width, len(levels) - 1, self.lodfactor)
+        first, count = levels[level]
+        if cull:
+            if level > 0:
+                i0, i1 = indices[level].get_range(x[first:first + count], *self.view)
+            first, count = first + i0, i1 - i0
+        return first, count
         
     def get_bounds(self):
         return self.xmin, self.xmax, self.ymin, self.ymax
         
     def bind_data_buffer(self):
-        glBufferData(GL_ARRAY_BUFFER, self.data, GL_STATIC_DRAW)
+        nbytes, uploads = self.vertices.get_uploads()
+        if nbytes is not None:
+            glBufferData(GL_ARRAY_BUFFER, nbytes, None, GL_DYNAMIC_DRAW)
+        for offset, data in uploads:
+            if len(data):
+                glBufferSubData(GL_ARRAY_BUFFER, offset, data.nbytes, data)
         
     def initialize(self):
         glClearColor(*self.bgcolor)
         glEnableClientState(GL_VERTEX_ARRAY)
-        self.buffer = glGenBuffers(1)
+        # the buffer may already exist in a shared store
+        if self.buffer is None:
+            self.buffer = glGenBuffers(1)
         glBindBuffer(GL_ARRAY_BUFFER, self.buffer)
         self.bind_data_buffer()
         
     def transform(self, tx, ty, sx, sy):
+        self.sx = sx
         glLoadIdentity()
         glScalef(sx, sy, 1.)
-        glTranslatef(tx, ty, self.tz0)
+        # the vertices are relative to origin: the large translations are
+        # summed in float64 before being rounded to float32
+        dx = self.xmax - self.xmin
+        glTranslatef(tx + (self.origin - self.xmin) / dx, ty, self.tz0)
+        # data normalization x,y \in [0,1], y reversed
+        glScalef(1. / dx, -1. / (self.ymax - self.ymin), 1.)
+        glTranslatef(0., self.ymin, 0.)
         
     def paint_single(self, i0, n, options):
         mode = options["mode"] # "line" or "points"
@@ -81,17 +269,21 @@ class DataDisplay(object):
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         
         if self.buffer is not None:
-            glVertexPointer(2, GL_FLOAT, 0, None)
             glBindBuffer(GL_ARRAY_BUFFER, self.buffer)
-            for i in xrange(len(self.databounds)-1):
-                self.paint_single(self.databounds[i], self.databounds[i+1] - self.databounds[i], self.options[i])
+            # upload lines appended since last frame
+            if self.vertices.pending or self.vertices.need_resize:
+                self.bind_data_buffer()
+            glVertexPointer(2, GL_FLOAT, 4 * self.ncols, None)
+            for i in xrange(len(self.levels)):
+                first, count = self.get_range(i)
+                self.paint_single(first, count, self.options[i])
             glFlush()
         
     def resize(self, w, h):
         # self.w, self.h = w, h
+        self.width = w
         glViewport(0, 0, w, h)
         glMatrixMode(GL_PROJECTION)
         glLoadIdentity()
         glOrtho(-0.5, +0.5, +0.5, -0.5, 4.0, 15.0)
-        glMatrixMode(GL_MODELVIEW)
-
+        glMatrixMode(GL_MODELVIEW)
\ No newline at end of file
@@ -2,6 +2,12 @@ import numpy as np
 from h5 import read_hdf5
 
 class DataProxy(object):
+    # interval and offset of the current data, see get
+    key = None
+    # number of calls to get, and number of data buffers actually read
+    requests = 0
+    reads = 0
+    
     def __init__(self, data, freq):
         self.fulldata = data
         self.data = None  # current data
@@ -39,7 +45,16 @@ class DataProxy(object):
         Return the data corresponding to the interval databuffer = (x0, x1),
         this interval should contain the current 1s viewport, plus the
         previous and next viewports.
+        
+        Linked views share their proxy and request the same intervals: the
+        data is read and built once, and returned as is to the next views.
         """
+        self.requests += 1
+        key = (tuple(databuffer), offsetx)
+        if key == self.key:
+            return self.data
+        self.reads += 1
+        
         # determine x
         x = self.get_x(databuffer, offsetx=offsetx)
         
@@ -55,6 +70,7 @@ class DataProxy(object):
         y = y.reshape((-1,1))
         
         self.data = np.array(np.hstack((np.array(x), np.array(y))), np.float32)
+        self.key = key
         return self.data
 
         
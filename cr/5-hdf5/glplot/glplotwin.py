@@ -85,7 +85,8 @@ class GLPlot(QtGui.QMainWindow):
         mainLayout.addWidget(self.glWidget)
         mainLayout.addWidget(self.navSlider)
         
-        SIGNALS.navigateSignal.connect(self.navigateEvent)
+        # the slider follows the painted frames, not every navigation event
+        SIGNALS.frameSignal.connect(self.navigateEvent)
         
         self.setWindowTitle("GLPlot")
         self.statusbar = self.statusBar()
@@ -21,6 +21,17 @@ from navigationinterface import NavigationInterface,\
     KEY_CTRL, KEY_ALT, KEY_SHIFT
 from signals import SIGNALS
 from datadisplay import DataDisplay
+from scheduler import FrameScheduler
+
+# hidden widget whose GL context is shared by all the glplot widgets, so that
+# the buffers uploaded in one window can be drawn in the others
+SHAREWIDGET = None
+
+def get_share_widget():
+    global SHAREWIDGET
+    if SHAREWIDGET is None:
+        SHAREWIDGET = QtOpenGL.QGLWidget()
+    return SHAREWIDGET
 
 class GLWidget(QtOpenGL.QGLWidget):
     # initial window size
@@ -28,14 +39,28 @@ class GLWidget(QtOpenGL.QGLWidget):
     
     isInitialized = False
     
+    # max number of frames per second
+    maxfps = 60.
+    
     def __init__(self, parent=None):
-        super(GLWidget, self).__init__(parent)
+        super(GLWidget, self).__init__(parent, get_share_widget())
         self.parent = parent
         self.setMouseTracking(True)
         
         self.nav = Navigation()
         self.navInterface = NavigationInterface(self.nav)
         self.dataDisplay = DataDisplay()
+        # widgets driven by the same Navigation, see link
+        self.linked = [self]
+        
+        # render on demand: repaint requests are coalesced until the next
+        # timer tick
+        self.scheduler = FrameScheduler()
+        # last mouse position, shown in the status bar at the next tick
+        self.mouse = None
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.redraw)
         
         # self.navigateSignal.connect(self.navigateEvent)
         SIGNALS.navigateSignal.connect(self.navigateEvent)
@@ -65,6 +90,10 @@ class GLWidget(QtOpenGL.QGLWidget):
         tx, ty = self.nav.get_translation()
         sx, sy = self.nav.get_scale()
         self.dataDisplay.transform(tx, ty, sx, sy)
+        # visible x range, to draw only the samples within it
+        x0, _ = self.nav.get_data_coordinates(0., 0.)
+        x1, _ = self.nav.get_data_coordinates(1., 0.)
+        self.dataDisplay.set_view(x0, x1)
         self.dataDisplay.paint()
     
     # handle window resizing
@@ -79,7 +108,33 @@ class GLWidget(QtOpenGL.QGLWidget):
         self.keyReleaseEvent(None)
         
     def navigateEvent(self):
-        self.updateGL()
+        self.request_redraw()
+        
+    def schedule(self):
+        if not self.timer.isActive():
+            self.timer.start(int(1000. / self.maxfps))
+        
+    def request_redraw(self, force=False):
+        """
+        Repaint at the next tick. force must be True when the data changed,
+        otherwise the frame is dropped if the view did not change.
+        """
+        self.scheduler.request(force)
+        self.schedule()
+        
+    def get_view_state(self):
+        return (self.nav.get_translation(), self.nav.get_scale(), self.w, self.h)
+        
+    def redraw(self):
+        if self.mouse is not None:
+            self.parent.statusbar.showMessage("%g, %g" % self.getMousePosition(*self.mouse))
+            self.mouse = None
+        if self.isInitialized and self.scheduler.tick(self.get_view_state()):
+            self.updateGL()
+            SIGNALS.frameSignal.emit()
+            
+    def get_frame_stats(self):
+        return self.scheduler.get_stats()
         
     def mousePressEvent(self, event):
         x, y = self.ncoord(event.pos())
@@ -91,7 +146,8 @@ class GLWidget(QtOpenGL.QGLWidget):
     def mouseMoveEvent(self, event):
         x, y = self.ncoord(event.pos())
         self.navInterface.mouseMove(x, y)
-        self.parent.statusbar.showMessage("%g, %g" % self.getMousePosition(x, y))
+        self.mouse = (x, y)
+        self.schedule()
         if self.navInterface.mouseButton:
             SIGNALS.navigateSignal.emit()
 
@@ -144,18 +200,69 @@ class GLWidget(QtOpenGL.QGLWidget):
     def slide(self, x, max):
         # slide, and update only if the transform is not null
         if (self.nav.slide(x, max)):
-            self.updateGL()
+            for widget in self.linked:
+                widget.request_redraw()
         
     def reset(self):
         self.nav.reset()
         SIGNALS.navigateSignal.emit()
     
+    def link(self, other):
+        """
+        Link the navigation of this widget to the one of other: the same
+        Navigation instance then drives all the linked widgets. A widget
+        already linked to others leaves their group first.
+        """
+        if self in other.linked:
+            return
+        self.linked.remove(self)
+        self.nav = other.nav
+        self.navInterface = NavigationInterface(self.nav)
+        self.linked = other.linked
+        self.linked.append(self)
+        self.request_redraw()
+    
     def load_data(self, data, databounds=None, options=None):
         self.dataDisplay.load(data, databounds, options=options)
         # reload if already initialized
         if self.isInitialized:
             self.dataDisplay.bind_data_buffer()
-            self.updateGL()
+            self.request_redraw(True)
+    
+    def append_data(self, data, options=None):
+        """
+        Add a line: only the new data is uploaded at the next paint.
+        """
+        self.dataDisplay.append(data, options)
+        if self.isInitialized:
+            self.request_redraw(True)
+    
+    def share_data(self, key):
+        """
+        Use the same GPU buffer as all the widgets sharing the data under key.
+        """
+        if self.isInitialized:
+            self.makeCurrent()
+        self.dataDisplay.share(key)
+        if self.isInitialized:
+            self.dataDisplay.initialize()
+            self.request_redraw(True)
+    
+    def refresh_data(self):
+        """
+        Take into account lines added by another widget sharing the data.
+        """
+        if self.dataDisplay.databox is not None:
+            self.dataDisplay.set_bounds(*self.dataDisplay.databox)
+        self.request_redraw(True)
+    
+    def release_data(self):
+        """
+        Release the data, the GPU buffer is deleted by the last widget using it.
+        """
+        if self.isInitialized:
+            self.makeCurrent()
+        self.dataDisplay.release()
     
     def capture(self):
         glReadBuffer(GL_FRONT)
@@ -6,7 +6,7 @@ from glwidget import GLWidget
 from navigationbuffered import NavigationBuffered
 from navigationinterface import NavigationInterface
 from signals import SIGNALS
-from datadisplay import DataDisplay
+from multichanneldisplay import MultiChannelDisplay
 from h5 import *
 from colors import *
 from dynamicviewport import DynamicViewport
@@ -43,6 +43,9 @@ class GLWidgetBuffered(GLWidget):
         self.nav = NavigationBuffered()
         self.navInterface = NavigationInterface(self.nav)
         self.nav.sxmin = 1.  #/self.maxviewportsize
+        # all the channels are drawn in one call, one below the other
+        self.dataDisplay = MultiChannelDisplay()
+        self.dataDisplay.set_layout(stacked=True)
         
     def load_data(self, data, freq=None):
         self.data = data
@@ -56,6 +59,8 @@ class GLWidgetBuffered(GLWidget):
             self.duration = (data.shape[0] - 1) / float(freq)
             self.freq = freq
             self.dataproxy = DataProxy(data, freq)
+        # TODO: allow options
+        self.options = [get_options(None, 1.0) for _ in xrange(self.channels)]
         
         self.dynamicviewport = DynamicViewport(self.duration)
         
@@ -72,7 +77,17 @@ class GLWidgetBuffered(GLWidget):
         # reload if already initialized
         if self.isInitialized:
             self.dataDisplay.bind_data_buffer()
-            self.updateGL()
+            self.request_redraw(True)
+        
+    def link(self, other):
+        """
+        Link the navigation, and share the data proxy when both widgets
+        display the same data, so that each data buffer is read once for
+        all the linked widgets.
+        """
+        super(GLWidgetBuffered, self).link(other)
+        if other.data is self.data:
+            self.dataproxy = other.dataproxy
         
     def paintGL(self):
         # retrieve the transformation, from the user interface functions
@@ -88,9 +103,9 @@ class GLWidgetBuffered(GLWidget):
         changed = self.dynamicviewport.update_viewport(viewport)
         
         # databuffer = self.dynamicviewport.get_databuffer(viewport)
+        # the data buffer is stored relative to its start, which the display
+        # adds back in float64
         self.nav.set_offsetx(self.dynamicviewport.databuffer[0])
-        # translate the data, using the compensation of the translation with offsetx
-        self.dataDisplay.transform(tx + self.nav.offsetx, ty, sx, sy)
                         
         # update the viewport and the data buffer if needed
         # if self.dynamicviewport.update_viewport(viewportindex):
@@ -98,18 +113,33 @@ class GLWidgetBuffered(GLWidget):
             print "Load (%.1fs, %.1fs)" % (self.dynamicviewport.databuffer)
             self.update_data(self.dynamicviewport.databuffer, renormalize=False)
             self.dataDisplay.bind_data_buffer()
-            self.updateGL()
         
+        # the transform depends on the origin of the current data buffer
+        self.dataDisplay.transform(tx, ty, sx, sy)
+        x1, _ = self.nav.get_data_coordinates(1., 0.)
+        self.dataDisplay.set_view(x0, x1)
         self.dataDisplay.paint()
         
+    # channel layout: only uniforms are updated, the data is not uploaded again
+    def set_channel_height(self, height):
+        self.dataDisplay.set_layout(channel_height=height)
+        self.request_redraw(True)
+        
+    def set_gain(self, channel, gain):
+        self.dataDisplay.set_gain(channel, gain)
+        self.request_redraw(True)
+        
+    def set_visible(self, channel, visible=True):
+        self.dataDisplay.set_visible(channel, visible)
+        self.request_redraw(True)
+        
     def update_data(self, databuffer=None, renormalize=True):
         if databuffer is None:
             databuffer = self.dynamicviewport.databuffer
         data = self.dataproxy.get(databuffer, offsetx=self.nav.offsetx)
         n = data.shape[0] / self.channels
         databounds = [i * n for i in xrange(self.channels + 1)]
-        # TODO: allow options
-        options = [get_options(None, 1.0) for _ in xrange(self.channels)]
-        self.dataDisplay.load(data, databounds, options=options, renormalize=renormalize)
+        self.dataDisplay.load(data, databounds, options=self.options,
+                              renormalize=renormalize, origin=self.nav.offsetx)
         
         return data
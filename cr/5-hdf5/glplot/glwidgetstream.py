@@ -0,0 +1,41 @@
+from glwidget import GLWidget
+from streamdisplay import StreamDisplay
+
+
+class GLWidgetStream(GLWidget):
+    """
+    Oscilloscope mode: display the last `duration` seconds of a live
+    acquisition. Samples are appended with `append`, and the widget is
+    redrawn at most `maxfps` times per second whatever the append rate.
+    """
+    maxfps = 30.
+    
+    def __init__(self, parent=None):
+        super(GLWidgetStream, self).__init__(parent)
+        self.dataDisplay = StreamDisplay()
+        
+    def set_stream(self, duration, freq, channels, ylim=None):
+        """
+        Set the time window (in seconds), the sampling frequency and the
+        number of channels. The GPU buffer holds duration * freq samples per
+        channel.
+        """
+        self.freq = freq
+        self.channels = channels
+        self.dataDisplay.set_stream(int(duration * freq), channels, ylim)
+        self.request_redraw(True)
+        
+    def append(self, samples):
+        """
+        Append a (m x channels) block of samples. Only these samples are
+        uploaded, at the next redraw.
+        """
+        self.dataDisplay.append(samples)
+        # several appends between two ticks cost one paint
+        self.request_redraw(True)
+            
+    def getMousePosition(self, x, y):
+        # x is in samples in the ring buffer: convert to seconds before now
+        x, y = super(GLWidgetStream, self).getMousePosition(x, y)
+        ring = self.dataDisplay.ring
+        return (x - ring.size) / float(self.freq), y
@@ -0,0 +1,79 @@
+import numpy as np
+
+class GrowableBuffer(object):
+    """
+    CPU mirror of a GPU vertex buffer with reserved capacity.
+
+    Appended data is written into the reserved capacity and recorded as a
+    pending (start, end) region, so that only new data is sent to the GPU
+    with glBufferSubData. When the capacity is exceeded, it is doubled and
+    the whole buffer must be reallocated (amortized O(1) per appended row).
+    """
+    def __init__(self, ncols=2, capacity=1024, dtype=np.float32):
+        self.ncols = ncols
+        self.array = np.zeros((capacity, ncols), dtype=dtype)
+        self.size = 0
+        # regions to upload, as (start, end) row indices
+        self.pending = []
+        # True when the GPU buffer needs to be (re)allocated
+        self.need_resize = True
+
+    @property
+    def capacity(self):
+        return self.array.shape[0]
+
+    @property
+    def data(self):
+        """
+        Used part of the buffer.
+        """
+        return self.array[:self.size]
+
+    def reserve(self, capacity):
+        """
+        Make sure the buffer can hold capacity rows.
+        """
+        if capacity <= self.capacity:
+            return
+        newcapacity = max(capacity, 2 * self.capacity)
+        array = np.zeros((newcapacity, self.ncols), dtype=self.array.dtype)
+        array[:self.size] = self.array[:self.size]
+        self.array = array
+        self.need_resize = True
+
+    def append(self, data):
+        """
+        Append rows and return the (start, end) region they occupy.
+        """
+        n = data.shape[0]
+        self.reserve(self.size + n)
+        start, end = self.size, self.size + n
+        self.array[start:end] = data
+        self.size = end
+        self.pending.append((start, end))
+        return start, end
+
+    def clear(self):
+        self.size = 0
+        self.pending = []
+
+    def get_uploads(self):
+        """
+        Return (nbytes, uploads) and clear the pending regions.
+
+        nbytes is the size of the GPU buffer to allocate (None if the GPU
+        buffer does not need to be reallocated) and uploads a list of
+        (byte offset, array). After a reallocation, the whole used part is
+        uploaded at once.
+        """
+        nbytes = None
+        if self.need_resize:
+            nbytes = self.array.nbytes
+            uploads = [(0, self.data)]
+        else:
+            rowsize = self.array.itemsize * self.ncols
+            uploads = [(start * rowsize, self.array[start:end])
+                       for start, end in self.pending]
+        self.pending = []
+        self.need_resize = False
+        return nbytes, uploads
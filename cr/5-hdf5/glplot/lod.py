@@ -0,0 +1,48 @@
+import numpy as np
+
+def minmax_decimate(data, binsize):
+    """
+    Min/max decimation of a (N x 2) line with sorted x: every bin of binsize
+    samples is replaced by its min and max samples, in their original order,
+    so that the decimated line covers the same pixels as the full one.
+    """
+    n = data.shape[0]
+    y = data[:,1]
+    nbins = int(np.ceil(n / float(binsize)))
+    # pad the last bin with the last value (indices are clipped below)
+    pad = nbins * binsize - n
+    if pad:
+        y = np.concatenate((y, np.repeat(y[-1:], pad)))
+    bins = y.reshape((nbins, binsize))
+    offset = np.arange(nbins) * binsize
+    imin = np.minimum(bins.argmin(axis=1) + offset, n - 1)
+    imax = np.minimum(bins.argmax(axis=1) + offset, n - 1)
+    indices = np.empty(2 * nbins, dtype=np.int64)
+    indices[0::2] = np.minimum(imin, imax)
+    indices[1::2] = np.maximum(imin, imax)
+    return np.array(data[indices], dtype=np.float32)
+
+def build_pyramid(data, factor=4, minsize=1024):
+    """
+    Return the list of decimated levels of a line: level k (k >= 1) has bins
+    of factor**k samples, i.e. 2 * N / factor**k vertices. Levels are built
+    until they have less than minsize vertices. Level 0 (the line itself)
+    is not included.
+    """
+    levels = []
+    n = data.shape[0]
+    binsize = factor
+    while 2 * n / binsize >= minsize:
+        levels.append(minmax_decimate(data, binsize))
+        binsize *= factor
+    return levels
+
+def select_level(nvisible, width, nlevels, factor=4):
+    """
+    Pick the coarsest level which still has at least 2 vertices per pixel
+    (a min and a max) for nvisible samples displayed on width pixels.
+    """
+    if nvisible <= width or nlevels == 0:
+        return 0
+    level = int(np.log(nvisible / float(width)) / np.log(factor))
+    return min(max(level, 0), nlevels)
@@ -0,0 +1,314 @@
+from PyQt4 import QtCore, QtGui, QtOpenGL
+try:
+    from OpenGL import *
+    from OpenGL.GL import *
+    from OpenGL.GL import shaders
+    from OpenGL.GLU import *
+    from PyQt4.QtOpenGL import *
+except ImportError:
+    app = QtGui.QApplication(sys.argv)
+    QtGui.QMessageBox.critical(None, "OpenGL",
+            "PyOpenGL must be installed to run this example.")
+    sys.exit(1)
+
+import ctypes
+import numpy as np
+from datadisplay import DataDisplay
+from precision import split
+
+VERTEX_SHADER = """
+#version 120
+#define NGAINS %(ngains)d
+attribute float a_channel;
+// gain of channel c is the component c %% 4 of u_gain[c / 4]
+uniform vec4 u_gain[NGAINS];
+uniform float u_nchannels;
+// x on screen is u_xscale * (x - u_xview), u_xview being split in two
+// float32 (hi, lo) so that x - hi is exact near the view
+uniform vec2 u_xview;
+uniform float u_xscale;
+// vertical layout, in data coordinates
+uniform float u_ycenter;
+uniform float u_band;
+uniform float u_scale;
+varying float v_channel;
+void main()
+{
+    float c = floor(a_channel + .5);
+    float i = floor(c / 4.);
+    vec4 mask = vec4(equal(vec4(c - 4. * i), vec4(0., 1., 2., 3.)));
+    float gain = dot(u_gain[int(i)], mask);
+    vec4 position = gl_Vertex;
+    position.x = ((position.x - u_xview.x) - u_xview.y) * u_xscale;
+    // channel 0 on top, every channel being centered in its band
+    position.y = u_ycenter + u_band * (.5 * (u_nchannels - 1.) - c)
+               + gain * u_scale * (position.y - u_ycenter);
+    gl_Position = gl_ModelViewProjectionMatrix * position;
+    v_channel = a_channel;
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 120
+uniform sampler1D u_colormap;
+uniform float u_nchannels;
+varying float v_channel;
+void main()
+{
+    gl_FragColor = texture1D(u_colormap, (v_channel + .5) / u_nchannels);
+}
+"""
+
+class MultiChannelDisplay(DataDisplay):
+    """
+    Shader-based display of many channels: every vertex stores its channel
+    index, the channel colors are in a 1D texture (like the colormap of
+    MultiChannelVisual), and all the channels with the same mode and line
+    width are drawn with a single glMultiDrawArrays call, without any
+    per-channel GL state change.
+
+    The vertical layout is computed in the vertex shader: when stacked, each
+    channel is drawn in its own horizontal band, channel_height being the
+    height of a channel relative to its band. Changing the layout or the
+    gain of a channel only updates uniforms, and hidden channels are just
+    not drawn: the data is never uploaded again.
+    """
+    # x, y, channel index
+    ncols = 3
+    program = None
+    texture = None
+    # number of channels the program has been built for
+    nchannels = 0
+    
+    # vertical layout
+    stacked = False
+    channel_height = 1.
+
+    def __init__(self):
+        super(MultiChannelDisplay, self).__init__()
+        # the colormap texture must be uploaded again
+        self.need_colors = True
+        self.need_layout = True
+        # per channel gain and visibility
+        self.gains = np.ones(0, dtype=np.float32)
+        self.visible = np.ones(0, dtype=np.bool_)
+        # indices of the u_gain vec4 to update, None for all of them
+        self.need_gains = None
+
+    def set_bounds(self, xmin, xmax, ymin, ymax):
+        super(MultiChannelDisplay, self).set_bounds(xmin, xmax, ymin, ymax)
+        self.need_layout = True
+
+    def transform(self, tx, ty, sx, sy):
+        self.sx = sx
+        # x is transformed in the vertex shader, from the view origin
+        # computed in float64 (relative to the origin of the vertices)
+        dx = self.xmax - self.xmin
+        self.xscale = sx / dx
+        self.xview = split(self.xmin - self.origin - tx * dx)
+        glLoadIdentity()
+        glScalef(1., sy, 1.)
+        glTranslatef(0., ty, self.tz0)
+        glScalef(1., -1. / (self.ymax - self.ymin), 1.)
+        glTranslatef(0., self.ymin, 0.)
+
+    def set_channels(self, nchannels):
+        """
+        Resize the gain and visibility arrays, keeping the previous values.
+        """
+        n = len(self.gains)
+        if nchannels == n:
+            return
+        gains = np.ones(nchannels, dtype=np.float32)
+        visible = np.ones(nchannels, dtype=np.bool_)
+        gains[:min(n, nchannels)] = self.gains[:nchannels]
+        visible[:min(n, nchannels)] = self.visible[:nchannels]
+        self.gains, self.visible = gains, visible
+        self.need_gains = None
+        self.need_layout = True
+
+    def set_layout(self, stacked=None, channel_height=None):
+        if stacked is not None:
+            self.stacked = stacked
+        if channel_height is not None:
+            self.channel_height = channel_height
+        self.need_layout = True
+
+    def set_gain(self, channel, gain):
+        """
+        Set the gain of a channel, or of all channels if channel is None.
+        """
+        if channel is None:
+            self.gains[:] = gain
+            self.need_gains = None
+        else:
+            self.gains[channel] = gain
+            if self.need_gains is not None:
+                self.need_gains.add(channel // 4)
+
+    def set_visible(self, channel, visible=True):
+        """
+        Show or hide a channel, or all channels if channel is None.
+        """
+        if channel is None:
+            self.visible[:] = visible
+        else:
+            self.visible[channel] = visible
+
+    def add_channel(self, data, channel):
+        vertices = np.empty((data.shape[0], 3), dtype=np.float32)
+        vertices[:,:2] = data[:,:2]
+        vertices[:,2] = channel
+        return vertices
+
+    def load(self, data, databounds=None, options=None, renormalize=True,
+             origin=0.):
+        if databounds is None:
+            databounds = [0, len(data)]
+        channels = np.repeat(np.arange(len(databounds) - 1), np.diff(databounds))
+        vertices = self.add_channel(data, channels)
+        previous = self.options
+        super(MultiChannelDisplay, self).load(vertices, databounds, options,
+                                              renormalize, origin)
+        self.set_channels(len(databounds) - 1)
+        # reloading the data buffer keeps the colors
+        if self.options != previous:
+            self.need_colors = True
+
+    def append(self, data, options=None):
+        vertices = self.add_channel(data, len(self.levels))
+        super(MultiChannelDisplay, self).append(vertices, options)
+        self.set_channels(len(self.levels))
+        self.need_colors = True
+
+    def get_colors(self):
+        """
+        RGBA color of every channel, as a (channels x 4) array.
+        """
+        colors = np.ones((max(len(self.options), 1), 4), dtype=np.float32)
+        for i, options in enumerate(self.options):
+            color = options["color"]
+            colors[i,:len(color)] = color
+        return colors
+
+    def bind_colors(self):
+        colors = self.get_colors()
+        glBindTexture(GL_TEXTURE_1D, self.texture)
+        glTexImage1D(GL_TEXTURE_1D, 0, GL_RGBA, colors.shape[0], 0, GL_RGBA,
+                     GL_FLOAT, colors)
+        self.need_colors = False
+
+    def build_program(self):
+        """
+        Build the program for the current number of channels (the size of
+        the gain array depends on it).
+        """
+        if self.program is not None:
+            glDeleteProgram(self.program)
+        self.nchannels = max(len(self.gains), 1)
+        ngains = (self.nchannels + 3) // 4
+        self.program = shaders.compileProgram(
+            shaders.compileShader(VERTEX_SHADER % dict(ngains=ngains),
+                                  GL_VERTEX_SHADER),
+            shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER))
+        self.a_channel = glGetAttribLocation(self.program, "a_channel")
+        self.locations = {}
+        glUseProgram(self.program)
+        glUniform1i(self.get_location("u_colormap"), 0)
+        glUniform1f(self.get_location("u_nchannels"), float(self.nchannels))
+        self.need_gains = None
+        self.need_layout = True
+
+    def get_location(self, name):
+        if name not in self.locations:
+            self.locations[name] = glGetUniformLocation(self.program, name)
+        return self.locations[name]
+
+    def bind_layout(self):
+        # -y is normalized between ymin and ymax
+        yrange = self.ymax - self.ymin
+        if self.stacked:
+            band = yrange / self.nchannels
+            scale = self.channel_height / self.nchannels
+        else:
+            band, scale = 0., 1.
+        glUniform1f(self.get_location("u_ycenter"), -.5 * (self.ymin + self.ymax))
+        glUniform1f(self.get_location("u_band"), band)
+        glUniform1f(self.get_location("u_scale"), scale)
+        self.need_layout = False
+
+    def bind_gains(self):
+        gains = np.zeros(4 * ((self.nchannels + 3) // 4), dtype=np.float32)
+        gains[:len(self.gains)] = self.gains
+        gains = gains.reshape((-1, 4))
+        if self.need_gains is None:
+            glUniform4fv(self.get_location("u_gain"), len(gains), gains)
+        else:
+            # only the vec4 of the modified channels
+            for i in self.need_gains:
+                glUniform4fv(self.get_location("u_gain[%d]" % i), 1, gains[i])
+        self.need_gains = set()
+
+    def initialize(self):
+        super(MultiChannelDisplay, self).initialize()
+        self.program = None
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_1D, self.texture)
+        glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        self.need_colors = True
+
+    def get_batches(self):
+        """
+        Group the visible ranges of the channels by (mode, line width):
+        return a dict {(mode, lw): (firsts, counts)}.
+        """
+        batches = {}
+        for i in xrange(len(self.levels)):
+            if not self.visible[i]:
+                continue
+            first, count = self.get_range(i)
+            options = self.options[i]
+            firsts, counts = batches.setdefault((options["mode"], options["lw"]),
+                                                ([], []))
+            firsts.append(first)
+            counts.append(count)
+        return batches
+
+    def paint(self):
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+        if self.buffer is not None:
+            glBindBuffer(GL_ARRAY_BUFFER, self.buffer)
+            if self.vertices.pending or self.vertices.need_resize:
+                self.bind_data_buffer()
+            if self.need_colors:
+                self.bind_colors()
+            if self.program is None or self.nchannels != max(len(self.gains), 1):
+                self.build_program()
+            glUseProgram(self.program)
+            if self.need_layout:
+                self.bind_layout()
+            if self.need_gains is None or self.need_gains:
+                self.bind_gains()
+            glUniform2f(self.get_location("u_xview"), *self.xview)
+            glUniform1f(self.get_location("u_xscale"), self.xscale)
+            glBindTexture(GL_TEXTURE_1D, self.texture)
+            stride = 4 * self.ncols
+            glVertexPointer(2, GL_FLOAT, stride, None)
+            glEnableVertexAttribArray(self.a_channel)
+            glVertexAttribPointer(self.a_channel, 1, GL_FLOAT, GL_FALSE, stride,
+                                  ctypes.c_void_p(8))
+            for (mode, lw), (firsts, counts) in self.get_batches().iteritems():
+                if mode == "line":
+                    glLineWidth(lw)
+                    glmode = GL_LINE_STRIP
+                elif mode == "points":
+                    glPointSize(lw)
+                    glmode = GL_POINTS
+                glMultiDrawArrays(glmode, np.array(firsts, dtype=np.int32),
+                                  np.array(counts, dtype=np.int32), len(firsts))
+            glDisableVertexAttribArray(self.a_channel)
+            glUseProgram(0)
+            glFlush()
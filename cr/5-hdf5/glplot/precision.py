@@ -0,0 +1,41 @@
+import numpy as np
+
+EPS = 2. ** -24  # float32 unit roundoff
+
+def split(value):
+    """
+    Split a float64 into two float32 (hi, lo), hi + lo being equal to value
+    up to a relative error of about 2**-48.
+    """
+    hi = np.float32(value)
+    lo = np.float32(np.float64(value) - np.float64(hi))
+    return hi, lo
+
+def transform_x(x, view, scale):
+    """
+    float32 computation done by the vertex shader of MultiChannelDisplay:
+    scale * (x - view), view being sent as a split (hi, lo) pair. x - hi is
+    exact when x and hi are close (Sterbenz lemma), so that the precision
+    depends on the distance to the view, not on the magnitude of x or view.
+    """
+    hi, lo = split(view)
+    x = np.asarray(x, dtype=np.float32)
+    return ((x - hi) - lo) * np.float32(scale)
+
+def transform_x_matrix(x, view, scale):
+    """
+    float32 computation of the fixed-function path: the translation is
+    folded in the modelview matrix as a single float32, -scale * view.
+    """
+    x = np.asarray(x, dtype=np.float32)
+    return x * np.float32(scale) + np.float32(-scale * view)
+
+def error_bound(x, view, scale):
+    """
+    Upper bound of the error of transform_x, in output units, for float32
+    positions x and a float64 view.
+    """
+    d = np.abs(np.asarray(x, dtype=np.float64) - view)
+    # rounding of x - hi, of (x - hi) - lo and of the product (3 eps d),
+    # error of the split and of the subtractions on the lo part
+    return scale * (3 * EPS * d + 4 * EPS ** 2 * abs(view))
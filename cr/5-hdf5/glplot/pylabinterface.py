@@ -66,18 +66,29 @@ class Line(object):
 
 
 class Window(object):
-    def __init__(self, interactive=False, windowIndex=0):
+    def __init__(self, interactive=False, windowIndex=0, share=None):
         """
         Interactive=True means that "plot" displays the figure immediately
         Interactive=False means that "plot" load the data, but show will display all figures at once
+        share = Window whose lines are displayed in this window too, using the
+        same GPU buffer
         """
+        self.share = share
         self.reset()
         self.interactive = interactive
         self.windowIndex = windowIndex
         
     def reset(self):
-        self.lines = []
+        if self.share is None:
+            self.lines = []
+        else:
+            self.lines = self.share.lines
+        # number of lines already sent to the widget
+        self.shown = 0
         self.glplot = None
+        # key of the vertex store used by the widget (windows displaying the
+        # same lines use the key of the window which owns them)
+        self.key = None
         
     def plot(self, *args, **kwargs):
         line = Line(*args, **kwargs)
@@ -86,33 +97,65 @@ class Window(object):
         self.lines.append(line)
         
     def show(self):
-        data = [l.data for l in self.lines]
-        fulldata = np.vstack(data)
-        options = [l.options for l in self.lines]
-        databounds = get_databounds(data)
-    
         if not(self.interactive):
             app = QtGui.QApplication(sys.argv)
            
-        if self.glplot is None:
-            self.glplot = GLPlot(self.interactive, self.windowIndex)
-            
-        self.glplot.glWidget.load_data(fulldata, databounds, options)
+        self.create()
+        self.update()
         self.glplot.show()
         
         if not(self.interactive):
             sys.exit(app.exec_())
         
+    def create(self):
+        if self.share is not None:
+            # the window owning the lines registers the store first
+            self.share.create()
+            key = self.share.key
+        elif self.glplot is None:
+            # a new store for each widget: a window closed and opened again
+            # does not get its old lines back
+            key = object()
+        else:
+            key = self.key
+        if self.glplot is None:
+            self.glplot = GLPlot(self.interactive, self.windowIndex)
+            self.shown = 0
+        if key is not self.key:
+            # first creation, or the owner has been opened again
+            self.key = key
+            self.glplot.glWidget.share_data(key)
+            
+    def update(self):
+        if self.share is not None:
+            # the lines are sent by the window which owns them
+            self.create()
+            self.share.update()
+            self.glplot.glWidget.refresh_data()
+            return
+        # only the lines added since the last call are sent (and uploaded)
+        for line in self.lines[self.shown:]:
+            self.glplot.glWidget.append_data(line.data, line.options)
+        self.shown = len(self.lines)
+        
     def close(self):
-        self.glplot.hide()
+        if self.glplot is not None:
+            self.glplot.glWidget.release_data()
+            self.glplot.hide()
         self.reset()
     
 
 WINDOWS = []
     
-def figure(interactive=IPYTHON):
+def figure(interactive=IPYTHON, share=None):
+    """
+    share = index of a window whose lines are displayed in the new window
+    too, without uploading them again
+    """
     global WINDOWS
-    w = Window(interactive, len(WINDOWS))
+    if share is not None:
+        share = WINDOWS[share]
+    w = Window(interactive, len(WINDOWS), share)
     # print "figure", w, interactive
     WINDOWS.append(w)
     
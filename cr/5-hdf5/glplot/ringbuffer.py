@@ -0,0 +1,120 @@
+import numpy as np
+
+class RingBuffer(object):
+    """
+    Circular (x, y) vertex buffer for live multichannel traces.
+
+    The buffer holds the last `size` samples of every channel. Rows are
+    sample-major: slot s of channel c is row s * channels + c, so that a
+    block of new samples (m x channels) is one contiguous region (two when it
+    wraps around) and can be sent with a single glBufferSubData. Each channel
+    is drawn with a stride of `channels` vertices.
+
+    x is the slot index and is never rewritten: scrolling is obtained by
+    drawing the two halves of the ring (before and after the head) with
+    different x offsets, see `segments`. An extra seam row at slot `size`
+    mirrors slot 0 with x = size, so that the older half ends where the
+    newer one starts and the trace has no gap where the ring wraps.
+    """
+    def __init__(self, size, channels):
+        self.size = size
+        self.channels = channels
+        self.array = np.zeros((size + 1, channels, 2), dtype=np.float32)
+        self.array[:,:,0] = np.arange(size + 1).reshape((-1, 1))
+        # slot where the next sample goes
+        self.head = 0
+        # total number of samples received
+        self.count = 0
+        # number of samples written since the last upload
+        self.pending = 0
+        self.need_resize = True
+
+    @property
+    def nbytes(self):
+        return self.array.nbytes
+
+    @property
+    def filled(self):
+        return min(self.count, self.size)
+
+    def write(self, samples):
+        """
+        Write a (m x channels) block of samples, only the last `size` ones
+        are kept when m > size.
+        """
+        samples = np.asarray(samples, dtype=np.float32).reshape((-1, self.channels))
+        m = samples.shape[0]
+        self.count += m
+        self.pending = min(self.pending + m, self.size)
+        if m > self.size:
+            samples = samples[-self.size:]
+            m = self.size
+        for start, end in self.get_regions(self.head, m):
+            n = end - start
+            self.array[start:end,:,1] = samples[:n]
+            samples = samples[n:]
+        # the seam row follows slot 0
+        self.array[self.size,:,1] = self.array[0,:,1]
+        self.head = (self.head + m) % self.size
+
+    def get_regions(self, start, m):
+        """
+        Slot regions (start, end) covered by m samples written from slot
+        start: one region, or two if it wraps around.
+        """
+        if m <= 0:
+            return []
+        end = start + m
+        if end <= self.size:
+            return [(start, end)]
+        return [(start, self.size), (0, end - self.size)]
+
+    def get_uploads(self):
+        """
+        Return (nbytes, uploads) and clear the pending samples.
+
+        nbytes is the size of the GPU buffer to allocate (None if already
+        allocated) and uploads a list of (byte offset, array) covering the
+        samples written since the last call.
+        """
+        nbytes = None
+        if self.need_resize:
+            nbytes = self.nbytes
+            regions = [(0, self.size)]
+        else:
+            regions = self.get_regions((self.head - self.pending) % self.size,
+                                       self.pending)
+        # the seam row is sent with slot 0, after the region ending at size
+        # if there is one
+        if any(start == 0 for start, end in regions):
+            if any(end == self.size for start, end in regions):
+                regions = [(start, end + (end == self.size))
+                           for start, end in regions]
+            else:
+                regions.append((self.size, self.size + 1))
+        rowsize = self.array.itemsize * 2 * self.channels
+        uploads = [(start * rowsize, self.array[start:end])
+                   for start, end in regions]
+        self.pending = 0
+        self.need_resize = False
+        return nbytes, uploads
+
+    def segments(self):
+        """
+        Return the list of (first slot, count, x offset) to draw, oldest
+        samples first. The newest sample is displayed at x = size - 1 and
+        the oldest one at x = size - filled. In both cases the offset of
+        slot x is (x - head) % size - x, see `StreamDisplay`. When wrapped,
+        the previous lap ends with the seam row.
+        """
+        if self.count < self.size:
+            # not wrapped yet: slots [0, head)
+            segments = [(0, self.head, self.size - self.head)]
+        elif self.head == 0:
+            # exactly one lap, without the seam row
+            segments = [(0, self.size, 0)]
+        else:
+            # previous lap [head, size] then current lap [0, head)
+            segments = [(self.head, self.size - self.head + 1, -self.head),
+                        (0, self.head, self.size - self.head)]
+        return [s for s in segments if s[1] > 0]
@@ -0,0 +1,48 @@
+class FrameScheduler(object):
+    """
+    Render on demand: events mark the view as dirty with `request`, and the
+    widget asks `tick` at most once per timer tick whether a frame must be
+    painted. All the requests received between two ticks are coalesced
+    into one frame, and a frame is dropped when the view state (transform,
+    size) did not change since the last painted frame, unless the data
+    changed (force=True).
+    """
+    def __init__(self):
+        self.dirty = False
+        self.force = False
+        # view state of the last painted frame
+        self.state = None
+        # counters
+        self.requested = 0
+        self.painted = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def request(self, force=False):
+        """
+        Ask for a repaint. force must be True when the data changed.
+        """
+        self.requested += 1
+        if self.dirty:
+            self.coalesced += 1
+        self.dirty = True
+        self.force = self.force or force
+
+    def tick(self, state):
+        """
+        Return True if a frame must be painted for the given view state.
+        """
+        if not self.dirty:
+            return False
+        self.dirty = False
+        if not self.force and state == self.state:
+            self.dropped += 1
+            return False
+        self.force = False
+        self.state = state
+        self.painted += 1
+        return True
+
+    def get_stats(self):
+        return dict(requested=self.requested, painted=self.painted,
+                    coalesced=self.coalesced, dropped=self.dropped)
@@ -3,6 +3,8 @@ from PyQt4 import QtCore
 
 class Signals(QtCore.QObject):
         navigateSignal = QtCore.pyqtSignal()
+        # emitted after a frame has been painted
+        frameSignal = QtCore.pyqtSignal()
         windowCloseSignal = QtCore.pyqtSignal(int)
 SIGNALS = Signals()
 
@@ -0,0 +1,133 @@
+from PyQt4 import QtCore, QtGui, QtOpenGL
+try:
+    from OpenGL import *
+    from OpenGL.GL import *
+    from OpenGL.GL import shaders
+    from OpenGL.GLU import *
+    from PyQt4.QtOpenGL import *
+except ImportError:
+    app = QtGui.QApplication(sys.argv)
+    QtGui.QMessageBox.critical(None, "OpenGL",
+            "PyOpenGL must be installed to run this example.")
+    sys.exit(1)
+
+import ctypes
+import numpy as np
+from datadisplay import DataDisplay
+from ringbuffer import RingBuffer
+from colors import LINECOLORS
+
+VERTEX_SHADER = """
+#version 120
+// x is the slot index, displayed at (x - head) mod size: the oldest sample
+// at 0 and the newest one at size - 1, the seam row (x = size) at size - head
+// like slot 0 (see RingBuffer.segments)
+uniform float u_head;
+uniform float u_size;
+void main()
+{
+    vec4 position = gl_Vertex;
+    position.x = mod(position.x - u_head, u_size);
+    gl_Position = gl_ModelViewProjectionMatrix * position;
+    gl_FrontColor = gl_Color;
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 120
+void main()
+{
+    gl_FragColor = gl_Color;
+}
+"""
+
+class StreamDisplay(DataDisplay):
+    """
+    Display the last samples of live multichannel traces, stored in a
+    circular GPU buffer with a constant memory footprint.
+
+    Scrolling is done in the vertex shader from the head of the ring, so
+    that both halves of the ring are drawn with one glMultiDrawArrays call
+    per channel and no matrix change.
+    """
+    program = None
+
+    def __init__(self, size=1, channels=1):
+        super(StreamDisplay, self).__init__()
+        self.set_stream(size, channels)
+
+    def set_stream(self, size, channels, ylim=None):
+        self.ring = RingBuffer(size, channels)
+        self.options = [dict(lw=1.0, mode="line",
+                             color=LINECOLORS[i % len(LINECOLORS)])
+                        for i in xrange(channels)]
+        self.ylim = ylim
+        # x is the slot index, y bounds are set by ylim or by the first block
+        if ylim is not None:
+            self.set_bounds(0., float(size), -ylim[1], -ylim[0])
+        else:
+            self.set_bounds(0., float(size), 0., 1.)
+
+    def append(self, samples):
+        """
+        Write a (m x channels) block of samples in the ring.
+        """
+        if self.ring.count == 0 and self.ylim is None:
+            y = -np.asarray(samples)
+            self.set_bounds(0., float(self.ring.size), y.min(), y.max())
+        self.ring.write(samples)
+
+    def bind_data_buffer(self):
+        nbytes, uploads = self.ring.get_uploads()
+        if nbytes is not None:
+            glBufferData(GL_ARRAY_BUFFER, nbytes, None, GL_STREAM_DRAW)
+        for offset, data in uploads:
+            glBufferSubData(GL_ARRAY_BUFFER, offset, data.nbytes, data)
+
+    def initialize(self):
+        super(StreamDisplay, self).initialize()
+        self.program = None
+
+    def build_program(self):
+        self.program = shaders.compileProgram(
+            shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER),
+            shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER))
+        self.u_head = glGetUniformLocation(self.program, "u_head")
+        self.u_size = glGetUniformLocation(self.program, "u_size")
+
+    def paint_multi(self, firsts, counts, options):
+        mode = options["mode"]
+        if mode == "line":
+            glLineWidth(options["lw"])
+            glmode = GL_LINE_STRIP
+        elif mode == "points":
+            glPointSize(options["lw"])
+            glmode = GL_POINTS
+        glColor(*options["color"])
+        glMultiDrawArrays(glmode, firsts, counts, len(firsts))
+
+    def paint(self):
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+        if self.buffer is not None:
+            glBindBuffer(GL_ARRAY_BUFFER, self.buffer)
+            if self.ring.pending or self.ring.need_resize:
+                self.bind_data_buffer()
+            segments = self.ring.segments()
+            if segments:
+                if self.program is None:
+                    self.build_program()
+                glUseProgram(self.program)
+                glUniform1f(self.u_head, float(self.ring.head))
+                glUniform1f(self.u_size, float(self.ring.size))
+                # the x offsets of the segments are applied by the shader
+                firsts = np.array([s[0] for s in segments], dtype=np.int32)
+                counts = np.array([s[1] for s in segments], dtype=np.int32)
+                stride = 2 * 4 * self.ring.channels
+                for c in xrange(self.ring.channels):
+                    # channel c is every channels-th vertex, starting at c
+                    glVertexPointer(2, GL_FLOAT, stride,
+                                    ctypes.c_void_p(2 * 4 * c))
+                    self.paint_multi(firsts, counts, self.options[c])
+                glUseProgram(0)
+            glFlush()
@@ -0,0 +1,23 @@
+import numpy as np
+from glplotwin import *
+from glwidgetbuffered import GLWidgetBuffered
+from h5 import *
+
+# two windows over the same recording, driven by a single navigation: the
+# data buffers are read once for both windows
+freq = None
+data = load_hdf5("test.h5")
+
+app = QtGui.QApplication(sys.argv)
+glplot = GLPlot(True, 0, GLWidgetBuffered)
+glplot.glWidget.load_data(data, freq=freq)
+glplot.show()
+
+glplot2 = GLPlot(True, 1, GLWidgetBuffered)
+glplot2.glWidget.load_data(data, freq=freq)
+glplot2.glWidget.link(glplot.glWidget)
+glplot2.show()
+
+app.exec_()
+proxy = glplot.glWidget.dataproxy
+print "%d data buffer requests, %d reads" % (proxy.requests, proxy.reads)
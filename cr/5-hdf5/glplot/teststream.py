@@ -0,0 +1,22 @@
+import numpy as np
+from glplotwin import *
+from glwidgetstream import GLWidgetStream
+
+# 64 channels at 20 kHz (1.28 MS/s), 2 seconds window
+freq = 20000.
+channels = 64
+blocksize = 200  # samples per channel and per block (10 ms)
+
+app = QtGui.QApplication(sys.argv)
+glplot = GLPlot(False, 0, GLWidgetStream)
+glplot.glWidget.set_stream(2., freq, channels, ylim=(-5., 5.))
+
+def acquire():
+    glplot.glWidget.append(np.random.randn(blocksize, channels))
+
+timer = QtCore.QTimer()
+timer.timeout.connect(acquire)
+timer.start(int(1000 * blocksize / freq))
+
+glplot.show()
+sys.exit(app.exec_())
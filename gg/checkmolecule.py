@@ -0,0 +1,69 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# 2014, Aurore Deschildre, Gael Goret, Cyrille Rossant, Nicolas P. Rougier.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+CPU check of the element tables (no GL needed).
+
+For each molecule, the per-atom colours and radii looked up through
+element_table (id table + per-atom ids) must be the ones of the legacy (N,7)
+file, both for the committed compact file and for a fresh conversion of the
+legacy file.
+
+Usage::
+
+    python checkmolecule.py [protein micelle nanotube]
+"""
+from __future__ import print_function
+import os
+import sys
+import tempfile
+import numpy as np
+
+from molecule import ELEMENT_DTYPE, element_table, convert_molecule
+
+
+def check_atoms(legacy, atoms):
+    """ Check element_table of atoms against legacy (N,7) rows """
+
+    vertices, colors, radii = element_table(atoms)
+    assert vertices.dtype == ELEMENT_DTYPE
+    assert len(vertices) == len(legacy)
+    assert len(colors) == len(radii) <= 256
+    ids = vertices['a_element']
+    assert ids.max() < len(radii)
+    # Every entry of the table is used
+    assert len(np.unique(ids)) == len(radii)
+    assert np.allclose(vertices['a_position'], legacy[:,:3], atol=1e-5)
+    # Colours are stored as bytes: equal up to rounding
+    assert np.allclose(colors[ids], legacy[:,3:6], atol=0.5/255)
+    assert np.allclose(radii[ids], legacy[:,6], atol=1e-6)
+    return len(radii)
+
+
+def check(name):
+    """ Check the committed and a freshly converted compact file """
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    legacy = np.load(os.path.join(directory, name + '.npy'))
+    committed = np.load(os.path.join(directory, name + '.atoms.npy'))
+    n = check_atoms(legacy, committed)
+
+    handle, output = tempfile.mkstemp(suffix='.atoms.npy')
+    os.close(handle)
+    try:
+        convert_molecule(os.path.join(directory, name + '.npy'), output)
+        converted = np.load(output)
+    finally:
+        os.remove(output)
+    assert n == check_atoms(legacy, converted)
+    assert np.array_equal(converted, committed)
+    print("%-9s %6d atoms, %d table entries: ok" % (name, len(legacy), n))
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or ['protein', 'micelle', 'nanotube']
+    for name in names:
+        check(name)
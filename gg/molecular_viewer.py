@@ -4,6 +4,8 @@
 # 2014, Aurore Deschildre, Gael Goret, Cyrille Rossant, Nicolas P. Rougier.
 # Distributed under the terms of the new BSD License.
 # -----------------------------------------------------------------------------
+import os
+import sys
 import numpy as np
 
 import OpenGL.GL as gl
@@ -12,6 +14,9 @@ from vispy import gloo
 from vispy import app
 from vispy.util.transforms import perspective, translate, rotate
 
+from molecule import (ELEMENTS, ATOM_DTYPE, element_table, memory_report,
+                      convert_molecule)
+
 vertex = """
 #version 120
 
@@ -21,9 +26,10 @@ uniform mat4 u_projection;
 uniform vec3 u_light_position;
 uniform vec3 u_light_spec_position;
 
+uniform float u_radius[%(n_elements)d];
+%(color_declaration)s
 attribute vec3  a_position;
-attribute vec3  a_color;
-attribute float a_radius;
+attribute float a_element;
 
 varying vec3  v_color;
 varying vec4  v_eye_position;
@@ -31,8 +37,9 @@ varying float v_radius;
 varying vec3  v_light_direction;
 
 void main (void) {
+    float a_radius = u_radius[int(a_element)];
     v_radius = a_radius;
-    v_color = a_color;
+    v_color = %(color)s;
 
     v_eye_position = u_view * u_model * vec4(a_position,1.0);
     v_light_direction = normalize(u_light_position);
@@ -92,13 +99,29 @@ void main()
 }
 """
 
+
+def vertex_shader(n_elements, per_element=False):
+    """ Build the vertex shader for a given element table size """
+
+    if per_element:
+        # Colours come from the element table
+        return vertex % dict(
+            n_elements=n_elements,
+            color_declaration='uniform vec3 u_color[%d];\n' % n_elements,
+            color='u_color[int(a_element)]')
+    # Colours are stored per atom as unsigned bytes
+    return vertex % dict(n_elements=n_elements,
+                         color_declaration='attribute vec3  a_color;\n',
+                         color='a_color / 255.0')
+
+
 class MolecularViewerCanvas(app.Canvas):
 
-    def __init__(self, fname):
+    def __init__(self, fname, per_element=False):
         app.Canvas.__init__(self, title = 'Molecular viewer')
         self.size = 1200, 800
 
-        self.program = gloo.Program(vertex, fragment)
+        self.per_element = per_element
         self.view = np.eye(4, dtype=np.float32)
         self.model = np.eye(4, dtype=np.float32)
         self.projection = np.eye(4, dtype=np.float32)
@@ -118,31 +141,36 @@ class MolecularViewerCanvas(app.Canvas):
     
     def load_molecule(self, fname):
         
-        molecule = np.load(fname)        
-        self._nAtoms = molecule.shape[0]
-        
-        # The x,y,z values store in one array
-        self.coords = molecule[:,:3]
-
-        # The array that will store the color and alpha scale for all the atoms.
-        self.atomsColours = molecule[:,3:6]
-
-        # The array that will store the scale for all the atoms. 
-        self.atomsScales = molecule[:,6]
+        # Legacy (N,7) files are converted once next to the original
+        if not fname.endswith('.atoms.npy'):
+            compact = os.path.splitext(fname)[0] + '.atoms.npy'
+            if not os.path.exists(compact):
+                convert_molecule(fname, compact)
+            fname = compact
+
+        # Memory-mapped: nothing is read until the buffer is uploaded
+        self.atoms = np.load(fname, mmap_mode='r')
+        if self.atoms.dtype != ATOM_DTYPE:
+            raise ValueError("%s is not a compact molecule file" % fname)
+        self._nAtoms = self.atoms.shape[0]
 
     
     def load_data(self):
-        n = self._nAtoms
-        
-        data = np.zeros(n, [('a_position', np.float32, 3),
-                            ('a_color', np.float32, 3),
-                            ('a_radius', np.float32, 1)])
-        
-        data['a_position'] = self.coords
-        data['a_color'] = self.atomsColours
-        data['a_radius'] = self.atomsScales
         
-        self.program.set_vars(gloo.VertexBuffer(data))
+        if self.per_element:
+            vertices, colors, radii = element_table(self.atoms)
+            self.program = gloo.Program(
+                vertex_shader(len(radii), per_element=True), fragment)
+            self.program.set_vars(gloo.VertexBuffer(vertices))
+            for i in range(len(radii)):
+                self.program['u_color[%d]' % i] = colors[i]
+        else:
+            radii = [r for _, _, r in ELEMENTS]
+            self.program = gloo.Program(vertex_shader(len(radii)), fragment)
+            # The file layout is the vertex layout, no intermediate copy
+            self.program.set_vars(gloo.VertexBuffer(self.atoms))
+        for i, radius in enumerate(radii):
+            self.program['u_radius[%d]' % i] = radius
         
         self.program['u_model'] = self.model
         self.program['u_view'] = self.view
@@ -199,12 +227,26 @@ class MolecularViewerCanvas(app.Canvas):
         self.program.draw(gl.GL_POINTS)
 
 
-def main(fname):
-    mvc = MolecularViewerCanvas(fname)
+def main(fname, per_element=False):
+    mvc = MolecularViewerCanvas(fname, per_element)
     mvc.show()
     app.run()
 
 if __name__ == '__main__':
-    main('protein.npy')
-    #main('nanotube.npy')
-    #main('micelle.npy')
+    # python molecular_viewer.py --convert micelle.npy nanotube.npy ...
+    if len(sys.argv) > 2 and sys.argv[1] == '--convert':
+        for fname in sys.argv[2:]:
+            print(convert_molecule(fname))
+    # python molecular_viewer.py --report protein.atoms.npy ...
+    elif len(sys.argv) > 2 and sys.argv[1] == '--report':
+        for fname in sys.argv[2:]:
+            report = memory_report(np.load(fname, mmap_mode='r'))
+            print('%s: %d atoms' % (fname, report['atoms']))
+            for layout in ('legacy', 'compact', 'per-element'):
+                print('  %-12s %9d bytes (%.1f bytes/atom)' % (
+                      layout, report[layout],
+                      report[layout] / float(report['atoms'])))
+    else:
+        main('protein.atoms.npy')
+        #main('nanotube.atoms.npy')
+        #main('micelle.atoms.npy')
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# 2014, Aurore Deschildre, Gael Goret, Cyrille Rossant, Nicolas P. Rougier.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+Molecule files and element tables (CPU only, no GL needed).
+"""
+import os
+import numpy as np
+
+# Element table: (name, colour, radius). Colours and radii are the ones used
+# by the legacy (N,7) .npy files, the compact format stores an index into this
+# table instead of a float32 radius.
+ELEMENTS = [
+    ('H', (1.00, 1.00, 1.00), 0.109),
+    ('C', (0.00, 1.00, 0.00), 0.170),
+    ('N', (0.00, 0.00, 1.00), 0.155),
+    ('O', (1.00, 0.00, 0.00), 0.152),
+    ('S', (1.00, 1.00, 0.00), 0.180),
+    ('P', (0.84313725, 0.74509804, 0.84313725), 0.250),
+]
+
+# Compact on-disk (and on-GPU) layout: 16 bytes per atom instead of the 56
+# bytes of a legacy (N,7) float64 row. Field names match the shader attributes
+# so that a memory-mapped file can be bound as is.
+ATOM_DTYPE = np.dtype([('a_position', np.float32, 3),
+                       ('a_color',    np.uint8,   3),
+                       ('a_element',  np.uint8)])
+
+# Per-element layout: colour is looked up from the element id as well, so only
+# 13 bytes per atom are uploaded (position + id).
+ELEMENT_DTYPE = np.dtype([('a_position', np.float32, 3),
+                          ('a_element',  np.uint8)])
+
+
+def element_table(atoms):
+    """ Build per-element vertices and the (colour, radius) id table
+
+    Atoms sharing the same element and colour get the same id, ids are
+    renumbered so that only the entries actually used are uploaded.
+
+    Parameters
+    ----------
+
+    atoms : np.ndarray
+        Atoms with ATOM_DTYPE layout
+
+    Returns
+    -------
+
+    (vertices, colors, radii) with vertices using ELEMENT_DTYPE, colors a
+    (K,3) float32 array and radii a (K,) float32 array.
+    """
+
+    # One integer key per (element, r, g, b)
+    color = atoms['a_color'].astype(np.uint32)
+    keys = ((atoms['a_element'].astype(np.uint32) << 24) |
+            (color[:,0] << 16) | (color[:,1] << 8) | color[:,2])
+    keys, ids = np.unique(keys, return_inverse=True)
+    if len(keys) > 256:
+        raise ValueError("Too many (element, colour) pairs for uint8 ids")
+
+    vertices = np.empty(len(atoms), dtype=ELEMENT_DTYPE)
+    vertices['a_position'] = atoms['a_position']
+    vertices['a_element'] = ids.ravel()
+
+    colors = np.empty((len(keys),3), dtype=np.float32)
+    colors[:,0] = (keys >> 16) & 0xff
+    colors[:,1] = (keys >> 8) & 0xff
+    colors[:,2] = keys & 0xff
+    colors /= 255.0
+    radii = np.array([r for _, _, r in ELEMENTS], dtype=np.float32)[keys >> 24]
+    return vertices, colors, radii
+
+
+def memory_report(atoms):
+    """ GPU bytes needed by a molecule under each vertex layout """
+
+    n = len(atoms)
+    vertices, colors, radii = element_table(atoms)
+    return {
+        'atoms': n,
+        # float32 position, colour and radius
+        'legacy': n * 7 * 4,
+        'compact': n * ATOM_DTYPE.itemsize,
+        'per-element': vertices.nbytes + colors.nbytes + radii.nbytes,
+    }
+
+
+def convert_molecule(fname, output=None):
+    """ Convert a legacy (N,7) .npy molecule to the compact format
+
+    Parameters
+    ----------
+
+    fname : str
+        Legacy file with x,y,z,r,g,b,radius rows
+
+    output : str
+        Output filename (default is fname with a .atoms.npy extension)
+    """
+
+    molecule = np.load(fname)
+    if molecule.ndim != 2 or molecule.shape[1] != 7:
+        raise ValueError("Legacy molecule must be a (N,7) array")
+
+    table = np.array([color + (radius,) for _, color, radius in ELEMENTS])
+    # Match each atom to its element using colour and radius
+    match = np.all(np.abs(molecule[:,np.newaxis,3:] - table) < 1e-3, axis=-1)
+    if not match.any(axis=1).all():
+        raise ValueError("Unknown element in %s" % fname)
+
+    atoms = np.empty(len(molecule), dtype=ATOM_DTYPE)
+    atoms['a_position'] = molecule[:,:3]
+    atoms['a_color'] = np.round(molecule[:,3:6]*255)
+    atoms['a_element'] = match.argmax(axis=1)
+
+    if output is None:
+        output = os.path.splitext(fname)[0] + '.atoms.npy'
+    np.save(output, atoms)
+    return output
@@ -0,0 +1,84 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+Benchmark of scattered updates of a 1M vertices buffer (DataBuffer.scatter).
+
+Random, clustered, strided and masked sets of indices are set with and without
+CPU storage (runs can only be merged with storage, without it there is one call
+per run of consecutive indices). Updates go through a RecordingBackend (no GL
+needed) such that the number of glBufferSubData calls and the uploaded bytes
+can be compared with a full upload. Time is the time of the scatter call itself
+(sort and grouping into runs).
+
+Usage::
+
+    python benchscatter.py [size]
+"""
+from __future__ import print_function
+import sys
+import time
+import numpy as np
+
+from gloo import backend
+from gloo import VertexBuffer
+
+
+def patterns(size, random):
+    """ Named index patterns """
+
+    for k in (100, 10000, 100000):
+        yield 'random %d' % k, random.randint(0, size, k)
+    for k in (100, 10000, 100000):
+        # Clusters of 64 consecutive indices
+        centers = random.randint(0, size-64, k//64 or 1)
+        yield 'clustered %d' % k, (centers[:,None] + np.arange(64)).ravel()[:k]
+    yield 'every 10th', np.arange(0, size, 10)
+    # Boolean mask (about 1% of the elements)
+    yield 'mask 1%', random.rand(size) < 0.01
+
+
+def bench(size=1000000):
+    """ Scatter updates of each pattern, with and without CPU storage """
+
+    random = np.random.RandomState(0)
+    recorder = backend.RecordingBackend(backend.NullBackend())
+    previous = backend.use(recorder)
+    full = size * 3 * 4
+    print("%d vertices (vec3), full upload is %d bytes" % (size, full))
+    print("%-16s %-6s %8s %8s %12s %6s" % (
+          "pattern", "store", "time", "calls", "bytes", "ratio"))
+    try:
+        for name, indices in patterns(size, random):
+            n = indices.sum() if indices.dtype == bool else len(indices)
+            values = random.rand(n, 3).astype(np.float32)
+            for store in (True, False):
+                V = VertexBuffer(dtype=[('position', np.float32, 3)],
+                                 size=size, store=store)
+                if store:
+                    V.data['position'] = 0
+                V.activate()
+                recorder.next_frame()
+                t0 = time.time()
+                V.scatter(indices, values)
+                elapsed = time.time() - t0
+                V.activate()
+                frame = recorder.next_frame()
+                if store and indices.dtype == bool:
+                    # A mask sets the elements where it is True
+                    assert (V.data['position'][indices] == values).all()
+                    assert (V.data['position'][~indices] == 0).all()
+                calls = frame.counts.get('glBufferSubData', 0)
+                print("%-16s %-6s %6.1fms %8d %12d %5.2f" % (
+                      name, store, 1000*elapsed, calls, frame.uploaded,
+                      frame.uploaded / float(full)))
+    finally:
+        backend.use(previous)
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    bench(size)
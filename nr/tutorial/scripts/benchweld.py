@@ -0,0 +1,80 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+Benchmark of vertex welding (gloo.mesh.weld, no GL needed).
+
+A n x n grid is turned into a triangle soup (3 vertices per triangle, 6 times
+more vertices than the grid) which is welded back, exactly and with a
+tolerance after some jitter has been added. The welded mesh must hold the
+grid vertices and the same triangles.
+
+Usage::
+
+    python benchweld.py [n]     # default n=1292, about 10M soup vertices
+"""
+from __future__ import print_function
+import sys
+import time
+import numpy as np
+
+from gloo.mesh import weld, welded
+
+
+def soup(n):
+    """ Triangle soup of a n x n vertices grid """
+
+    I = np.arange(n*n).reshape(n,n)
+    a, b = I[:-1,:-1].ravel(), I[:-1,1:].ravel()
+    c, d = I[1:,:-1].ravel(), I[1:,1:].ravel()
+    indices = np.c_[a,b,d, a,d,c].ravel()
+
+    grid = np.zeros(n*n, [("position", np.float32, 3),
+                          ("color",    np.float32, 4)])
+    x, y = np.meshgrid(np.linspace(-1,1,n), np.linspace(-1,1,n))
+    grid["position"][:,0], grid["position"][:,1] = x.ravel(), y.ravel()
+    grid["color"] = 1
+    return grid, indices, grid[indices]
+
+
+def check(n=1292):
+    """ Weld a soup exactly and with tolerance """
+
+    grid, indices, vertices = soup(n)
+    print("%d soup vertices (%d bytes)" % (len(vertices), vertices.nbytes))
+
+    t0 = time.time()
+    unique, remapped = weld(vertices)
+    elapsed = time.time() - t0
+    print("exact:     %d vertices in %.2fs" % (len(unique), elapsed))
+    if len(unique) != n*n or not (unique[remapped] == vertices).all():
+        print("Wrong welded mesh")
+        return False
+
+    # Jitter much smaller than the tolerance, itself much smaller than the
+    # grid spacing (some vertices may fall on both sides of a quantization
+    # cell boundary and stay duplicated)
+    jittered = vertices.copy()
+    jitter = np.random.RandomState(0).uniform(-1e-7, 1e-7, (len(vertices),3))
+    jittered["position"] += jitter.astype(np.float32)
+    t0 = time.time()
+    unique, remapped = weld(jittered, tolerance=1e-4)
+    elapsed = time.time() - t0
+    print("tolerance: %d vertices in %.2fs" % (len(unique), elapsed))
+    error = np.abs(unique[remapped]["position"] - vertices["position"]).max()
+    if error > 1e-4:
+        print("Welded vertices moved by %g" % error)
+        return False
+
+    V, I, stats = welded(vertices)
+    print("%d -> %d vertices, %d -> %d bytes (vertices + %s indices)" % (
+          stats['vertices'] + stats['bytes'] + (I.dtype,)))
+    return True
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1292
+    sys.exit(0 if check(n) else 1)
@@ -0,0 +1,73 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+CPU check of the atlas packer (no GL needed).
+
+Random rectangles are inserted into and removed from a ShelfPacker. After each
+operation, the packed rectangles must lie within the area and must not overlap
+(this is checked by painting them in a coverage array). The final occupancy of
+the area is reported.
+
+Usage::
+
+    python checkatlas.py [operations]
+"""
+from __future__ import print_function
+import sys
+import numpy as np
+
+from gloo.atlas import ShelfPacker
+
+
+def check(operations=2000, size=512, seed=0):
+    """ Random inserts and removes, checking coverage after each of them """
+
+    random = np.random.RandomState(seed)
+    packer = ShelfPacker(size, size)
+    coverage = np.zeros((size,size), dtype=np.int32)
+    packed = []
+    full = 0
+
+    for i in range(operations):
+        if packed and random.rand() < 0.3:
+            x, y, w, h = packed.pop(random.randint(len(packed)))
+            packer.remove(x, y, w, h)
+            coverage[y:y+h, x:x+w] -= 1
+        else:
+            w, h = random.randint(4, 48, 2)
+            position = packer.insert(w, h)
+            if position is None:
+                full += 1
+                continue
+            x, y = position
+            if x < 0 or y < 0 or x + w > size or y + h > packer.top:
+                print("Rectangle (%d,%d,%d,%d) is out of the area" % (x,y,w,h))
+                return False
+            coverage[y:y+h, x:x+w] += 1
+            packed.append((x, y, w, h))
+        if coverage.max() > 1:
+            print("Overlapping rectangles after %d operations" % (i+1))
+            return False
+        if packer.used != coverage.sum():
+            print("Wrong used area after %d operations" % (i+1))
+            return False
+
+    # Everything removed, the area must be empty again
+    for x, y, w, h in packed:
+        packer.remove(x, y, w, h)
+    if packer.used != 0 or packer.top != 0:
+        print("Area is not empty once all rectangles are removed")
+        return False
+
+    print("%d operations, %d insertions did not fit" % (operations, full))
+    print("Occupancy: %.1f%% of the area" % (100.0 * coverage.sum() / size**2))
+    return True
+
+
+if __name__ == '__main__':
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    sys.exit(0 if check(operations) else 1)
@@ -0,0 +1,82 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+CPU check of index buffers narrowing and vertex cache optimization (no GL
+needed).
+
+A regular grid is triangulated, its triangles are shuffled and reordered by
+gloo.mesh.optimize. The reordered list must hold the same triangles (with the
+same winding) and have a better ACMR. Index bytes of the IndexBuffer are
+reported for the narrowest type and for uint32.
+
+Usage::
+
+    python checkmesh.py [n]     # n x n vertices grid (default 64)
+"""
+from __future__ import print_function
+import sys
+import time
+import numpy as np
+
+from gloo import IndexBuffer
+from gloo.mesh import acmr, optimize
+
+
+def grid(n):
+    """ Triangle list of a n x n vertices grid """
+
+    I = np.arange(n*n).reshape(n,n)
+    a, b = I[:-1,:-1].ravel(), I[:-1,1:].ravel()
+    c, d = I[1:,:-1].ravel(), I[1:,1:].ravel()
+    return np.c_[a,b,d, a,d,c].reshape(-1,3)
+
+
+def canonical(triangles):
+    """ Triangles rotated such that their smallest index is first, sorted """
+
+    triangles = np.asarray(triangles).reshape(-1,3)
+    shift = triangles.argmin(axis=1)
+    rows = np.arange(len(triangles))[:,None]
+    rotated = triangles[rows, (shift[:,None] + np.arange(3)) % 3]
+    return rotated[np.lexsort(rotated.T[::-1])]
+
+
+def check(n=64):
+    """ Optimize a shuffled grid and check the result """
+
+    triangles = grid(n)
+    np.random.RandomState(0).shuffle(triangles)
+    indices = triangles.ravel()
+
+    t0 = time.time()
+    optimized = optimize(indices)
+    elapsed = time.time() - t0
+    if not (canonical(indices) == canonical(optimized)).all():
+        print("Triangles have been modified")
+        return False
+
+    before, after = acmr(indices), acmr(optimized)
+    print("%d triangles, optimized in %.2fs" % (len(triangles), elapsed))
+    print("ACMR: %.3f -> %.3f" % (before, after))
+    if after >= before:
+        print("ACMR has not been improved")
+        return False
+
+    buffer = IndexBuffer(indices)
+    wide = IndexBuffer(indices, dtype=np.uint32)
+    print("Index bytes: %d (%s) instead of %d (uint32)" % (
+          buffer.nbytes, buffer.dtype, wide.nbytes))
+    for size, dtype in ((256, np.uint8), (257, np.uint16), (65537, np.uint32)):
+        if IndexBuffer([0, size-1]).dtype != dtype:
+            print("Wrong index type for %d vertices" % size)
+            return False
+    return True
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    sys.exit(0 if check(n) else 1)
@@ -4,6 +4,11 @@
 # Distributed under the terms of the new BSD License.
 # -----------------------------------------------------------------------------
 from program import Program
+from uniforms import UniformGroup
 from texture import Texture1D, Texture2D
+from atlas import TextureAtlas
 from buffer import VertexBuffer, IndexBuffer
+from layout import VertexLayout
+from framebuffer import FrameBuffer, RenderBuffer
+from layers import LayerCache
 from shader import VertexShader, FragmentShader
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+Texture atlas.
+
+Many small 2D images (colormaps, glyphs, icons) are packed into a single large
+Texture2D such that a program only needs one sampler (and one texture unit)
+for all of them. Each image is accessed through its texture coordinates
+rectangle.
+
+Packing uses shelves: the atlas is cut into horizontal shelves whose height is
+the height of the first image placed in them, and images are placed from left
+to right within a shelf. Removing an image frees its span in its shelf, which
+may then be reused by any image that fits. The packer (ShelfPacker) does not
+need any GL and can be tested on the CPU.
+
+Example::
+
+    atlas = TextureAtlas((512,512,4), np.uint8)
+    region = atlas.insert(image)
+    u0, v0, u1, v1 = atlas.texcoords(region)
+    program['atlas'] = atlas
+    ...
+    atlas.remove(region)
+"""
+import numpy as np
+
+from debug import log, count
+from texture import Texture2D
+
+
+
+# ------------------------------------------------------- ShelfPacker class ---
+class ShelfPacker(object):
+    """
+    Shelf packing of rectangles into a (width, height) area.
+
+    Each shelf is a list [y, height, spans] where spans is the sorted list of
+    free (x, width) spans of the shelf.
+    """
+
+    def __init__(self, width, height):
+        """
+        Initialize the packer
+
+        Parameters
+        ----------
+
+        width : int
+            Width of the area
+
+        height : int
+            Height of the area
+        """
+
+        self._width = width
+        self._height = height
+        self.clear()
+
+
+    @property
+    def width(self):
+        """ Width of the area """
+
+        return self._width
+
+
+    @property
+    def height(self):
+        """ Height of the area """
+
+        return self._height
+
+
+    @property
+    def used(self):
+        """ Area of the packed rectangles """
+
+        return self._used
+
+
+    @property
+    def top(self):
+        """ Height used by the shelves """
+
+        return self._top
+
+
+    def clear(self):
+        """ Remove all rectangles """
+
+        self._shelves = []
+        self._top = 0
+        self._used = 0
+
+
+    def insert(self, width, height):
+        """
+        Find room for a (width, height) rectangle.
+
+        Returns the (x, y) position of the rectangle or None if it does not fit.
+        The shelf wasting the less height is chosen (a new shelf is only opened
+        when no existing shelf fits) and the first free span that fits is used
+        within that shelf.
+        """
+
+        if width <= 0 or height <= 0:
+            raise ValueError("Rectangle must have a positive size")
+        if width > self._width or height > self._height:
+            return None
+
+        best = None
+        for shelf in self._shelves:
+            y, shelf_height, spans = shelf
+            if shelf_height < height:
+                continue
+            if best is not None and shelf_height - height >= best[1] - height:
+                continue
+            for x, span in spans:
+                if span >= width:
+                    best = shelf
+                    break
+
+        if best is None:
+            if self._top + height > self._height:
+                return None
+            best = [self._top, height, [(0, self._width)]]
+            self._shelves.append(best)
+            self._top += height
+
+        y, shelf_height, spans = best
+        for i, (x, span) in enumerate(spans):
+            if span >= width:
+                if span == width:
+                    del spans[i]
+                else:
+                    spans[i] = x + width, span - width
+                break
+        self._used += width * height
+        return x, y
+
+
+    def remove(self, x, y, width, height):
+        """ Free the (width, height) rectangle at (x, y) """
+
+        for shelf in self._shelves:
+            if shelf[0] == y:
+                break
+        else:
+            raise ValueError("No shelf at y=%d" % y)
+        if height > shelf[1]:
+            raise ValueError("Rectangle is higher than its shelf")
+
+        self._used -= width * height
+
+        # Insert the span and merge it with its neighbours
+        spans = shelf[2]
+        spans.append((x, width))
+        spans.sort()
+        merged = [spans[0]]
+        for x, width in spans[1:]:
+            x0, width0 = merged[-1]
+            if x0 + width0 > x:
+                raise ValueError("Rectangle is not packed")
+            if x0 + width0 == x:
+                merged[-1] = x0, width0 + width
+            else:
+                merged.append((x, width))
+        shelf[2] = merged
+
+        # Empty shelves on top are given back to the area
+        while self._shelves and self._shelves[-1][2] == [(0, self._width)]:
+            self._top -= self._shelves.pop()[1]
+
+
+
+# ------------------------------------------------------ TextureAtlas class ---
+class TextureAtlas(Texture2D):
+    """
+    Texture2D where many small images are packed.
+
+    Images are uploaded with glTexSubImage2D when they are inserted, only the
+    region of the new image is uploaded. Each image is surrounded by a border
+    of `padding` texels replicating its edges such that linear interpolation
+    does not bleed into the neighbour images.
+    """
+
+    def __init__(self, shape=(1024,1024,4), dtype=np.uint8, padding=1):
+        """
+        Initialize the atlas.
+
+        Parameters
+        ----------
+
+        shape : tuple of integers
+            Atlas shape (height, width, channels)
+
+        dtype : np.dtype
+            Atlas data type
+
+        padding : int
+            Border around each image (in texels)
+        """
+
+        Texture2D.__init__(self, shape=shape, dtype=np.dtype(dtype))
+        self._padding = padding
+        self._packer = ShelfPacker(self.width, self.height)
+        if self._data is not None:
+            self._data[...] = 0
+
+
+    @property
+    def packer(self):
+        """ Packer of the atlas """
+
+        return self._packer
+
+
+    @property
+    def padding(self):
+        """ Border around each image (in texels) """
+
+        return self._padding
+
+
+    def insert(self, data):
+        """
+        Pack and upload an image (deferred operation)
+
+        Parameters
+        ----------
+
+        data : np.ndarray
+            Image of shape (height, width) or (height, width, channels),
+            channels being the number of channels of the atlas
+
+        Returns the (x, y, width, height) region of the image in the atlas
+        (in texels) or None if the atlas is full.
+        """
+
+        data = np.array(data, dtype=self.dtype, copy=False)
+        if len(data.shape) == 2:
+            data = data.reshape((data.shape[0],data.shape[1],1))
+        if data.shape[-1] != self.shape[-1]:
+            raise ValueError("Image has wrong number of channels")
+
+        height, width = data.shape[0], data.shape[1]
+        p = self._padding
+        position = self._packer.insert(width + 2*p, height + 2*p)
+        if position is None:
+            log("Atlas is full (%dx%d requested)", width, height)
+            return None
+        x, y = position
+        count('atlas.insert')
+
+        # Image with its edges replicated on the padding
+        if p:
+            data = np.pad(data, ((p,p),(p,p),(0,0)), mode='edge')
+        if self._data is not None:
+            self._data[y:y+height+2*p, x:x+width+2*p] = data
+        self.set_data(data, offset=(y,x,0), copy=True)
+        return x + p, y + p, width, height
+
+
+    def remove(self, region):
+        """
+        Free the region of an image.
+
+        The texture itself is not modified, the region is only made available
+        to the next insertions.
+        """
+
+        x, y, width, height = region
+        p = self._padding
+        self._packer.remove(x - p, y - p, width + 2*p, height + 2*p)
+        count('atlas.remove')
+
+
+    def clear(self):
+        """ Free all regions """
+
+        self._packer.clear()
+
+
+    def texcoords(self, region):
+        """ Return the (u0, v0, u1, v1) texture coordinates of a region """
+
+        x, y, width, height = region
+        return ( x / float(self.width), y / float(self.height),
+                 (x + width) / float(self.width), (y + height) / float(self.height) )
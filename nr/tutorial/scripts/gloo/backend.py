@@ -0,0 +1,454 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+Pluggable GL backend.
+
+All gloo objects talk to OpenGL through the `gl` object of this module which
+forwards every GL_* constant and gl* function to the current backend:
+
+  - OpenGLBackend : PyOpenGL (default when available)
+  - NullBackend : no GL at all, returns plausible object names and introspects
+                  shaders source code so that programs can be "linked"
+  - RecordingBackend : logs every call of another backend, with its arguments
+                       and payload size, and aggregates them per frame
+
+Example::
+
+    from gloo import backend
+    recorder = backend.RecordingBackend(backend.NullBackend())
+    backend.use(recorder)
+    program.draw(gl.GL_TRIANGLES, indices)
+    frame = recorder.next_frame()
+    print(frame.count, frame.uploaded)
+"""
+import re
+import ctypes
+import collections
+import numpy as np
+
+
+# GL constants used by gloo (values from the OpenGL specification)
+constants = {
+    'GL_FALSE'                : 0,
+    'GL_TRUE'                 : 1,
+    'GL_POINTS'               : 0x0000,
+    'GL_LINES'                : 0x0001,
+    'GL_LINE_LOOP'            : 0x0002,
+    'GL_LINE_STRIP'           : 0x0003,
+    'GL_TRIANGLES'            : 0x0004,
+    'GL_TRIANGLE_STRIP'       : 0x0005,
+    'GL_TRIANGLE_FAN'         : 0x0006,
+    'GL_DEPTH_BUFFER_BIT'     : 0x0100,
+    'GL_ONE'                  : 0x0001,
+    'GL_SRC_ALPHA'            : 0x0302,
+    'GL_ONE_MINUS_SRC_ALPHA'  : 0x0303,
+    'GL_STENCIL_BUFFER_BIT'   : 0x0400,
+    'GL_COLOR_BUFFER_BIT'     : 0x4000,
+    'GL_DEPTH_TEST'           : 0x0B71,
+    'GL_BLEND'                : 0x0BE2,
+    'GL_TEXTURE_1D'           : 0x0DE0,
+    'GL_TEXTURE_2D'           : 0x0DE1,
+    'GL_BYTE'                 : 0x1400,
+    'GL_UNSIGNED_BYTE'        : 0x1401,
+    'GL_SHORT'                : 0x1402,
+    'GL_UNSIGNED_SHORT'       : 0x1403,
+    'GL_INT'                  : 0x1404,
+    'GL_UNSIGNED_INT'         : 0x1405,
+    'GL_FLOAT'                : 0x1406,
+    'GL_DOUBLE'               : 0x140A,
+    'GL_HALF_FLOAT'           : 0x140B,
+    'GL_DEPTH_COMPONENT'      : 0x1902,
+    'GL_ALPHA'                : 0x1906,
+    'GL_RGB'                  : 0x1907,
+    'GL_RGBA'                 : 0x1908,
+    'GL_LUMINANCE'            : 0x1909,
+    'GL_LUMINANCE_ALPHA'      : 0x190A,
+    'GL_NEAREST'              : 0x2600,
+    'GL_LINEAR'               : 0x2601,
+    'GL_TEXTURE_MAG_FILTER'   : 0x2800,
+    'GL_TEXTURE_MIN_FILTER'   : 0x2801,
+    'GL_TEXTURE_WRAP_S'       : 0x2802,
+    'GL_TEXTURE_WRAP_T'       : 0x2803,
+    'GL_REPEAT'               : 0x2901,
+    'GL_RGBA4'                : 0x8056,
+    'GL_DEPTH_COMPONENT16'    : 0x81A5,
+    'GL_CLAMP_TO_EDGE'        : 0x812F,
+    'GL_MIRRORED_REPEAT'      : 0x8370,
+    'GL_TEXTURE0'             : 0x84C0,
+    'GL_ARRAY_BUFFER'         : 0x8892,
+    'GL_ELEMENT_ARRAY_BUFFER' : 0x8893,
+    'GL_STREAM_DRAW'          : 0x88E0,
+    'GL_STATIC_DRAW'          : 0x88E4,
+    'GL_DYNAMIC_DRAW'         : 0x88E8,
+    'GL_FRAGMENT_SHADER'      : 0x8B30,
+    'GL_VERTEX_SHADER'        : 0x8B31,
+    'GL_FLOAT_VEC2'           : 0x8B50,
+    'GL_FLOAT_VEC3'           : 0x8B51,
+    'GL_FLOAT_VEC4'           : 0x8B52,
+    'GL_INT_VEC2'             : 0x8B53,
+    'GL_INT_VEC3'             : 0x8B54,
+    'GL_INT_VEC4'             : 0x8B55,
+    'GL_BOOL'                 : 0x8B56,
+    'GL_BOOL_VEC2'            : 0x8B57,
+    'GL_BOOL_VEC3'            : 0x8B58,
+    'GL_BOOL_VEC4'            : 0x8B59,
+    'GL_FLOAT_MAT2'           : 0x8B5A,
+    'GL_FLOAT_MAT3'           : 0x8B5B,
+    'GL_FLOAT_MAT4'           : 0x8B5C,
+    'GL_SAMPLER_1D'           : 0x8B5D,
+    'GL_SAMPLER_2D'           : 0x8B5E,
+    'GL_COMPILE_STATUS'       : 0x8B81,
+    'GL_LINK_STATUS'          : 0x8B82,
+    'GL_ACTIVE_UNIFORMS'      : 0x8B86,
+    'GL_ACTIVE_ATTRIBUTES'    : 0x8B89,
+    'GL_FRAMEBUFFER_COMPLETE' : 0x8CD5,
+    'GL_COLOR_ATTACHMENT0'    : 0x8CE0,
+    'GL_DEPTH_ATTACHMENT'     : 0x8D00,
+    'GL_STENCIL_ATTACHMENT'   : 0x8D20,
+    'GL_FRAMEBUFFER'          : 0x8D40,
+    'GL_RENDERBUFFER'         : 0x8D41,
+    'GL_STENCIL_INDEX8'       : 0x8D48,
+}
+
+# Entry points that upload data to GPU memory
+uploads = ('glBufferData', 'glBufferSubData',
+           'glTexImage1D', 'glTexImage2D',
+           'glTexSubImage1D', 'glTexSubImage2D')
+
+
+
+# ----------------------------------------------------- OpenGLBackend class ---
+class OpenGLBackend(object):
+    """ PyOpenGL backend """
+
+    def __init__(self):
+        import OpenGL.GL
+        self._gl = OpenGL.GL
+
+
+    def __getattr__(self, name):
+        value = getattr(self._gl, name)
+        # Cache for next time
+        setattr(self, name, value)
+        return value
+
+
+    def glGetActiveAttrib(self, program, index):
+        """ Pythonized glGetActiveAttrib: returns (name, size, type) """
+
+        bufsize = 32
+        length = ctypes.c_int()
+        size = ctypes.c_int()
+        type = ctypes.c_int()
+        name = ctypes.create_string_buffer(bufsize)
+        self._gl.glGetActiveAttrib(program, index,
+                                   bufsize, ctypes.byref(length),
+                                   ctypes.byref(size), ctypes.byref(type), name)
+        return name.value, size.value, type.value
+
+
+
+# ------------------------------------------------------- NullBackend class ---
+class NullBackend(object):
+    """
+    Backend without any GL.
+
+    Object creation returns increasing names, status queries always succeed
+    and program introspection (active uniforms/attributes) is obtained from
+    the source code of the attached shaders. Any other call does nothing.
+    """
+
+    _types = {
+        'float' : 'GL_FLOAT',      'vec2'  : 'GL_FLOAT_VEC2',
+        'vec3'  : 'GL_FLOAT_VEC3', 'vec4'  : 'GL_FLOAT_VEC4',
+        'int'   : 'GL_INT',        'ivec2' : 'GL_INT_VEC2',
+        'ivec3' : 'GL_INT_VEC3',   'ivec4' : 'GL_INT_VEC4',
+        'bool'  : 'GL_BOOL',       'bvec2' : 'GL_BOOL_VEC2',
+        'bvec3' : 'GL_BOOL_VEC3',  'bvec4' : 'GL_BOOL_VEC4',
+        'mat2'  : 'GL_FLOAT_MAT2', 'mat3'  : 'GL_FLOAT_MAT3',
+        'mat4'  : 'GL_FLOAT_MAT4', 'sampler1D' : 'GL_SAMPLER_1D',
+        'sampler2D' : 'GL_SAMPLER_2D' }
+
+    def __init__(self):
+        self._names = 0
+        self._sources = {}
+        self._attached = {}
+        self._variables = {}
+
+
+    def __getattr__(self, name):
+        if name in constants:
+            return constants[name]
+        if name.startswith('gl'):
+            return self._noop
+        raise AttributeError(name)
+
+
+    def _noop(self, *args):
+        return None
+
+
+    def _new_name(self):
+        self._names += 1
+        return self._names
+
+
+    def glGenBuffers(self, count):
+        return self._new_name()
+
+    def glGenTextures(self, count):
+        return self._new_name()
+
+    def glGenFramebuffers(self, count):
+        return self._new_name()
+
+    def glGenRenderbuffers(self, count):
+        return self._new_name()
+
+    def glCheckFramebufferStatus(self, target):
+        return constants['GL_FRAMEBUFFER_COMPLETE']
+
+    def glCreateProgram(self):
+        name = self._new_name()
+        self._attached[name] = []
+        return name
+
+    def glCreateShader(self, target):
+        return self._new_name()
+
+    def glShaderSource(self, shader, code):
+        self._sources[shader] = code
+
+    def glAttachShader(self, program, shader):
+        self._attached[program].append(shader)
+
+    def glDetachShader(self, program, shader):
+        self._attached[program].remove(shader)
+
+    def glGetAttachedShaders(self, program):
+        return list(self._attached.get(program, []))
+
+    def glGetShaderiv(self, shader, pname):
+        return constants['GL_TRUE']
+
+    def glGetShaderInfoLog(self, shader):
+        return ''
+
+    def glGetProgramInfoLog(self, program):
+        return ''
+
+    def glLinkProgram(self, program):
+        """ Find active variables from the attached shaders source """
+
+        variables = {'uniform' : [], 'attribute' : []}
+        regex = re.compile("""\s*(?P<kind>uniform|attribute)\s+(?P<type>\w+)\s+"""
+                           """(?P<name>\w+)\s*(\[(?P<size>\d+)\])?\s*;""")
+        for shader in self._attached[program]:
+            for m in re.finditer(regex, self._sources.get(shader, '')):
+                gtype = constants[NullBackend._types[m.group('type')]]
+                name, size = m.group('name'), 1
+                if m.group('size'):
+                    name, size = name + '[0]', int(m.group('size'))
+                variables[m.group('kind')].append((name, size, gtype))
+        self._variables[program] = variables
+
+    def glGetProgramiv(self, program, pname):
+        if pname == constants['GL_ACTIVE_UNIFORMS']:
+            return len(self._variables[program]['uniform'])
+        elif pname == constants['GL_ACTIVE_ATTRIBUTES']:
+            return len(self._variables[program]['attribute'])
+        return constants['GL_TRUE']
+
+    def glGetActiveUniform(self, program, index):
+        return self._variables[program]['uniform'][index]
+
+    def glGetActiveAttrib(self, program, index):
+        return self._variables[program]['attribute'][index]
+
+    def glGetUniformLocation(self, program, name):
+        names = [n for n,_,_ in self._variables[program]['uniform']]
+        return names.index(name) if name in names else -1
+
+    def glGetAttribLocation(self, program, name):
+        names = [n for n,_,_ in self._variables[program]['attribute']]
+        return names.index(name) if name in names else -1
+
+    def glGetString(self, name):
+        return 'Null'
+
+
+
+def _summary(arg):
+    """ Copy of a scalar argument, short description of any other argument """
+
+    if arg is None or isinstance(arg, (bool, int, float, str, bytes)):
+        return arg
+    if isinstance(arg, np.generic):
+        return arg.item()
+    if isinstance(arg, ctypes._SimpleCData):
+        return arg.value
+    if isinstance(arg, np.ndarray):
+        return '<array %s %s>' % (arg.dtype, arg.shape)
+    return '<%s>' % type(arg).__name__
+
+
+
+# ------------------------------------------------------------- Frame class ---
+class Frame(object):
+    """ GL calls issued during one frame """
+
+    def __init__(self):
+        self._calls = []
+
+
+    def record(self, name, args, nbytes):
+        """ Record a call (arrays and other payloads are not kept alive) """
+
+        self._calls.append((name, tuple(_summary(arg) for arg in args), nbytes))
+
+
+    @property
+    def calls(self):
+        """ List of (name, args, nbytes), args being scalars or summaries """
+
+        return self._calls
+
+
+    @property
+    def count(self):
+        """ Number of GL calls """
+
+        return len(self._calls)
+
+
+    @property
+    def counts(self):
+        """ Number of GL calls per entry point """
+
+        counts = {}
+        for name, _, _ in self._calls:
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+
+    @property
+    def nbytes(self):
+        """ Total array payload (uniforms included) """
+
+        return sum(nbytes for _, _, nbytes in self._calls)
+
+
+    @property
+    def uploaded(self):
+        """ Bytes uploaded to buffers and textures """
+
+        return sum(nbytes for name, _, nbytes in self._calls if name in uploads)
+
+
+    def __repr__(self):
+        return "Frame (%d calls, %d bytes uploaded)" % (self.count, self.uploaded)
+
+
+
+# -------------------------------------------------- RecordingBackend class ---
+class RecordingBackend(object):
+    """ Backend recording all the calls made to another backend """
+
+    def __init__(self, backend=None, maxframes=1000):
+        """
+        Parameters
+        ----------
+
+        backend : object
+            Backend actually executing the calls (default is a NullBackend)
+
+        maxframes : int
+            Number of frames kept, older ones are dropped (None for no limit)
+        """
+
+        self._backend = backend or NullBackend()
+        self._maxframes = maxframes
+        self._frame = Frame()
+        self._frames = collections.deque(maxlen=maxframes)
+
+
+    def __getattr__(self, name):
+        value = getattr(self._backend, name)
+        if not name.startswith('gl'):
+            return value
+
+        def function(*args):
+            nbytes = 0
+            for arg in args:
+                if isinstance(arg, np.ndarray):
+                    nbytes += arg.nbytes
+            self._frame.record(name, args, nbytes)
+            return value(*args)
+        function.__name__ = name
+
+        # Cache for next time
+        setattr(self, name, function)
+        return function
+
+
+    @property
+    def frame(self):
+        """ Frame being recorded """
+
+        return self._frame
+
+
+    @property
+    def frames(self):
+        """ Last maxframes frames recorded so far (current one excluded) """
+
+        return self._frames
+
+
+    def next_frame(self):
+        """ Terminate current frame and return it """
+
+        frame = self._frame
+        self._frames.append(frame)
+        self._frame = Frame()
+        return frame
+
+
+    def reset(self):
+        """ Forget about all recorded frames """
+
+        self._frame = Frame()
+        self._frames = collections.deque(maxlen=self._maxframes)
+
+
+
+# ---------------------------------------------------------- Backend proxy ---
+class _Proxy(object):
+    """ Forward attribute access to the current backend """
+
+    def __getattr__(self, name):
+        return getattr(_backend, name)
+
+gl = _Proxy()
+
+try:
+    _backend = OpenGLBackend()
+except ImportError:
+    _backend = NullBackend()
+
+
+def use(backend):
+    """ Set the current backend and return the previous one """
+
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
+
+
+def current():
+    """ Current backend """
+
+    return _backend
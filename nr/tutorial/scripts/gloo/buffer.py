@@ -4,10 +4,44 @@
 # Distributed under the terms of the new BSD License.
 # -----------------------------------------------------------------------------
 import numpy as np
-import OpenGL.GL as gl
+from backend import gl
 
-from debug import log
+from debug import log, count, timer
 from globject import GLObject
+import mesh
+
+
+# Estimated cost of a glBufferSubData call (in uploaded bytes): gaps smaller
+# than this between updated elements are cheaper to upload than to skip
+call_cost = 4096
+
+
+# ------------------------------------------------------------------- runs ---
+def runs(indices, gap=0):
+    """
+    Group indices into runs of consecutive indices.
+
+    Parameters
+    ----------
+
+    indices : array of ints
+        Sorted unique indices
+
+    gap : int
+        Runs separated by at most gap missing indices are merged
+
+    Returns the (starts, stops) arrays of the runs, the run i covering the
+    indices from starts[i] to stops[i] (excluded).
+    """
+
+    indices = np.asarray(indices)
+    if not len(indices):
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    breaks = np.nonzero(np.diff(indices) > gap+1)[0] + 1
+    starts = indices[np.r_[0, breaks]]
+    stops = indices[np.r_[breaks-1, len(indices)-1]] + 1
+    return starts, stops
+
 
 
 # WARNING: If we have a view on a base buffer and if this buffer is resized, we
@@ -123,6 +157,7 @@ class Buffer(GLObject):
         """ Create buffer on GPU """
 
         log("GPU: Creating buffer")
+        count('buffer.create')
         self._handle = gl.glGenBuffers(1)
 
 
@@ -130,14 +165,16 @@ class Buffer(GLObject):
         """ Delete buffer from GPU """
 
         log("GPU: Deleting buffer")
+        count('buffer.delete')
         gl.glDeleteBuffers(1 , [self._handle])
 
 
     def _resize(self):
         """ """
 
-        log("GPU: Resizing buffer(%d bytes)"% self._nbytes)
-        gl.glBufferData(self._target, self._nbytes, None, self._usage)
+        log("GPU: Resizing buffer(%d bytes)", self._nbytes)
+        with timer('buffer.resize', self._nbytes):
+            gl.glBufferData(self._target, self._nbytes, None, self._usage)
         self._need_resize = False
 
 
@@ -145,6 +182,7 @@ class Buffer(GLObject):
         """ Bind the buffer to some target """
 
         log("GPU: Activating buffer")
+        count('buffer.activate')
         gl.glBindBuffer(self._target, self._handle)
 
 
@@ -165,10 +203,11 @@ class Buffer(GLObject):
             self._resize()
             self._need_resize = False
 
-        log("GPU: Updating buffer (%d pending operation(s))" % len(self._pending_data))
+        log("GPU: Updating buffer (%d pending operation(s))", len(self._pending_data))
         while self._pending_data:
             data, nbytes, offset = self._pending_data.pop(0)
-            gl.glBufferSubData(self._target, offset, nbytes, data)
+            with timer('buffer.upload', nbytes):
+                gl.glBufferSubData(self._target, offset, nbytes, data)
 
 
 
@@ -454,6 +493,14 @@ class DataBuffer(Buffer):
             self.set_data(self._data, offset=0,copy=False)
             return
 
+        # Setting scattered elements (of a field of the base buffer)
+        elif isinstance(key, (list, np.ndarray)):
+            if self.base is not None and isinstance(self._key, str):
+                self.base.scatter(key, data, key=self._key)
+            else:
+                self.scatter(key, data)
+            return
+
         elif key == Ellipsis and self.base is not None:
             # WARNING: do we check data size
             #          or do we let numpy raises an error ?
@@ -468,6 +515,9 @@ class DataBuffer(Buffer):
             start, stop, step = key, key+1, 1
         elif isinstance(key, slice):
             start, stop, step = key.indices(self.size)
+            if step != 1 and self.base is None:
+                self.scatter(np.arange(start, stop, step), data)
+                return
             if stop < start:
                 start, stop = stop, start
         elif key == Ellipsis:
@@ -520,6 +570,103 @@ class DataBuffer(Buffer):
                 "Cannot set non contiguous data on buffer without CPU storage")
 
 
+    def scatter(self, indices, data, key=None, gap=None, density=0.25):
+        """ Set scattered elements (deferred operation)
+
+        Indices are sorted and grouped into runs of consecutive elements and
+        each run is uploaded as a sub-range of the buffer. With CPU storage,
+        runs separated by at most `gap` elements are merged (the elements in
+        between are uploaded again, but this saves a call per merged run) and
+        the whole buffer is uploaded at once when the runs cover more than
+        `density` of the buffer. Without CPU storage, there is one upload per
+        run of consecutive indices.
+
+        Parameters
+        ----------
+
+        indices : array of ints or of bools
+            Indices of the elements to be set (the last value is kept for
+            repeated indices), or boolean mask of the buffer size
+
+        data : np.array
+            Values of the elements (or of the field `key` of the elements)
+
+        key : str
+            Field to be set (CPU storage is needed if the buffer has several
+            fields)
+
+        gap : int
+            Maximum number of elements between merged runs (default is the
+            number of elements whose upload costs as much as a call)
+
+        density : float
+            Fraction of the buffer above which the whole buffer is uploaded
+        """
+
+        if self.base is not None:
+            raise ValueError("Cannot set data on a non-base buffer")
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            # Boolean mask (not 0/1 indices)
+            if indices.size != self.size:
+                raise IndexError("Boolean mask size does not match buffer size")
+            indices = np.nonzero(indices.ravel())[0]
+        indices = np.array(indices, dtype=np.int64).ravel()
+        indices[indices < 0] += self.size
+        if len(indices) and (indices.min() < 0 or indices.max() >= self.size):
+            raise IndexError("Buffer assignment index out of range")
+
+        # Values given for the single field of a structured buffer
+        data = np.asarray(data)
+        names = self.dtype.names
+        if key is None and names and len(names) == 1 and data.dtype.names is None:
+            key = names[0]
+
+        # With CPU storage, runs are uploaded from the storage
+        if self._data is not None:
+            if key is not None:
+                self._data[key][indices] = data
+            else:
+                self._data[indices] = data
+            if gap is None:
+                gap = call_cost // self.itemsize
+            indices = np.unique(indices)
+            starts, stops = runs(indices, gap)
+            covered = (stops - starts).sum()
+            count('buffer.scatter')
+            log("GPU: Scatter %d elements (%d runs)", len(indices), len(starts))
+            if covered > density * self.size:
+                self.set_data(self._data, offset=0, copy=False)
+                return
+            for start, stop in zip(starts, stops):
+                self.set_data(self._data[start:stop],
+                              offset=start*self.itemsize, copy=False)
+            return
+
+        # Without CPU storage, values are sorted along with their indices and
+        # only exact runs can be uploaded (the other fields must be given too)
+        if key is not None and len(names) > 1:
+            raise ValueError(
+                "Cannot set a field on buffer without CPU storage")
+        values = np.empty(len(indices), dtype=self.dtype)
+        if key is not None:
+            values[key] = data
+        else:
+            values[...] = data
+        order = np.argsort(indices, kind='mergesort')
+        indices, values = indices[order], values[order]
+        last = np.r_[indices[1:] != indices[:-1], True]
+        indices, values = indices[last], values[last]
+        starts, stops = runs(indices)
+        count('buffer.scatter')
+        log("GPU: Scatter %d elements (%d runs)", len(indices), len(starts))
+        i = 0
+        for start, stop in zip(starts, stops):
+            n = stop - start
+            self.set_data(values[i:i+n], offset=start*self.itemsize, copy=False)
+            i += n
+
+
 
 # ------------------------------------------------------ VertexBuffer class ---
 class VertexBuffer(DataBuffer):
@@ -607,8 +754,8 @@ class IndexBuffer(DataBuffer):
     IndexBuffer represents indices data that can be uploaded to GPU memory.
     """
 
-    def __init__(self, data=None, dtype=np.uint32, size=0, store=True,
-                       copy=False, resizeable=True, *args, **kwargs):
+    def __init__(self, data=None, dtype=None, size=0, store=True,
+                       copy=False, resizeable=True, optimize=False, *args, **kwargs):
         """
         Initialize the buffer
 
@@ -619,7 +766,9 @@ class IndexBuffer(DataBuffer):
             Buffer data (optional)
 
         dtype : np.dtype
-           Buffer data type (optional)
+           Buffer data type (optional, default is the narrowest type able to
+           hold the indices of data, or np.uint32 without data). ValueError
+           is raised if the indices of data do not fit in it
 
         size : int
            Buffer size (optional)
@@ -632,6 +781,15 @@ class IndexBuffer(DataBuffer):
 
         resizeable : boolean
             Indicates whether buffer is resizeable
+
+        optimize : boolean
+            Reorder the triangles of data (triangle list) for vertex cache reuse
+
+        Note
+        ----
+
+        The type is chosen when the buffer is created: give an explicit dtype
+        if larger indices are to be set later.
         """
 
         # We don't want these two parameters to be seen from outside
@@ -642,12 +800,29 @@ class IndexBuffer(DataBuffer):
         if dtype and not np.dtype(dtype).isbuiltin:
             raise TypeError("Element buffer dtype cannot be structured")
 
-        if isinstance(data,np.ndarray):
+        if base is not None:
+            dtype = base.dtype
+        elif data is not None:
+            data = np.asarray(data)
             if not data.dtype.isbuiltin:
                 raise TypeError("Element buffer dtype cannot be structured")
-            else:
-                dtype = data.dtype
-        elif dtype not in [np.uint8, np.uint16, np.uint32]:
+            if optimize:
+                data = mesh.optimize(data)
+            if data.size and data.min() < 0:
+                raise ValueError("Negative index in IndexBuffer data")
+            # Narrowest type holding all the indices
+            if dtype is None:
+                dtype = mesh.index_dtype(int(data.max()) + 1 if data.size else 0)
+            elif (data.size and np.dtype(dtype).kind == 'u' and
+                  int(data.max()) > np.iinfo(dtype).max):
+                raise ValueError("Index %d does not fit in IndexBuffer dtype %s"
+                                 % (int(data.max()), np.dtype(dtype)))
+            if data.dtype != dtype:
+                data = data.astype(dtype)
+        elif dtype is None:
+            dtype = np.uint32
+
+        if np.dtype(dtype) not in [np.uint8, np.uint16, np.uint32]:
             raise TypeError("Data type not allowed for IndexBuffer")
 
         DataBuffer.__init__(self, data=data, dtype=dtype, size=size, base=base,
@@ -4,33 +4,132 @@
 # Copyright (c) 2013, Nicolas P. Rougier. All rights reserved.
 # Distributed under the terms of the new BSD License.
 # -----------------------------------------------------------------------------
+"""
+Logging and instrumentation of GPU operations.
+
+Both are disabled by default and cost a function call and a test when
+disabled: messages are only formatted when verbose and counters are only
+updated when instrumentation is enabled.
+
+Operations are named "object.operation" (e.g. "buffer.upload") and each
+one records a count, a number of bytes and a cumulated time::
+
+    from gloo import debug
+    debug.enable()
+    ... draw some frames ...
+    stats = debug.snapshot()
+    print(stats['buffer.upload']['bytes'])
+    debug.reset()
+"""
 from __future__ import print_function
+import time
+
+# Whether log messages are printed
+_verbose = False
+
+# Whether operations are counted and timed
+_enabled = False
+
+# operation -> [count, bytes, time]
+_stats = {}
+
+
+def log(message, *args):
+    """ Log a message (formatted with args only if verbose) """
+
+    if _verbose:
+        if args:
+            message = message % args
+        print(message)
+
+
+def enable(verbose=False):
+    """ Enable instrumentation (and optionally logging) """
+
+    global _enabled, _verbose
+    _enabled = True
+    _verbose = verbose
+
+
+def disable():
+    """ Disable instrumentation and logging """
+
+    global _enabled, _verbose
+    _enabled = False
+    _verbose = False
+
+
+def count(operation, nbytes=0):
+    """ Count one operation (and the bytes it involved) """
+
+    if not _enabled:
+        return
+    entry = _stats.get(operation)
+    if entry is None:
+        entry = _stats[operation] = [0, 0, 0.0]
+    entry[0] += 1
+    entry[1] += nbytes
+
+
+def timer(operation, nbytes=0):
+    """ Context manager counting and timing one operation """
+
+    if not _enabled:
+        return _null_timer
+    return _Timer(operation, nbytes)
+
+
+def snapshot():
+    """ Return a copy of the current counters
+
+    Returns
+    -------
+
+    A dict operation -> {'count', 'bytes', 'time'}
+    """
+
+    return dict((operation, {'count' : c, 'bytes' : b, 'time' : t})
+                for operation, (c, b, t) in _stats.items())
+
+
+def reset():
+    """ Reset all counters """
+
+    _stats.clear()
+
+
+
+class _Timer(object):
+    """ Time a block and record it """
+
+    __slots__ = ('_operation', '_nbytes', '_start')
+
+    def __init__(self, operation, nbytes):
+        self._operation = operation
+        self._nbytes = nbytes
 
-# import logging
-# log = logging.getLogger('gloo')
-# log.setLevel(logging.INFO)
+    def __enter__(self):
+        self._start = time.time()
+        return self
 
-# create console handler and set level to debug
-# ch = logging.StreamHandler()
-# ch.setLevel(logging.INFO)
+    def __exit__(self, *exc):
+        # Instrumentation may have been disabled meanwhile
+        if _enabled:
+            elapsed = time.time() - self._start
+            count(self._operation, self._nbytes)
+            _stats[self._operation][2] += elapsed
+        return False
 
-# create formatter
-# formatter = logging.Formatter('%(levelname)s: %(message)s')
 
-# add formatter to ch
-# ch.setFormatter(formatter)
+class _NullTimer(object):
+    """ Do nothing timer (when instrumentation is disabled) """
 
-# add ch to logger
-# log.addHandler(ch)
+    __slots__ = ()
 
-# 'application' code
-# log.debug('debug message')
-# log.info('info message')
-# log.warn('warn message')
-# log.error('error message')
-# log.critical('critical message')
+    def __enter__(self):
+        return self
 
-def log(*args, **kwargs):
-    """ Log """
+    def __exit__(self, *exc):
+        return False
 
-    if 0: print(*args, **kwargs)
+_null_timer = _NullTimer()
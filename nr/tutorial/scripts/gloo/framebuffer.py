@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+Framebuffer objects (render to texture).
+
+A FrameBuffer renders into a color attachment (a Texture2D, to be sampled
+later, or a RenderBuffer) and optional depth and stencil RenderBuffers. Like
+other gloo objects, creation, storage allocation and attachment are deferred
+until the framebuffer is activated.
+
+Example::
+
+    color = Texture2D(shape=(512,512,4), dtype=np.uint8, store=False)
+    framebuffer = FrameBuffer(color=color, depth=RenderBuffer((512,512)))
+    framebuffer.activate()
+    ... # draw
+    framebuffer.deactivate()
+    program['texture'] = color
+"""
+from backend import gl
+
+from debug import log, count
+from globject import GLObject
+from texture import Texture2D
+
+
+
+# ------------------------------------------------------ RenderBuffer class ---
+class RenderBuffer(GLObject):
+    """ Renderbuffer (framebuffer storage that cannot be sampled) """
+
+    def __init__(self, shape, format=None):
+        """
+        Initialize the renderbuffer
+
+        Parameters
+        ----------
+
+        shape : tuple of integers
+            Renderbuffer shape (height, width)
+
+        format : GLEnum
+            Internal format (default is gl.GL_DEPTH_COMPONENT16)
+        """
+
+        GLObject.__init__(self)
+        if format is None:
+            format = gl.GL_DEPTH_COMPONENT16
+        self._shape = tuple(shape[:2])
+        self._format = format
+        self._need_resize = True
+
+
+    @property
+    def shape(self):
+        """ Renderbuffer shape """
+
+        return self._shape
+
+
+    @property
+    def format(self):
+        """ Renderbuffer internal format """
+
+        return self._format
+
+
+    def resize(self, shape):
+        """ Resize the renderbuffer (deferred operation) """
+
+        shape = tuple(shape[:2])
+        if shape != self._shape:
+            self._shape = shape
+            self._need_resize = True
+            self._need_update = True
+
+
+    def _create(self):
+        """ Create renderbuffer on GPU """
+
+        log("GPU: Creating renderbuffer")
+        count('renderbuffer.create')
+        self._handle = gl.glGenRenderbuffers(1)
+
+
+    def _delete(self):
+        """ Delete renderbuffer from GPU """
+
+        log("GPU: Deleting renderbuffer")
+        gl.glDeleteRenderbuffers(1, [self._handle])
+
+
+    def _activate(self):
+        """ Bind the renderbuffer """
+
+        gl.glBindRenderbuffer(gl.GL_RENDERBUFFER, self._handle)
+
+
+    def _deactivate(self):
+        """ Unbind the renderbuffer """
+
+        gl.glBindRenderbuffer(gl.GL_RENDERBUFFER, 0)
+
+
+    def _update(self):
+        """ Allocate storage on GPU """
+
+        if self._need_resize:
+            height, width = self._shape
+            log("GPU: Resizing renderbuffer (%dx%d)", width, height)
+            gl.glRenderbufferStorage(gl.GL_RENDERBUFFER, self._format,
+                                     width, height)
+            self._need_resize = False
+
+
+
+# ------------------------------------------------------- FrameBuffer class ---
+class FrameBuffer(GLObject):
+    """ Framebuffer object """
+
+    def __init__(self, color=None, depth=None, stencil=None):
+        """
+        Initialize the framebuffer
+
+        Parameters
+        ----------
+
+        color : Texture2D or RenderBuffer
+            Color attachment
+
+        depth : RenderBuffer
+            Depth attachment (optional)
+
+        stencil : RenderBuffer
+            Stencil attachment (optional)
+        """
+
+        GLObject.__init__(self)
+        self._color = color
+        self._depth = depth
+        self._stencil = stencil
+
+
+    @property
+    def color(self):
+        """ Color attachment """
+
+        return self._color
+
+    @color.setter
+    def color(self, value):
+        """ Color attachment """
+
+        self._color = value
+        self._need_update = True
+
+
+    @property
+    def depth(self):
+        """ Depth attachment """
+
+        return self._depth
+
+    @depth.setter
+    def depth(self, value):
+        """ Depth attachment """
+
+        self._depth = value
+        self._need_update = True
+
+
+    @property
+    def stencil(self):
+        """ Stencil attachment """
+
+        return self._stencil
+
+    @stencil.setter
+    def stencil(self, value):
+        """ Stencil attachment """
+
+        self._stencil = value
+        self._need_update = True
+
+
+    @property
+    def shape(self):
+        """ Framebuffer shape (height, width) """
+
+        for attachment in (self._color, self._depth, self._stencil):
+            if attachment is not None:
+                return tuple(attachment.shape[:2])
+        return (0, 0)
+
+
+    def resize(self, shape):
+        """ Resize all attachments (deferred operation) """
+
+        shape = tuple(shape[:2])
+        for attachment in (self._color, self._depth, self._stencil):
+            if isinstance(attachment, Texture2D):
+                attachment.resize(shape + attachment.shape[2:])
+            elif attachment is not None:
+                attachment.resize(shape)
+
+
+    def _attachments(self):
+        """ List of (attachment point, attachment) """
+
+        return [(point, attachment) for point, attachment in
+                ((gl.GL_COLOR_ATTACHMENT0, self._color),
+                 (gl.GL_DEPTH_ATTACHMENT, self._depth),
+                 (gl.GL_STENCIL_ATTACHMENT, self._stencil))
+                if attachment is not None]
+
+
+    def _create(self):
+        """ Create framebuffer on GPU """
+
+        log("GPU: Creating framebuffer")
+        count('framebuffer.create')
+        self._handle = gl.glGenFramebuffers(1)
+
+
+    def _delete(self):
+        """ Delete framebuffer from GPU """
+
+        log("GPU: Deleting framebuffer")
+        gl.glDeleteFramebuffers(1, [self._handle])
+
+
+    def _activate(self):
+        """ Bind the framebuffer (attachments storage is updated first) """
+
+        log("GPU: Activating framebuffer")
+        count('framebuffer.activate')
+        for point, attachment in self._attachments():
+            if attachment._need_create or attachment._need_update:
+                attachment.activate()
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, self._handle)
+
+
+    def _deactivate(self):
+        """ Bind the default framebuffer """
+
+        log("GPU: Deactivating framebuffer")
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, 0)
+
+
+    def _update(self):
+        """ Attach attachments and check completeness """
+
+        log("GPU: Attaching framebuffer")
+        for point, attachment in self._attachments():
+            if isinstance(attachment, Texture2D):
+                gl.glFramebufferTexture2D(gl.GL_FRAMEBUFFER, point,
+                                          gl.GL_TEXTURE_2D, attachment.handle, 0)
+            else:
+                gl.glFramebufferRenderbuffer(gl.GL_FRAMEBUFFER, point,
+                                             gl.GL_RENDERBUFFER, attachment.handle)
+        status = gl.glCheckFramebufferStatus(gl.GL_FRAMEBUFFER)
+        if status != gl.GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError("Framebuffer is not complete (0x%x)" % status)
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+Layer cache.
+
+Static parts of a scene (grid, axes, channels that did not change) are
+rendered once into their own texture and composited. Only invalidated layers
+are rendered again; the layers are then composited (in order, with alpha
+blending) into a single texture such that a frame where nothing changed only
+costs one full-screen quad.
+
+Layers are drawn with straight alpha (blending is enabled by the cache before
+each layer is drawn) and stored premultiplied, such that alpha is applied once
+whatever the number of layers. GL_BLEND is disabled after draw.
+
+Example::
+
+    layers = LayerCache((height, width))
+    layers.add('grid', draw_grid)
+    layers.add('signals', draw_signals)
+    ...
+    layers.invalidate('signals')  # signals will be rendered again
+    layers.draw()                 # render invalid layers, draw the result
+"""
+import numpy as np
+from backend import gl
+
+from debug import log, count
+from program import Program
+from texture import Texture2D
+from framebuffer import FrameBuffer
+
+
+vertex = """
+    attribute vec2 position;
+    attribute vec2 texcoord;
+    varying vec2 v_texcoord;
+    void main()
+    {
+        v_texcoord = texcoord;
+        gl_Position = vec4(position, 0.0, 1.0);
+    } """
+
+fragment = """
+    uniform sampler2D texture;
+    varying vec2 v_texcoord;
+    void main()
+    {
+        gl_FragColor = texture2D(texture, v_texcoord);
+    } """
+
+
+
+# -------------------------------------------------------- LayerCache class ---
+class LayerCache(object):
+    """ Layers rendered to textures, re-rendered only when invalidated """
+
+    def __init__(self, shape, clear_color=(0,0,0,0)):
+        """
+        Initialize the cache
+
+        Parameters
+        ----------
+
+        shape : tuple of integers
+            Shape of the layers (height, width), usually the viewport shape
+
+        clear_color : tuple of floats
+            Color the layers are cleared with before being rendered
+            (premultiplied)
+        """
+
+        self._shape = tuple(shape[:2])
+        self._clear_color = clear_color
+        self._layers = []
+        self._composite = self._framebuffer()
+        self._valid = False
+        self._rendered = 0
+
+        self._program = Program(vertex, fragment, count=4)
+        self._program['position'] = [ (-1,-1), (-1,+1), (+1,-1), (+1,+1) ]
+        self._program['texcoord'] = [ ( 0, 0), ( 0, 1), ( 1, 0), ( 1, 1) ]
+
+
+    def _framebuffer(self):
+        """ Framebuffer with a RGBA texture of the cache shape """
+
+        color = Texture2D(shape=self._shape + (4,), dtype=np.dtype(np.uint8),
+                          store=False)
+        return FrameBuffer(color=color)
+
+
+    @property
+    def shape(self):
+        """ Shape of the layers """
+
+        return self._shape
+
+
+    @property
+    def names(self):
+        """ Layer names, from bottom to top """
+
+        return [layer['name'] for layer in self._layers]
+
+
+    @property
+    def rendered(self):
+        """ Number of layers rendered by the last draw """
+
+        return self._rendered
+
+
+    def add(self, name, draw):
+        """
+        Add a layer on top of the others.
+
+        Parameters
+        ----------
+
+        name : str
+            Layer name
+
+        draw : callable
+            Function drawing the layer (called without arguments, the layer
+            framebuffer being bound)
+        """
+
+        if name in self.names:
+            raise ValueError("Layer %s already exists" % name)
+        self._layers.append({ 'name' : name, 'draw' : draw, 'valid' : False,
+                              'framebuffer' : self._framebuffer() })
+        self._valid = False
+
+
+    def remove(self, name):
+        """ Remove a layer """
+
+        self._layers = [layer for layer in self._layers if layer['name'] != name]
+        self._valid = False
+
+
+    def invalidate(self, name=None):
+        """ Invalidate a layer (all layers if name is None) """
+
+        for layer in self._layers:
+            if name is None or layer['name'] == name:
+                layer['valid'] = False
+        self._valid = False
+
+
+    def resize(self, shape):
+        """ Resize the layers (all of them are rendered again) """
+
+        shape = tuple(shape[:2])
+        if shape == self._shape:
+            return
+        self._shape = shape
+        self._composite.resize(shape)
+        for layer in self._layers:
+            layer['framebuffer'].resize(shape)
+        self.invalidate()
+
+
+    def _quad(self, texture):
+        """ Draw a texture on a full-screen quad """
+
+        if self._program['texture'] is not texture:
+            self._program['texture'] = texture
+        self._program.draw(gl.GL_TRIANGLE_STRIP)
+
+
+    def draw(self):
+        """ Render the invalid layers and draw the composited layers """
+
+        height, width = self._shape
+        self._rendered = 0
+        for layer in self._layers:
+            if layer['valid']:
+                continue
+            log("Rendering layer %s", layer['name'])
+            count('layer.render')
+            framebuffer = layer['framebuffer']
+            framebuffer.activate()
+            gl.glViewport(0, 0, width, height)
+            gl.glClearColor(*self._clear_color)
+            gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+            # Straight alpha colors are stored premultiplied (a*c, a)
+            gl.glEnable(gl.GL_BLEND)
+            gl.glBlendFuncSeparate(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA,
+                                   gl.GL_ONE, gl.GL_ONE_MINUS_SRC_ALPHA)
+            layer['draw']()
+            framebuffer.deactivate()
+            layer['valid'] = True
+            self._rendered += 1
+
+        # Textures are premultiplied: alpha must not be applied again
+        gl.glEnable(gl.GL_BLEND)
+        gl.glBlendFunc(gl.GL_ONE, gl.GL_ONE_MINUS_SRC_ALPHA)
+        if not self._valid:
+            self._composite.activate()
+            gl.glViewport(0, 0, width, height)
+            gl.glClearColor(*self._clear_color)
+            gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+            for layer in self._layers:
+                self._quad(layer['framebuffer'].color)
+            self._composite.deactivate()
+            self._valid = True
+        gl.glViewport(0, 0, width, height)
+        self._quad(self._composite.color)
+        gl.glDisable(gl.GL_BLEND)
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+Vertex layout planner.
+
+A structured array stored in a single VertexBuffer is interleaved: setting one
+of its fields uploads the whole buffer, static fields included. The planner
+groups the fields by update frequency and each group is stored in its own
+(interleaved) VertexBuffer, such that updating a dynamic field only uploads
+the fields updated at the same frequency.
+
+Frequency hints are the GL usage hints:
+
+  - 'static' : set once (default)
+  - 'dynamic' : updated from time to time
+  - 'stream' : updated every frame
+
+Example::
+
+    V = np.zeros(n, [('position', np.float32, 3),
+                     ('color',    np.float32, 4),
+                     ('radius',   np.float32, 1)])
+    layout = VertexLayout(V, {'position' : 'stream'})
+    program.bind(layout)
+    ...
+    program['position'] = P  # only positions are uploaded
+    print(layout.report())   # bytes uploaded per frame for each layout
+"""
+import numpy as np
+from backend import gl
+
+from buffer import VertexBuffer
+
+
+# Usage of the buffer of each frequency, from the less to the most frequent
+frequencies = ['static', 'dynamic', 'stream']
+usages = { 'static'  : gl.GL_STATIC_DRAW,
+           'dynamic' : gl.GL_DYNAMIC_DRAW,
+           'stream'  : gl.GL_STREAM_DRAW }
+
+
+
+# ------------------------------------------------------------------- plan ---
+def plan(dtype, hints=None):
+    """
+    Group the fields of a structured dtype by update frequency.
+
+    Parameters
+    ----------
+
+    dtype : np.dtype
+        Structured dtype
+
+    hints : dict
+        Update frequency of fields ('static', 'dynamic' or 'stream'), fields
+        not in hints are static
+
+    Returns a list of (frequency, dtype) for the non empty groups, fields
+    keeping their order within a group.
+    """
+
+    dtype = np.dtype(dtype)
+    hints = hints or {}
+    for name, frequency in hints.items():
+        if name not in dtype.names:
+            raise ValueError("Unknown field %s" % name)
+        if frequency not in frequencies:
+            raise ValueError("Unknown update frequency %s" % frequency)
+
+    groups = []
+    for frequency in frequencies:
+        fields = [(name, dtype[name]) for name in dtype.names
+                  if hints.get(name, 'static') == frequency]
+        if fields:
+            groups.append((frequency, np.dtype(fields)))
+    return groups
+
+
+def bytes_per_frame(dtype, size, groups, updated):
+    """
+    Bytes uploaded when some fields are set.
+
+    Parameters
+    ----------
+
+    dtype : np.dtype
+        Structured dtype of all the fields
+
+    size : int
+        Number of vertices
+
+    groups : list
+        Groups of fields as returned by plan
+
+    updated : list of str
+        Fields that are set
+
+    Returns the (interleaved, split) bytes uploaded, with a single interleaved
+    buffer and with one buffer per group.
+    """
+
+    dtype = np.dtype(dtype)
+    interleaved = size * dtype.itemsize if updated else 0
+    split = sum(size * gtype.itemsize for _, gtype in groups
+                if set(gtype.names) & set(updated))
+    return interleaved, split
+
+
+
+# ------------------------------------------------------- VertexLayout class ---
+class VertexLayout(object):
+    """
+    Structured vertex data split into one VertexBuffer per update frequency.
+
+    A layout can be bound to a program like a VertexBuffer, fields being then
+    set through the program (program['name'] = data) or the layout itself
+    (layout['name'] = data).
+    """
+
+    def __init__(self, data, hints=None):
+        """
+        Initialize the layout
+
+        Parameters
+        ----------
+
+        data : np.ndarray
+            Structured vertex data
+
+        hints : dict
+            Update frequency of fields ('static', 'dynamic' or 'stream')
+        """
+
+        data = np.asarray(data)
+        if data.dtype.names is None:
+            raise TypeError("Layout data must be structured")
+        self._dtype = data.dtype
+        self._size = data.size
+        self._hints = dict(hints or {})
+        self._groups = plan(self._dtype, self._hints)
+
+        self._buffers = []
+        self._fields = {}
+        for frequency, dtype in self._groups:
+            group = np.zeros(self._size, dtype=dtype)
+            for name in dtype.names:
+                group[name] = data[name]
+            buffer = VertexBuffer(group)
+            buffer._usage = usages[frequency]
+            self._buffers.append(buffer)
+            for name in dtype.names:
+                self._fields[name] = buffer
+
+
+    @property
+    def dtype(self):
+        """ Structured dtype of all the fields """
+
+        return self._dtype
+
+
+    @property
+    def size(self):
+        """ Number of vertices """
+
+        return self._size
+
+
+    @property
+    def groups(self):
+        """ List of (frequency, dtype) of the buffers """
+
+        return self._groups
+
+
+    @property
+    def buffers(self):
+        """ Vertex buffers, one per group """
+
+        return self._buffers
+
+
+    def __getitem__(self, name):
+        """ View on the field of its group buffer """
+
+        return self._fields[name][name]
+
+
+    def __setitem__(self, name, data):
+        """ Set a field (deferred operation), only its group is uploaded """
+
+        self._fields[name][name] = data
+
+
+    def report(self, updated=None):
+        """
+        Return the bytes uploaded per frame with an interleaved buffer and
+        with this layout, as a dict {'interleaved' : bytes, 'split' : bytes}.
+
+        updated is the list of fields set each frame (default is the 'stream'
+        fields).
+        """
+
+        if updated is None:
+            updated = [name for name, frequency in self._hints.items()
+                       if frequency == 'stream']
+        interleaved, split = bytes_per_frame(self._dtype, self._size,
+                                             self._groups, updated)
+        return { 'interleaved' : interleaved, 'split' : split }
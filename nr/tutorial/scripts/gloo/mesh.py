@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+Mesh processing on the CPU (no GL needed).
+
+  - index_dtype : narrowest index type for a given number of vertices
+  - acmr : average cache miss ratio of a triangle list
+  - optimize : reordering of a triangle list for the post-transform vertex
+               cache (Tom Forsyth, "Linear-Speed Vertex Cache Optimisation")
+  - weld : removal of duplicated vertices
+
+The post-transform cache keeps the last transformed vertices such that a
+vertex shared by consecutive triangles is only transformed once. The ACMR is
+the number of vertices transformed per triangle: 3 without any reuse, 0.5 at
+best for a large regular grid.
+"""
+import numpy as np
+
+from debug import log
+
+
+# ----------------------------------------------------------- index_dtype ---
+def index_dtype(n):
+    """ Narrowest unsigned type able to index n vertices """
+
+    if n <= 2**8:
+        return np.dtype(np.uint8)
+    elif n <= 2**16:
+        return np.dtype(np.uint16)
+    return np.dtype(np.uint32)
+
+
+
+# ------------------------------------------------------------------ acmr ---
+def acmr(indices, cache_size=16):
+    """
+    Average cache miss ratio of a triangle list.
+
+    Parameters
+    ----------
+
+    indices : array of ints
+        Triangle list (3 indices per triangle)
+
+    cache_size : int
+        Size of the (FIFO) post-transform vertex cache
+
+    Returns the number of cache misses per triangle.
+    """
+
+    indices = np.asarray(indices).ravel()
+    if len(indices) < 3:
+        return 0.0
+    cache = []
+    cached = set()
+    misses = 0
+    for index in indices.tolist():
+        if index not in cached:
+            misses += 1
+            cache.append(index)
+            cached.add(index)
+            if len(cache) > cache_size:
+                cached.discard(cache.pop(0))
+    return misses / float(len(indices) // 3)
+
+
+
+# -------------------------------------------------------------- optimize ---
+# Score parameters from Forsyth's article
+_cache_decay_power = 1.5
+_last_triangle_score = 0.75
+_valence_boost_scale = 2.0
+_valence_boost_power = 0.5
+
+
+def _vertex_score(position, remaining, cache_size):
+    """ Score of a vertex given its cache position and remaining triangles """
+
+    if remaining == 0:
+        return -1.0
+    score = 0.0
+    if position >= 0:
+        if position < 3:
+            # The vertices of the last triangle get a fixed score such that
+            # the next triangle does not just reuse the same edge
+            score = _last_triangle_score
+        else:
+            scale = 1.0 / (cache_size - 3)
+            score = (1.0 - (position - 3) * scale) ** _cache_decay_power
+    return score + _valence_boost_scale * remaining ** -_valence_boost_power
+
+
+def optimize(indices, cache_size=32):
+    """
+    Reorder the triangles of a triangle list for vertex cache reuse.
+
+    Parameters
+    ----------
+
+    indices : array of ints
+        Triangle list (3 indices per triangle)
+
+    cache_size : int
+        Size of the (LRU) cache modelled by the scores
+
+    Returns the reordered triangle list (same triangles, same winding).
+    """
+
+    indices = np.asarray(indices)
+    triangles = indices.reshape(-1, 3).tolist()
+    ntriangles = len(triangles)
+    if ntriangles == 0:
+        return indices.copy()
+    nvertices = int(indices.max()) + 1
+
+    # Triangles using each vertex
+    vertex_triangles = [[] for i in range(nvertices)]
+    for t, triangle in enumerate(triangles):
+        for v in triangle:
+            vertex_triangles[v].append(t)
+    remaining = [len(ts) for ts in vertex_triangles]
+    position = [-1] * nvertices
+    vertex_score = [_vertex_score(-1, remaining[v], cache_size)
+                    for v in range(nvertices)]
+    triangle_score = [sum(vertex_score[v] for v in triangle)
+                      for triangle in triangles]
+    emitted = [False] * ntriangles
+
+    order = []
+    cache = []
+    best = max(range(ntriangles), key=triangle_score.__getitem__)
+    next_triangle = 0
+    while len(order) < ntriangles:
+        if best < 0:
+            # No candidate in the cache, take the next triangle not emitted
+            while emitted[next_triangle]:
+                next_triangle += 1
+            best = next_triangle
+
+        order.append(best)
+        emitted[best] = True
+        triangle = triangles[best]
+        for v in triangle:
+            remaining[v] -= 1
+            vertex_triangles[v].remove(best)
+
+        # Vertices of the emitted triangle go to the front of the cache
+        cache = triangle + [v for v in cache if v not in triangle]
+        evicted = cache[cache_size:]
+        cache = cache[:cache_size]
+        for v in evicted:
+            position[v] = -1
+        for i, v in enumerate(cache):
+            position[v] = i
+
+        # Update scores of the vertices that moved and of their triangles
+        changed = set()
+        for v in cache + evicted:
+            score = _vertex_score(position[v], remaining[v], cache_size)
+            if score != vertex_score[v]:
+                vertex_score[v] = score
+                changed.update(vertex_triangles[v])
+        for t in changed:
+            triangle_score[t] = sum(vertex_score[v] for v in triangles[t])
+
+        # Best candidate among the triangles of the cached vertices
+        best, best_score = -1, -1.0
+        for v in cache:
+            for t in vertex_triangles[v]:
+                if triangle_score[t] > best_score:
+                    best, best_score = t, triangle_score[t]
+
+    return indices.reshape(-1, 3)[order].reshape(indices.shape)
+
+
+
+# ------------------------------------------------------------------ weld ---
+def _keys(vertices, tolerance):
+    """
+    Integer keys (one int64 column per component) of the vertices, float
+    components being quantized when tolerance > 0
+    """
+
+    columns = []
+    for name in vertices.dtype.names:
+        values = vertices[name].reshape(len(vertices), -1)
+        kind = values.dtype.kind
+        for j in range(values.shape[1]):
+            column = values[:,j]
+            if kind == 'f' and tolerance > 0:
+                column = np.floor(column / tolerance + 0.5).astype(np.int64)
+            elif kind == 'f':
+                # -0.0 and 0.0 have different bits
+                column = column + column.dtype.type(0)
+                if column.dtype.itemsize == 8:
+                    column = column.view(np.int64)
+                else:
+                    column = column.view('u%d' % column.dtype.itemsize)
+                    column = column.astype(np.int64)
+            else:
+                column = column.astype(np.int64)
+            columns.append(column)
+    return columns
+
+
+def weld(vertices, indices=None, tolerance=0):
+    """
+    Remove duplicated vertices.
+
+    Vertices are hashed and sorted by hash (no Python loop over vertices),
+    vertices being merged only when all their components are equal: a hash
+    collision may leave a duplicate but never merges different vertices.
+
+    Parameters
+    ----------
+
+    vertices : np.ndarray
+        Structured vertex data
+
+    indices : array of ints
+        Indices of the mesh (default is one index per vertex, i.e. vertices
+        is a triangle soup)
+
+    tolerance : float
+        Float components are quantized on a grid of this size before being
+        compared (0 for exact comparison)
+
+    Returns the unique vertices and the remapped indices. Unique vertices are
+    in order of first occurrence in vertices (not in indices) and vertices
+    that indices do not reference are kept.
+    """
+
+    vertices = np.asarray(vertices).ravel()
+    if vertices.dtype.names is None:
+        raise TypeError("Vertices must be structured")
+    n = len(vertices)
+    if indices is None:
+        indices = np.arange(n)
+    indices = np.asarray(indices)
+    if n == 0:
+        return vertices.copy(), indices.copy()
+
+    # FNV-like hash of the keys
+    columns = _keys(vertices, tolerance)
+    h = np.zeros(n, dtype=np.uint64)
+    for column in columns:
+        h = (h * np.uint64(0x100000001B3)) ^ column.view(np.uint64)
+    order = np.argsort(h, kind='mergesort')
+
+    # A group starts where the sorted keys differ from the previous ones
+    start = np.zeros(n, dtype=bool)
+    start[0] = True
+    for column in columns:
+        column = column[order]
+        start[1:] |= column[1:] != column[:-1]
+    group = np.cumsum(start) - 1
+
+    # Groups are numbered in order of first occurrence in vertices (sort is
+    # stable, so the first vertex of a group has the smallest index)
+    first = order[start]
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first, kind='mergesort')] = np.arange(len(first))
+    remap = np.empty(n, dtype=np.int64)
+    remap[order] = rank[group]
+    return vertices[np.sort(first)], remap[indices]
+
+
+def welded(vertices, indices=None, tolerance=0):
+    """
+    Weld vertices and build the corresponding buffers.
+
+    Returns a VertexBuffer of the unique vertices, an IndexBuffer of the
+    remapped indices and a dict with the number of vertices and of bytes
+    before and after welding (as (before, after) tuples).
+    """
+
+    from buffer import VertexBuffer, IndexBuffer
+
+    vertices = np.asarray(vertices).ravel()
+    unique, remapped = weld(vertices, indices, tolerance)
+    V = VertexBuffer(unique)
+    I = IndexBuffer(remapped)
+    before = vertices.nbytes
+    if indices is not None:
+        before += len(remapped) * index_dtype(len(vertices)).itemsize
+    stats = { 'vertices' : (len(vertices), len(unique)),
+              'bytes'    : (before, unique.nbytes + I.nbytes) }
+    log("Welding: %d -> %d vertices", len(vertices), len(unique))
+    return V, I, stats
@@ -4,35 +4,18 @@
 # Distributed under the terms of the new BSD License.
 # -----------------------------------------------------------------------------
 import re
+import ctypes
 import numpy as np
-import OpenGL.GL as gl
+from backend import gl
 
-from debug import log
+from debug import log, count, timer
 from globject import GLObject
 from buffer import VertexBuffer, IndexBuffer
+from layout import VertexLayout
 from shader import VertexShader, FragmentShader
 from variable import gl_typeinfo, Uniform, Attribute
 
 
-# Patch: pythonize the glGetActiveAttrib
-import ctypes
-gl._glGetActiveAttrib = gl.glGetActiveAttrib
-def glGetActiveAttrib(program, index):
-    # Prepare
-    bufsize = 32
-    length = ctypes.c_int()
-    size = ctypes.c_int()
-    type = ctypes.c_int()
-    name = ctypes.create_string_buffer(bufsize)
-    # Call
-    gl._glGetActiveAttrib(program, index,
-                          bufsize, ctypes.byref(length), ctypes.byref(size),
-                          ctypes.byref(type), name)
-    # Return Python objects
-    return name.value, size.value, type.value
-gl.glGetActiveAttrib = glGetActiveAttrib
-
-
 
 
 # ----------------------------------------------------------- Program class ---
@@ -73,6 +56,9 @@ class Program(GLObject):
         self._count = count
         self._buffer = None
 
+        # Uniform groups this program is attached to
+        self._groups = []
+
 
         # Get all vertex shaders
         self._verts = []
@@ -198,7 +184,8 @@ class Program(GLObject):
         log("GPU: Creating program")
 
         # Link the program
-        gl.glLinkProgram(self._handle)
+        with timer('program.create'):
+            gl.glLinkProgram(self._handle)
         if not gl.glGetProgramiv(self._handle, gl.GL_LINK_STATUS):
             print(gl.glGetProgramInfoLog(self._handle))
             raise ShaderException('Linking error')
@@ -233,6 +220,10 @@ class Program(GLObject):
             self._uniforms[name] = uniform
         self._need_update = True
 
+        # New uniforms have none of the group values yet
+        for group in self._groups:
+            group._reset(self)
+
 
     def _build_attributes(self):
         """ Build the attribute objects """
@@ -246,12 +237,34 @@ class Program(GLObject):
             dtype.append(attribute.dtype)
 
 
-    def bind(self, data):
-        """ """
-        if isinstance(data, VertexBuffer):
+    def bind(self, data, divisor=0):
+        """
+        Bind the fields of a vertex buffer or layout to attributes
+
+        Parameters
+        ----------
+
+        data : VertexBuffer or VertexLayout
+            Structured data, fields are bound to attributes of the same name
+
+        divisor : int
+            Divisor of the bound attributes (0 for per-vertex data, n for
+            per-instance data advancing once every n instances)
+        """
+
+        if isinstance(data, (VertexBuffer, VertexLayout)):
             for name in data.dtype.names:
                 if name in self._attributes.keys():
                     self._attributes[name].set_data(data[name])
+                    self._attributes[name].divisor = divisor
+
+
+    def set_divisor(self, name, divisor):
+        """ Set the divisor of an attribute (see bind) """
+
+        if name not in self._attributes.keys():
+            raise ValueError("Unknown attribute")
+        self._attributes[name].divisor = divisor
 
 
     def __setitem__(self, name, data):
@@ -277,8 +290,12 @@ class Program(GLObject):
         """Activate the program as part of current rendering state."""
 
         log("GPU: Activating program")
+        count('program.activate')
         gl.glUseProgram(self.handle)
 
+        for group in self._groups:
+            group._propagate(self)
+
         for uniform in self._uniforms.values():
             if uniform.active:
                 uniform.activate()
@@ -425,7 +442,61 @@ class Program(GLObject):
 
 
 
-    def draw(self, mode = gl.GL_TRIANGLES, indices=None): #first=0, count=None):
+    def _vertex_count(self, instances=None):
+        """
+        Number of vertices of the per-vertex attributes, checking that they all
+        have the same size and that per-instance attributes have enough values
+        for the number of instances.
+        """
+
+        sizes = {}
+        for attribute in self._attributes.values():
+            if not isinstance(attribute.data, VertexBuffer):
+                continue
+            if attribute.divisor == 0:
+                sizes[attribute.name] = attribute.size
+            elif instances is not None:
+                needed = (instances + attribute.divisor - 1) // attribute.divisor
+                if attribute.size < needed:
+                    raise ValueError(
+                        "Attribute %s has %d values, %d are needed for %d instances"
+                        % (attribute.name, attribute.size, needed, instances))
+        if len(set(sizes.values())) > 1:
+            raise ValueError("Per-vertex attributes have different sizes (%s)" %
+                ", ".join("%s: %d" % item for item in sorted(sizes.items())))
+        if not sizes:
+            return 0
+        return list(sizes.values())[0]
+
+
+
+    def _draw_ranges(self, size, first=0, count=None, ranges=None):
+        """
+        List of (first, count) to draw among size vertices (or indices),
+        checking bounds and dropping empty ranges.
+        """
+
+        if ranges is None:
+            if count is None:
+                count = size - first
+            ranges = [(first, count)]
+        elif first != 0 or count is not None:
+            raise ValueError("Give either first/count or ranges, not both")
+
+        checked = []
+        for first, count in ranges:
+            first, count = int(first), int(count)
+            if first < 0 or count < 0 or first + count > size:
+                raise ValueError("Range (%d, %d) is out of bounds (size is %d)"
+                                 % (first, count, size))
+            if count > 0:
+                checked.append((first, count))
+        return checked
+
+
+
+    def draw(self, mode = gl.GL_TRIANGLES, indices=None, first=0, count=None,
+             instances=None, ranges=None):
         """ Draw the attribute arrays in the specified mode.
 
         Parameters
@@ -434,34 +505,58 @@ class Program(GLObject):
             GL_POINTS, GL_LINES, GL_LINE_STRIP, GL_LINE_LOOP,
             GL_TRIANGLES, GL_TRIANGLE_STRIP, GL_TRIANGLE_FAN
 
+        indices : IndexBuffer
+            Indices of the vertices to draw, possibly a view on a larger
+            IndexBuffer. Default all vertices in order.
+
         first : int
-            The starting vertex index in the vertex array. Default 0.
+            The starting vertex (or index if indices are given). Default 0.
 
         count : int
-            The number of vertices to draw. Default all.
+            The number of vertices (or indices) to draw. Default all.
+
+        instances : int
+            Number of instances to draw, per-instance attributes (divisor > 0)
+            advancing once every divisor instances while per-vertex attributes
+            are read again for each instance. Default no instancing.
+
+        ranges : list of (first, count)
+            Several ranges to draw (instead of first and count), each range
+            being a separate primitive (e.g. a separate line strip).
         """
 
+        size = self._vertex_count(instances)
+        if isinstance(indices, IndexBuffer):
+            size = indices.size
+        ranges = self._draw_ranges(size, first, count, ranges)
         self.activate()
-        attributes = self._attributes.values()
-
-        # Get buffer size first attribute
-        # We need more tests here
-        #  - do we have at least 1 attribute ?
-        #  - does all attributes report same count ?
-        # count = (count or attributes[0].size) - first
 
         if isinstance(indices, IndexBuffer):
             indices.activate()
             gltypes = { np.dtype(np.uint8) : gl.GL_UNSIGNED_BYTE,
                         np.dtype(np.uint16): gl.GL_UNSIGNED_SHORT,
                         np.dtype(np.uint32): gl.GL_UNSIGNED_INT }
-            gl.glDrawElements(mode, indices.size, gltypes[indices.dtype], None)
+            gltype = gltypes[np.dtype(indices.dtype)]
+            itemsize = np.dtype(indices.dtype).itemsize
+            for first, count in ranges:
+                # Byte offset in the bound buffer (a view starts at its offset)
+                offset = ctypes.c_void_p(indices.offset + first*itemsize)
+                if instances is None:
+                    gl.glDrawElements(mode, count, gltype, offset)
+                else:
+                    gl.glDrawElementsInstanced(mode, count, gltype, offset,
+                                               instances)
             indices.deactivate()
-        else:
-            #count = (count or attributes[0].size) - first
-            first = 0
-            count = attributes[0].size
+        elif instances is not None:
+            for first, count in ranges:
+                gl.glDrawArraysInstanced(mode, first, count, instances)
+        elif len(ranges) == 1:
+            first, count = ranges[0]
             gl.glDrawArrays(mode, first, count)
+        elif ranges:
+            firsts = np.array([first for first, count in ranges], dtype=np.int32)
+            counts = np.array([count for first, count in ranges], dtype=np.int32)
+            gl.glMultiDrawArrays(mode, firsts, counts, len(ranges))
 
         gl.glBindBuffer( gl.GL_ARRAY_BUFFER, 0 )
         self.deactivate()
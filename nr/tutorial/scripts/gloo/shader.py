@@ -6,11 +6,10 @@
 import re
 import os.path
 import numpy as np
-import OpenGL.GL as gl
+from backend import gl
+from debug import log, timer
 from globject import GLObject
 
-debug = 0
-
 
 # ------------------------------------------------------------ Shader class ---
 class Shader(GLObject):
@@ -99,10 +98,11 @@ class Shader(GLObject):
         # Set shader source
         gl.glShaderSource(self._handle, self._code)
 
-        if debug: print ("GPU: Creating shader")
+        log("GPU: Creating shader")
 
         # Actual compilation
-        gl.glCompileShader(self._handle)
+        with timer('shader.create'):
+            gl.glCompileShader(self._handle)
         status = gl.glGetShaderiv(self._handle, gl.GL_COMPILE_STATUS)
         if not status:
             error = gl.glGetShaderInfoLog(self._handle)
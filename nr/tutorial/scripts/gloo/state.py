@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+GL state cache.
+
+Texture units state (active unit, texture bound to each unit) and texture
+parameters (filters and wrapping) are remembered so that glActiveTexture,
+glBindTexture and glTexParameter are only emitted when the state actually
+changes. Vertex attribute arrays state (enabled, pointer and divisor of each
+location) is remembered the same way: it does not belong to a program, so two
+programs using the same location must each set it again.
+
+This state belongs to a GL context, so the caches are cleared when the backend
+or the current context changes. Code making a context current (a window
+toolkit, an offscreen context) must tell gloo with `make_current`, and code
+outside gloo changing the texture or attribute state must call `reset`.
+"""
+import ctypes
+import backend
+from backend import gl
+
+
+# Current GL context, as told by make_current (None if unknown)
+_context = None
+
+
+def make_current(context):
+    """
+    Tell gloo that context (any object identifying a GL context, None if
+    unknown) is now current: the caches are cleared if it is not the same
+    context as before
+    """
+
+    global _context
+    _context = context
+
+
+def reset():
+    """ Forget the cached state (GL state is unknown) """
+
+    textures.reset()
+    attributes.reset()
+
+
+
+# ------------------------------------------------------ TextureState class ---
+class TextureState(object):
+    """ Texture units and texture parameters cache """
+
+    def __init__(self):
+        self._backend = None
+        self._context = None
+        self.reset()
+
+
+    def reset(self):
+        """ Forget everything (GL state is unknown) """
+
+        self._active = None
+        self._bound = {}
+        self._parameters = {}
+
+
+    def _check(self):
+        """ Forget everything if the backend or the context has changed """
+
+        if self._backend is not backend.current() or \
+           self._context is not _context:
+            self._backend = backend.current()
+            self._context = _context
+            self.reset()
+
+
+    @property
+    def active(self):
+        """ Active texture unit (0 if unknown) """
+
+        self._check()
+        return self._active or 0
+
+
+    def activate(self, unit):
+        """ Make unit the active texture unit """
+
+        self._check()
+        if self._active != unit:
+            gl.glActiveTexture(gl.GL_TEXTURE0 + unit)
+            self._active = unit
+
+
+    def bind(self, target, handle, unit=None):
+        """ Bind texture handle to unit (active unit by default) """
+
+        if unit is None:
+            unit = self.active
+        self.activate(unit)
+        if self._bound.get(unit) != (target, handle):
+            gl.glBindTexture(target, handle)
+            self._bound[unit] = target, handle
+
+
+    def is_bound(self, unit, target, handle):
+        """ Whether texture handle is known to be bound to unit """
+
+        self._check()
+        return self._bound.get(unit) == (target, handle)
+
+
+    def parameterize(self, target, handle, parameters):
+        """
+        Set texture parameters (dict) of the texture handle, which must be
+        bound to the active unit
+        """
+
+        self._check()
+        cached = self._parameters.setdefault(handle, {})
+        for name, value in parameters.items():
+            if cached.get(name) != value:
+                gl.glTexParameterf(target, name, value)
+                cached[name] = value
+
+
+    def forget(self, handle):
+        """ Forget a texture that has been deleted """
+
+        self._check()
+        self._parameters.pop(handle, None)
+        for unit, (target, bound) in list(self._bound.items()):
+            if bound == handle:
+                del self._bound[unit]
+
+
+
+
+# ---------------------------------------------------- AttributeState class ---
+class AttributeState(object):
+    """ Vertex attribute arrays cache """
+
+    def __init__(self):
+        self._backend = None
+        self._context = None
+        self.reset()
+
+
+    def reset(self):
+        """ Forget everything (GL state is unknown) """
+
+        self._enabled = {}
+        self._pointers = {}
+        self._divisors = {}
+
+
+    def _check(self):
+        """ Forget everything if the backend or the context has changed """
+
+        if self._backend is not backend.current() or \
+           self._context is not _context:
+            self._backend = backend.current()
+            self._context = _context
+            self.reset()
+
+
+    def pointer(self, location, handle, size, gtype, stride, offset):
+        """
+        Enable the array of location and make it point to the buffer handle
+        (which must be bound to GL_ARRAY_BUFFER)
+        """
+
+        self._check()
+        if not self._enabled.get(location, False):
+            gl.glEnableVertexAttribArray(location)
+            self._enabled[location] = True
+        pointer = handle, size, gtype, stride, offset
+        if self._pointers.get(location) != pointer:
+            # Make offset a pointer, or it will be interpreted as a small array
+            gl.glVertexAttribPointer(location, size, gtype, gl.GL_FALSE,
+                                     stride, ctypes.c_void_p(offset))
+            self._pointers[location] = pointer
+
+
+    def disable(self, location):
+        """ Disable the array of location (generic attribute value is used) """
+
+        self._check()
+        if self._enabled.get(location, True):
+            gl.glDisableVertexAttribArray(location)
+            self._enabled[location] = False
+
+
+    def divisor(self, location, divisor):
+        """ Set the instance divisor of location (0 is the GL default) """
+
+        self._check()
+        if self._divisors.get(location, 0) != divisor:
+            gl.glVertexAttribDivisor(location, divisor)
+            self._divisors[location] = divisor
+
+
+
+textures = TextureState()
+attributes = AttributeState()
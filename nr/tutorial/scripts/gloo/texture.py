@@ -4,11 +4,12 @@
 # Distributed under the terms of the new BSD License.
 # -----------------------------------------------------------------------------
 import numpy as np
-import OpenGL.GL as gl
+from backend import gl
 from operator import mul
 
-from debug import log
+from debug import log, count, timer
 from globject import GLObject
+from state import textures
 
 
 
@@ -111,6 +112,7 @@ class Texture(GLObject):
         elif dtype is not None:
             if shape:
                 self._need_resize = True
+                self._need_update = True
             self._shape = shape
             self._dtype = dtype
             if self._store:
@@ -167,7 +169,7 @@ class Texture(GLObject):
     def wrapping(self):
         """ Texture wrapping mode """
 
-        if base is not None:
+        if self.base is not None:
             return self.base.wrapping
         return self._wrapping
 
@@ -176,7 +178,7 @@ class Texture(GLObject):
     def wrapping(self, value):
         """ Texture wrapping mode """
 
-        if base is not None:
+        if self.base is not None:
             raise ValueError("Cannot set wrapping on texture view")
 
         assert value in (gl.GL_REPEAT, gl.GL_CLAMP_TO_EDGE, gl.GL_MIRRORED_REPEAT)
@@ -188,7 +190,7 @@ class Texture(GLObject):
     def interpolation(self):
         """ Texture interpolation for minification and magnification. """
 
-        if base is not None:
+        if self.base is not None:
             return self.base.interpolation
 
         return self._interpolation
@@ -239,10 +241,11 @@ class Texture(GLObject):
         self._views = []
 
         self._pending_data = []
-        self._need_update = False
+        self._need_resize = True
+        self._need_update = True
         self._shape = shape
         if self._data is not None and self._store:
-            self._data = np.resize(self._data, self._data.shape)
+            self._data = np.resize(self._data, shape)
         else:
             self._data = None
 
@@ -447,24 +450,27 @@ class Texture(GLObject):
             else:
                 min_filter = self._interpolation
                 mag_filter = self._interpolation
-            gl.glTexParameterf(self._target, gl.GL_TEXTURE_MIN_FILTER, min_filter)
-            gl.glTexParameterf(self._target, gl.GL_TEXTURE_MAG_FILTER, mag_filter)
-
             if isinstance(self._wrapping,tuple):
                 wrap_s = self._wrapping[0]
                 wrap_t = self._wrapping[1]
             else:
                 wrap_s = self._wrapping
                 wrap_t = self._wrapping
-            gl.glTexParameterf(self._target, gl.GL_TEXTURE_WRAP_S, wrap_s)
-            gl.glTexParameterf(self._target, gl.GL_TEXTURE_WRAP_T, wrap_t)
-        self._need_parameterization = True
+
+            # Only parameters that differ from the GPU ones are sent
+            textures.parameterize(self._target, self._handle,
+                                  { gl.GL_TEXTURE_MIN_FILTER : min_filter,
+                                    gl.GL_TEXTURE_MAG_FILTER : mag_filter,
+                                    gl.GL_TEXTURE_WRAP_S : wrap_s,
+                                    gl.GL_TEXTURE_WRAP_T : wrap_t })
+        self._need_parameterization = False
 
 
     def _create(self):
         """ Create texture on GPU """
 
         log("GPU: Creating texture")
+        count('texture.create')
         self._handle = gl.glGenTextures(1)
 
 
@@ -472,14 +478,17 @@ class Texture(GLObject):
         """ Delete texture from GPU """
 
         log("GPU: Deleting texture")
+        count('texture.delete')
         gl.glDeleteTextures([self._handle])
+        textures.forget(self._handle)
 
 
     def _activate(self):
         """ Activate texture on GPU """
 
         log("GPU: Activate texture")
-        gl.glBindTexture(self.target, self._handle)
+        count('texture.activate')
+        textures.bind(self.target, self._handle)
         if self._need_parameterization:
             self._parameterize()
 
@@ -488,7 +497,7 @@ class Texture(GLObject):
         """ Deactivate texture on GPU """
 
         log("GPU: Deactivate texture")
-        gl.glBindTexture(self._target, 0)
+        textures.bind(self._target, 0)
 
 
 # --------------------------------------------------------- Texture1D class ---
@@ -561,9 +570,10 @@ class Texture1D(Texture):
     def _resize(self):
         """ Texture resize on GPU """
 
-        log("GPU: Resizing texture(%s)"% (self.width))
-        gl.glTexImage1D(self.target, 0, self._format, self.width,
-                        0, self._format, self._gtype, None)
+        log("GPU: Resizing texture(%s)", self.width)
+        with timer('texture.resize', self.width*self.dtype.itemsize*self.shape[-1]):
+            gl.glTexImage1D(self.target, 0, self._format, self.width,
+                            0, self._format, self._gtype, None)
 
 
     def _update(self):
@@ -576,7 +586,7 @@ class Texture1D(Texture):
         if self._need_resize:
             self._resize()
             self._need_resize = False
-        log("GPU: Updating texture (%d pending operation(s))" % len(self._pending_data))
+        log("GPU: Updating texture (%d pending operation(s))", len(self._pending_data))
 
         while self._pending_data:
             data, offset = self._pending_data.pop(0)
@@ -585,8 +595,9 @@ class Texture1D(Texture):
             else:
                 x = offset[0]
             width = data.shape[0]
-            gl.glTexSubImage1D(self.target, 0, x,
-                               width, self._format, self._gtype, data)
+            with timer('texture.upload', data.nbytes):
+                gl.glTexSubImage1D(self.target, 0, x,
+                                   width, self._format, self._gtype, data)
 
 
 
@@ -667,9 +678,11 @@ class Texture2D(Texture):
     def _resize(self):
         """ Texture resize on GPU """
 
-        log("GPU: Resizing texture(%sx%s)"% (self.width,self.height))
-        gl.glTexImage2D(self.target, 0, self._format, self.width, self.height,
-                        0, self._format, self._gtype, None)
+        log("GPU: Resizing texture(%sx%s)", self.width, self.height)
+        nbytes = self.width*self.height*self.dtype.itemsize*self.shape[-1]
+        with timer('texture.resize', nbytes):
+            gl.glTexImage2D(self.target, 0, self._format, self.width, self.height,
+                            0, self._format, self._gtype, None)
 
 
     def _update(self):
@@ -682,7 +695,7 @@ class Texture2D(Texture):
         if self._need_resize:
             self._resize()
             self._need_resize = False
-        log("GPU: Updating texture (%d pending operation(s))" % len(self._pending_data))
+        log("GPU: Updating texture (%d pending operation(s))", len(self._pending_data))
 
         while self._pending_data:
             data, offset = self._pending_data.pop(0)
@@ -690,5 +703,6 @@ class Texture2D(Texture):
             if offset is not None:
                 y,x = offset[0], offset[1]
             width, height = data.shape[1],data.shape[0]
-            gl.glTexSubImage2D(self.target, 0, x, y,
-                               width, height, self._format, self._gtype, data)
+            with timer('texture.upload', data.nbytes):
+                gl.glTexSubImage2D(self.target, 0, x, y,
+                                   width, height, self._format, self._gtype, data)
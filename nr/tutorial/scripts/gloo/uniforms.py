@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+Uniforms shared by several programs.
+
+A UniformGroup holds values (typically view and projection matrices) shared by
+all the programs attached to it. A value is set once on the group and is
+propagated lazily: when a program is activated, only the uniforms it declares
+and whose value changed since its last activation are set (and uploaded).
+Setting a value equal to the current one does not make any program stale, the
+glUniform calls that were then avoided are counted as 'uniform.saved' (see
+debug).
+
+Example::
+
+    group = UniformGroup([program1, program2])
+    group['u_projection'] = projection  # on resize
+    group['u_view'] = view              # on scroll
+    program1.draw(gl.GL_TRIANGLES, indices)
+"""
+import numpy as np
+
+from debug import count
+from texture import Texture1D, Texture2D
+
+
+
+# ------------------------------------------------------ UniformGroup class ---
+class UniformGroup(object):
+    """ Uniform values shared by several programs """
+
+    def __init__(self, programs=[]):
+        """
+        Initialize the group
+
+        Parameters
+        ----------
+
+        programs : list of Program
+            Programs to attach to the group
+        """
+
+        # Current values, version (changes of value) and stamp (sets) of names
+        self._values = {}
+        self._versions = {}
+        self._stamps = {}
+
+        # (version, stamp) of each name as last seen by each program
+        self._programs = {}
+        self._saved = 0
+        for program in programs:
+            self.attach(program)
+
+
+    @property
+    def programs(self):
+        """ Programs attached to the group """
+
+        return list(self._programs.keys())
+
+
+    @property
+    def saved(self):
+        """ Number of glUniform calls avoided because a value did not change """
+
+        return self._saved
+
+
+    def attach(self, program):
+        """ Attach a program (group values are set at its next activation) """
+
+        if program not in self._programs:
+            self._programs[program] = {}
+            program._groups.append(self)
+
+
+    def detach(self, program):
+        """ Detach a program (it keeps its current values) """
+
+        if program in self._programs:
+            del self._programs[program]
+            program._groups.remove(self)
+
+
+    def _reset(self, program):
+        """ Make all values stale for program (its uniforms were rebuilt) """
+
+        self._programs[program] = {}
+
+
+    def __getitem__(self, name):
+        return self._values[name]
+
+
+    def __setitem__(self, name, data):
+        """ Set a value (deferred operation) """
+
+        if not isinstance(data, (Texture1D, Texture2D)):
+            data = np.array(data, dtype=np.float32)
+        self._stamps[name] = self._stamps.get(name, 0) + 1
+        if name in self._values and self._equal(self._values[name], data):
+            return
+        self._values[name] = data
+        self._versions[name] = self._versions.get(name, 0) + 1
+
+
+    def _equal(self, value, data):
+        """ Whether two values are the same """
+
+        if isinstance(value, np.ndarray) and isinstance(data, np.ndarray):
+            return value.shape == data.shape and np.array_equal(value, data)
+        return value is data
+
+
+    def _propagate(self, program):
+        """ Set the stale values of a program (called at program activation) """
+
+        seen = self._programs[program]
+        for name, value in self._values.items():
+            uniform = program._uniforms.get(name)
+            if uniform is None or not uniform.active:
+                continue
+            version, stamp = seen.get(name, (0, 0))
+            if stamp == self._stamps[name]:
+                continue
+            if version != self._versions[name]:
+                uniform.set_data(value)
+            else:
+                # Value has been set again but is unchanged
+                count('uniform.saved')
+                self._saved += 1
+            seen[name] = self._versions[name], self._stamps[name]
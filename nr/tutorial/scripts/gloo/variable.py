@@ -3,14 +3,14 @@
 # Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
 # Distributed under the terms of the new BSD License.
 # -----------------------------------------------------------------------------
-import ctypes
 import numpy as np
-import OpenGL.GL as gl
+from backend import gl
 
-from debug import log
+from debug import log, count
 from globject import GLObject
 from buffer import VertexBuffer
 from texture import Texture1D, Texture2D
+from state import textures, attributes
 
 
 # ------------------------------------------------------------- gl_typeinfo ---
@@ -126,17 +126,17 @@ class Uniform(Variable):
     """ A Uniform represents a program uniform variable. """
 
     _ufunctions = {
-        gl.GL_FLOAT:        gl.glUniform1fv,
-        gl.GL_FLOAT_VEC2:   gl.glUniform2fv,
-        gl.GL_FLOAT_VEC3:   gl.glUniform3fv,
-        gl.GL_FLOAT_VEC4:   gl.glUniform4fv,
-        gl.GL_INT:          gl.glUniform1iv,
-        gl.GL_BOOL:         gl.glUniform1iv,
-        gl.GL_FLOAT_MAT2:   gl.glUniformMatrix2fv,
-        gl.GL_FLOAT_MAT3:   gl.glUniformMatrix3fv,
-        gl.GL_FLOAT_MAT4:   gl.glUniformMatrix4fv,
-        gl.GL_SAMPLER_1D:   gl.glUniform1i,
-        gl.GL_SAMPLER_2D:   gl.glUniform1i,
+        gl.GL_FLOAT:        'glUniform1fv',
+        gl.GL_FLOAT_VEC2:   'glUniform2fv',
+        gl.GL_FLOAT_VEC3:   'glUniform3fv',
+        gl.GL_FLOAT_VEC4:   'glUniform4fv',
+        gl.GL_INT:          'glUniform1iv',
+        gl.GL_BOOL:         'glUniform1iv',
+        gl.GL_FLOAT_MAT2:   'glUniformMatrix2fv',
+        gl.GL_FLOAT_MAT3:   'glUniformMatrix3fv',
+        gl.GL_FLOAT_MAT4:   'glUniformMatrix4fv',
+        gl.GL_SAMPLER_1D:   'glUniform1i',
+        gl.GL_SAMPLER_2D:   'glUniform1i',
     }
 
 
@@ -155,31 +155,31 @@ class Uniform(Variable):
 
         # Textures need special handling
         if self._gtype == gl.GL_SAMPLER_1D:
-            if isinstance(self._data, Texture1D):
+            if isinstance(data, Texture1D):
+                self._data = data
+            elif isinstance(self._data, Texture1D):
                 self._data.set_data(data)
 
             # Automatic texture creation if required
-            elif not isinstance(data,Texture1D):
+            else:
                 data = np.array(data,copy=False)
                 if data.dtype in [np.float16, np.float32, np.float64]:
                     self._data = Texture1D(data=data.astype(np.float32))
                 else:
                     self._data = Texture1D(data=data.astype(np.uint8))
-            else:
-                self._data = data
         elif self._gtype == gl.GL_SAMPLER_2D:
-            if isinstance(self._data, Texture2D):
+            if isinstance(data, Texture2D):
+                self._data = data
+            elif isinstance(self._data, Texture2D):
                 self._data.set_data(data)
 
             # Automatic texture creation if required
-            elif not isinstance(data,Texture2D):
+            else:
                 data = np.array(data,copy=False)
                 if data.dtype in [np.float16, np.float32, np.float64]:
                     self._data = Texture2D(data=data.astype(np.float32))
                 else:
                     self._data = Texture2D(data=data.astype(np.uint8))
-            else:
-                self._data = data
         else:
             self._data[...] = np.array(data,copy=False).ravel()
 
@@ -188,16 +188,23 @@ class Uniform(Variable):
 
     def _activate(self):
         if self._gtype in (gl.GL_SAMPLER_1D, gl.GL_SAMPLER_2D):
-            if self.data is not None:
-                log("GPU: Active texture is %d" % self._unit)
-                gl.glActiveTexture(gl.GL_TEXTURE0 + self._unit)
-                self.data.activate()
+            texture = self.data
+            if texture is None:
+                return
+            # Nothing to do if the texture is ready and already bound to its unit
+            if (texture._need_create or texture._need_update or
+                texture._need_parameterization or
+                not textures.is_bound(self._unit, texture.target, texture.handle)):
+                log("GPU: Active texture is %d", self._unit)
+                textures.activate(self._unit)
+                texture.activate()
 
     def _update(self):
 
         # Check active status (mandatory)
         if not self._active:
             raise RuntimeError("Uniform variable is not active")
+        count('uniform.update')
 
         # WARNING : Uniform are supposed to keep their value between program
         #           activation/deactivation (from the GL documentation). It has
@@ -209,19 +216,19 @@ class Uniform(Variable):
         if self._gtype in (gl.GL_FLOAT_MAT2, gl.GL_FLOAT_MAT3, gl.GL_FLOAT_MAT4):
             # OpenGL ES 2.0 does not support transpose
             transpose = False
-            self._ufunction(self._handle, 1, transpose, self._data)
+            getattr(gl, self._ufunction)(self._handle, 1, transpose, self._data)
 
         # Textures (need to get texture count)
         elif self._gtype in (gl.GL_SAMPLER_1D, gl.GL_SAMPLER_2D):
             # texture = self.data
-            # log("GPU: Active texture is %d" % self._unit)
+            # log("GPU: Active texture is %d", self._unit)
             # gl.glActiveTexture(gl.GL_TEXTURE0 + self._unit)
             # gl.glBindTexture(texture.target, texture.handle)
             gl.glUniform1i(self._handle, self._unit)
 
         # Regular uniform
         else:
-            self._ufunction(self._handle, 1, self._data)
+            getattr(gl, self._ufunction)(self._handle, 1, self._data)
 
 
     def _create(self):
@@ -237,10 +244,10 @@ class Attribute(Variable):
     """ An Attribute represents a program attribute variable """
 
     _afunctions = {
-        gl.GL_FLOAT:      gl.glVertexAttrib1f,
-        gl.GL_FLOAT_VEC2: gl.glVertexAttrib2f,
-        gl.GL_FLOAT_VEC3: gl.glVertexAttrib3f,
-        gl.GL_FLOAT_VEC4: gl.glVertexAttrib4f
+        gl.GL_FLOAT:      'glVertexAttrib1f',
+        gl.GL_FLOAT_VEC2: 'glVertexAttrib2f',
+        gl.GL_FLOAT_VEC3: 'glVertexAttrib3f',
+        gl.GL_FLOAT_VEC4: 'glVertexAttrib4f'
     }
 
     def __init__(self, program, name, gtype):
@@ -254,6 +261,9 @@ class Attribute(Variable):
         # Whether this attribure is generic
         self._generic = False
 
+        # Number of instances sharing a value (0 means one value per vertex)
+        self._divisor = 0
+
 
     def set_data(self, data):
         """ Set data (deferred operation) """
@@ -271,38 +281,52 @@ class Attribute(Variable):
             self._afunction = Attribute._afunctions[self._gtype]
             return
 
+        # A new VertexBuffer replaces the current one
+        elif isinstance(data, VertexBuffer):
+            self._data = data
+
         # If we already have a VertexBuffer
         elif isinstance(self._data, VertexBuffer):
             self._data[...] = data
 
         # For array-like, we need to build a proper VertexBuffer to be able to
         # upload it later to GPU memory.
-        elif not isinstance(data, VertexBuffer):
+        else:
             name,base,count = self.dtype
             data = np.array(data,dtype=base,copy=False)
             data = data.ravel().view([self.dtype])
             # WARNING : transform data with the right type
             # data = np.array(data,copy=False)
             self._data = VertexBuffer(data)
-        else:
-            self._data = data
         self._generic = False
 
 
     def _activate(self):
-        if isinstance(self.data,VertexBuffer):
+        """ Bind the vertex buffer and point the attribute array to it """
+
+        # Array state (enabled, pointer, divisor) belongs to the location and
+        # not to the program, it is set each time but only emitted on change
+        if self._generic:
+            if self._handle >= 0:
+                attributes.disable(self._handle)
+        elif isinstance(self.data,VertexBuffer):
             self.data.activate()
+            if self._handle >= 0:
+                size, gtype, dtype = gl_typeinfo[self._gtype]
+                attributes.pointer(self._handle, self.data.handle, size, gtype,
+                                   self.data.stride, self.data.offset)
+                attributes.divisor(self._handle, self._divisor)
+
 
     def _update(self):
         """ Actual upload of data to GPU memory  """
 
-        log("GPU: Updating %s" % self.name)
+        log("GPU: Updating %s", self.name)
 
         # Generic vertex attribute (all vertices receive the same value)
         if self._generic:
             if self._handle >= 0:
-                gl.glDisableVertexAttribArray(self._handle)
-                self._afunction(self._handle, *self._data)
+                getattr(gl, self._afunction)(self._handle, *self._data)
 
         # Direct upload
         #elif isinstance(self._data, ClientVertexBuffer):
@@ -325,22 +349,6 @@ class Attribute(Variable):
             # Apply (first disable any previous VertexBuffer)
             #gl.glVertexAttribPointer(self._loc, size, gtype, False, stride, data)
 
-        # Regular vertex buffer
-        elif self._handle >= 0:
-            if self._need_update:
-                self.data.update()
-
-            # Get relevant information from gl_typeinfo
-            size, gtype, dtype = gl_typeinfo[self._gtype]
-            stride = self.data.stride
-
-            # Make offset a pointer, or it will be interpreted as a small array
-            offset = ctypes.c_void_p(self.data.offset)
-
-            gl.glEnableVertexAttribArray(self.handle)
-            gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.data.handle)
-            gl.glVertexAttribPointer(self.handle, size, gtype,  gl.GL_FALSE, stride, offset)
-
 
     def _create(self):
         """ Create attribute on GPU (get handle) """
@@ -355,3 +363,19 @@ class Attribute(Variable):
         if self._data is None:
             return 0
         return self._data.size
+
+
+    @property
+    def divisor(self):
+        """ Number of instances sharing a value (0 means one value per vertex) """
+
+        return self._divisor
+
+    @divisor.setter
+    def divisor(self, divisor):
+        """ Number of instances sharing a value (0 means one value per vertex) """
+
+        divisor = int(divisor)
+        if divisor < 0:
+            raise ValueError("Divisor must be positive or zero")
+        self._divisor = divisor
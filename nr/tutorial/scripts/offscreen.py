@@ -0,0 +1,262 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+Headless rendering for gloo programs.
+
+An OffscreenContext is a software GL context (OSMesa or EGL/llvmpipe) that
+does not need any window or GPU. It must be imported before OpenGL.GL (and
+hence before gloo) since PyOpenGL selects its platform at import time::
+
+    from offscreen import OffscreenContext, compare
+    from gloo import Program
+
+    context = OffscreenContext(256, 256)
+    image, times = context.render(display, frames=10)
+    ok, stats = compare(image, reference)
+"""
+from __future__ import print_function
+import os
+import time
+import ctypes
+import numpy as np
+
+# Must be done before any import of OpenGL.GL
+os.environ.setdefault('PYOPENGL_PLATFORM', 'osmesa')
+
+import OpenGL.GL as gl
+
+
+def _is_null(handle, null):
+    """ Whether an EGL handle (ctypes pointer or int) is null or the null handle """
+
+    value = getattr(handle, 'value', handle)
+    return not value or value == getattr(null, 'value', null)
+
+
+
+# ------------------------------------------------- OffscreenContext class ---
+class OffscreenContext(object):
+    """ Software GL context rendering into a framebuffer in CPU memory """
+
+    def __init__(self, width=256, height=256):
+        """
+        Create the context and make it current.
+
+        Parameters
+        ----------
+
+        width : int
+            Framebuffer width
+
+        height : int
+            Framebuffer height
+        """
+
+        self._width = width
+        self._height = height
+        self._platform = os.environ['PYOPENGL_PLATFORM']
+        if self._platform == 'osmesa':
+            self._create_osmesa()
+        elif self._platform == 'egl':
+            self._create_egl()
+        else:
+            raise RuntimeError("Unsupported offscreen platform '%s' "
+                               "(use osmesa or egl)" % self._platform)
+        gl.glViewport(0, 0, width, height)
+
+        # The gloo state caches belong to the previous context
+        from gloo import state
+        state.make_current(self)
+
+
+    def _create_osmesa(self):
+        """ Create an OSMesa context """
+
+        from OpenGL import osmesa, arrays
+
+        self._context = osmesa.OSMesaCreateContextExt(
+            osmesa.OSMESA_RGBA, 24, 0, 0, None)
+        if not self._context:
+            raise RuntimeError("Cannot create OSMesa context")
+        self._buffer = arrays.GLubyteArray.zeros(
+            (self._height, self._width, 4))
+        if not osmesa.OSMesaMakeCurrent(self._context, self._buffer,
+                                        gl.GL_UNSIGNED_BYTE,
+                                        self._width, self._height):
+            raise RuntimeError("Cannot make OSMesa context current")
+
+
+    def _create_egl(self):
+        """ Create an EGL pbuffer context (e.g. mesa llvmpipe) """
+
+        from OpenGL import EGL
+
+        display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        major, minor = EGL.EGLint(), EGL.EGLint()
+        if not EGL.eglInitialize(display, ctypes.pointer(major),
+                                          ctypes.pointer(minor)):
+            raise RuntimeError("Cannot initialize EGL display")
+
+        attributes = [EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+                      EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8,
+                      EGL.EGL_BLUE_SIZE, 8, EGL.EGL_ALPHA_SIZE, 8,
+                      EGL.EGL_DEPTH_SIZE, 24,
+                      EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+                      EGL.EGL_NONE]
+        attributes = (EGL.EGLint * len(attributes))(*attributes)
+        config = EGL.EGLConfig()
+        count = EGL.EGLint()
+        if not EGL.eglChooseConfig(display, attributes, ctypes.pointer(config),
+                                   1, ctypes.pointer(count)) or not count.value:
+            raise RuntimeError("No suitable EGL configuration")
+
+        size = [EGL.EGL_WIDTH, self._width, EGL.EGL_HEIGHT, self._height,
+                EGL.EGL_NONE]
+        size = (EGL.EGLint * len(size))(*size)
+        surface = EGL.eglCreatePbufferSurface(display, config, size)
+        if _is_null(surface, EGL.EGL_NO_SURFACE):
+            EGL.eglTerminate(display)
+            raise RuntimeError("Cannot create EGL pbuffer surface")
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        context = EGL.eglCreateContext(display, config,
+                                       EGL.EGL_NO_CONTEXT, None)
+        if _is_null(context, EGL.EGL_NO_CONTEXT):
+            EGL.eglDestroySurface(display, surface)
+            EGL.eglTerminate(display)
+            raise RuntimeError("Cannot create EGL context")
+        if not EGL.eglMakeCurrent(display, surface, surface, context):
+            EGL.eglDestroyContext(display, context)
+            EGL.eglDestroySurface(display, surface)
+            EGL.eglTerminate(display)
+            raise RuntimeError("Cannot make EGL context current")
+        self._display = display
+        self._surface = surface
+        self._context = context
+
+
+    @property
+    def width(self):
+        """ Framebuffer width """
+
+        return self._width
+
+
+    @property
+    def height(self):
+        """ Framebuffer height """
+
+        return self._height
+
+
+    @property
+    def platform(self):
+        """ Offscreen platform in use (osmesa or egl) """
+
+        return self._platform
+
+
+    def read_pixels(self):
+        """ Read back the framebuffer as a (height,width,4) uint8 array
+
+        Rows are flipped so that the first row is the top of the image.
+        """
+
+        gl.glFinish()
+        gl.glPixelStorei(gl.GL_PACK_ALIGNMENT, 1)
+        data = gl.glReadPixels(0, 0, self._width, self._height,
+                               gl.GL_RGBA, gl.GL_UNSIGNED_BYTE)
+        if not isinstance(data, np.ndarray):
+            data = np.frombuffer(data, dtype=np.uint8)
+        image = data.reshape(self._height, self._width, 4)
+        return image[::-1].copy()
+
+
+    def render(self, display, frames=1):
+        """ Render some frames and read back the last one
+
+        Parameters
+        ----------
+
+        display : callable
+            Function drawing one frame, it receives the frame number
+
+        frames : int
+            Number of frames to render
+
+        Returns
+        -------
+
+        (image, times) where times holds the duration (in seconds) of each
+        frame, measured up to glFinish (so that it includes GPU work).
+        """
+
+        times = []
+        for frame in range(frames):
+            start = time.time()
+            display(frame)
+            gl.glFinish()
+            times.append(time.time() - start)
+        return self.read_pixels(), np.array(times)
+
+
+    def delete(self):
+        """ Destroy the context """
+
+        if self._platform == 'osmesa':
+            from OpenGL import osmesa
+            osmesa.OSMesaDestroyContext(self._context)
+        else:
+            from OpenGL import EGL
+            EGL.eglMakeCurrent(self._display, EGL.EGL_NO_SURFACE,
+                               EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+            EGL.eglDestroySurface(self._display, self._surface)
+            EGL.eglDestroyContext(self._display, self._context)
+            EGL.eglTerminate(self._display)
+        self._context = None
+
+        from gloo import state
+        state.make_current(None)
+
+
+
+# ---------------------------------------------------------------- compare ---
+def compare(image, reference, tolerance=2, fraction=0.001):
+    """ Compare an image against a reference image
+
+    Software rasterizers differ slightly on edges, so a pixel is only
+    considered wrong when one of its channels differs by more than
+    `tolerance` and the images only differ when more than `fraction` of
+    the pixels are wrong.
+
+    Parameters
+    ----------
+
+    image, reference : np.ndarray
+        (height,width,channels) uint8 images
+
+    tolerance : int
+        Maximum absolute difference per channel
+
+    fraction : float
+        Maximum fraction of wrong pixels
+
+    Returns
+    -------
+
+    (ok, stats) where stats is a dict with the maximum difference, the
+    number and the fraction of wrong pixels.
+    """
+
+    if image.shape != reference.shape:
+        return False, { 'shape' : (image.shape, reference.shape) }
+
+    diff = np.abs(image.astype(np.int16) - reference.astype(np.int16))
+    wrong = (diff > tolerance).any(axis=-1)
+    stats = { 'max'      : int(diff.max()),
+              'wrong'    : int(wrong.sum()),
+              'fraction' : wrong.mean() }
+    return stats['fraction'] <= fraction, stats
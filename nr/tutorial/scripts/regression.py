@@ -0,0 +1,217 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+Offscreen render-and-compare regression tests for gloo.
+
+Each scene is rendered headless (see offscreen.py), the last frame is compared
+to references/<scene>.npz and the median frame time is compared to the one
+recorded with the reference. Scenes re-upload data every frame so that
+Program.draw, Buffer._update and Texture._update are all timed.
+
+Usage::
+
+    python regression.py              # check all scenes
+    python regression.py cube quad    # check some scenes
+    python regression.py --update     # (re)generate references
+
+Use PYOPENGL_PLATFORM=egl to render with EGL instead of OSMesa.
+"""
+from __future__ import print_function
+import os
+import sys
+import numpy as np
+
+# Must be imported before gloo (select PyOpenGL platform)
+from offscreen import OffscreenContext, compare
+
+import OpenGL.GL as gl
+from gloo import Program, VertexBuffer, IndexBuffer, Texture2D
+from transforms import perspective, translate, rotate
+
+
+SIZE    = 256
+FRAMES  = 50
+SLOWDOWN = 3.0
+REFERENCES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'references')
+
+
+# ------------------------------------------------------------------ quad ---
+def quad():
+    """ Hello world quad (uniform update each frame) """
+
+    vertex = """
+        uniform float scale;
+        attribute vec4 color;
+        attribute vec2 position;
+        varying vec4 v_color;
+        void main()
+        {
+            gl_Position = vec4(scale*position, 0.0, 1.0);
+            v_color = color;
+        } """
+    fragment = """
+        varying vec4 v_color;
+        void main()
+        {
+            gl_FragColor = v_color;
+        } """
+
+    program = Program(vertex, fragment, count=4)
+    program['color']    = [ (1,0,0,1), (0,1,0,1), (0,0,1,1), (1,1,0,1) ]
+    program['position'] = [ (-1,-1),   (-1,+1),   (+1,-1),   (+1,+1)   ]
+
+    def display(frame):
+        gl.glClearColor(1,1,1,1)
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+        program['scale'] = 0.5 + 0.5*frame/float(FRAMES)
+        program.draw(gl.GL_TRIANGLE_STRIP)
+    return display
+
+
+# ------------------------------------------------------------------ cube ---
+def cube():
+    """ Colored cube (vertex buffer upload each frame) """
+
+    vertex = """
+        uniform mat4 model;
+        uniform mat4 view;
+        uniform mat4 projection;
+        attribute vec3 position;
+        attribute vec4 color;
+        varying vec4 v_color;
+        void main()
+        {
+            v_color = color;
+            gl_Position = projection * view * model * vec4(position,1.0);
+        } """
+    fragment = """
+        varying vec4 v_color;
+        void main()
+        {
+            gl_FragColor = v_color;
+        } """
+
+    V = np.zeros(8, [("position", np.float32, 3),
+                     ("color",    np.float32, 4)])
+    V["position"] = [[ 1, 1, 1], [-1, 1, 1], [-1,-1, 1], [ 1,-1, 1],
+                     [ 1,-1,-1], [ 1, 1,-1], [-1, 1,-1], [-1,-1,-1]]
+    V["color"]    = [[0, 1, 1, 1], [0, 0, 1, 1], [0, 0, 0, 1], [0, 1, 0, 1],
+                     [1, 1, 0, 1], [1, 1, 1, 1], [1, 0, 1, 1], [1, 0, 0, 1]]
+    vertices = VertexBuffer(V)
+    I = [0,1,2, 0,2,3,  0,3,4, 0,4,5,  0,5,6, 0,6,1,
+         1,6,7, 1,7,2,  7,4,3, 7,3,2,  4,7,6, 4,6,5]
+    indices = IndexBuffer(I)
+
+    program = Program(vertex, fragment)
+    program.bind(vertices)
+    view = np.eye(4,dtype=np.float32)
+    translate(view, 0,0,-5)
+    program['view'] = view
+    program['projection'] = perspective(45.0, 1.0, 2.0, 10.0)
+
+    def display(frame):
+        gl.glClearColor(1,1,1,1)
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
+        model = np.eye(4, dtype=np.float32)
+        rotate(model, frame, 0,0,1)
+        rotate(model, frame, 0,1,0)
+        program['model'] = model
+        vertices[...] = V
+        program.draw(gl.GL_TRIANGLES, indices)
+    return display
+
+
+# --------------------------------------------------------------- texture ---
+def texture():
+    """ Textured quad (texture upload each frame, as in bandwidth.py) """
+
+    vertex = """
+        attribute vec2 position;
+        attribute vec2 texcoord;
+        varying vec2 v_texcoord;
+        void main()
+        {
+            v_texcoord = texcoord;
+            gl_Position = vec4(position, 0.0, 1.0);
+        } """
+    fragment = """
+        uniform sampler2D texture;
+        varying vec2 v_texcoord;
+        void main()
+        {
+            gl_FragColor = vec4(texture2D(texture, v_texcoord).rgb, 1.0);
+        } """
+
+    # Deterministic data so that the last frame can be compared
+    data = np.random.RandomState(0).rand(2, 64, 64, 3).astype(np.float32)
+
+    program = Program(vertex, fragment, count=4)
+    program['position'] = [ (-1,-1), (-1,+1), (+1,-1), (+1,+1) ]
+    program['texcoord'] = [ ( 0, 1), ( 0, 0), ( 1, 1), ( 1, 0) ]
+    program['texture'] = Texture2D(data=data[0])
+
+    def display(frame):
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+        program['texture'] = data[frame % 2]
+        program.draw(gl.GL_TRIANGLE_STRIP)
+    return display
+
+
+scenes = { 'quad' : quad, 'cube' : cube, 'texture' : texture }
+
+
+
+# ------------------------------------------------------------------ check ---
+def check(context, name, update=False):
+    """ Render a scene and compare it to its reference (or update it) """
+
+    gl.glEnable(gl.GL_DEPTH_TEST)
+    image, times = context.render(scenes[name](), frames=FRAMES)
+    gl.glDisable(gl.GL_DEPTH_TEST)
+
+    # First frame includes program link and buffer creation
+    first, median = times[0], np.median(times[1:])
+    print("%-8s first frame %7.2f ms, median frame %7.2f ms" % (
+          name, 1000*first, 1000*median), end='')
+
+    filename = os.path.join(REFERENCES, name + '.npz')
+    if update:
+        if not os.path.exists(REFERENCES):
+            os.makedirs(REFERENCES)
+        np.savez(filename, image=image, median=median)
+        print(" -> reference updated")
+        return True
+
+    if not os.path.exists(filename):
+        print(" -> no reference (run with --update)")
+        return False
+    reference = np.load(filename)
+
+    ok, stats = compare(image, reference['image'])
+    if not ok:
+        print(" -> image differs: %s" % stats)
+        return False
+    if median > SLOWDOWN*float(reference['median']):
+        print(" -> too slow (reference median is %.2f ms)" % (
+              1000*float(reference['median'])))
+        return False
+    print(" -> ok")
+    return True
+
+
+if __name__ == '__main__':
+    update = '--update' in sys.argv
+    names = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    names = names or sorted(scenes.keys())
+
+    context = OffscreenContext(SIZE, SIZE)
+    print("Rendering with %s (%s)" % (gl.glGetString(gl.GL_RENDERER),
+                                      context.platform))
+    results = [check(context, name, update) for name in names]
+    context.delete()
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,386 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nicolas P. Rougier. All rights reserved.
+# Distributed under the terms of the new BSD License.
+# -----------------------------------------------------------------------------
+"""
+GL throughput regression tests for gloo.
+
+Scenes are drawn through a RecordingBackend (on top of a NullBackend, so no GL
+is needed at all) and the number of GL calls and uploaded bytes of each frame
+are checked against a budget.
+
+Usage::
+
+    python throughput.py            # check all scenes
+    python throughput.py -v cube    # check cube and show calls per frame
+"""
+from __future__ import print_function
+import sys
+import numpy as np
+
+from gloo import backend
+from gloo.backend import gl
+from gloo import Program, VertexBuffer, IndexBuffer, VertexLayout
+from gloo import Texture2D, TextureAtlas, LayerCache, UniformGroup
+
+
+FRAMES = 10
+
+# Maximum number of GL calls and uploaded bytes, for the first frame (object
+# creation) and for the following ones.
+budgets = {
+    'cube' : { 'first' : (64, 1024), 'next' : (8, 0) },
+    'quad' : { 'first' : (64, 65536), 'next' : (6, 0) },
+    'atlas' : { 'first' : (64, 65536), 'next' : (7, 1296) },
+    'particles' : { 'first' : (64, 65536), 'next' : (8, 12000) },
+    'layers' : { 'first' : (256, 65536), 'next' : (10, 0) },
+    'instances' : { 'first' : (64, 327680), 'next' : (9, 0) },
+    'window' : { 'first' : (64, 1048576), 'next' : (5, 0) },
+    'shared' : { 'first' : (128, 1024), 'next' : (24, 0) },
+}
+
+
+# ------------------------------------------------------------------ cube ---
+def cube():
+    """ Colored cube, nothing changes between frames """
+
+    vertex = """
+        uniform mat4 model;
+        uniform mat4 view;
+        uniform mat4 projection;
+        attribute vec3 position;
+        attribute vec4 color;
+        varying vec4 v_color;
+        void main()
+        {
+            v_color = color;
+            gl_Position = projection * view * model * vec4(position,1.0);
+        } """
+    fragment = """
+        varying vec4 v_color;
+        void main()
+        {
+            gl_FragColor = v_color;
+        } """
+
+    V = np.zeros(8, [("position", np.float32, 3),
+                     ("color",    np.float32, 4)])
+    V["position"] = [[ 1, 1, 1], [-1, 1, 1], [-1,-1, 1], [ 1,-1, 1],
+                     [ 1,-1,-1], [ 1, 1,-1], [-1, 1,-1], [-1,-1,-1]]
+    V["color"]    = [[0, 1, 1, 1], [0, 0, 1, 1], [0, 0, 0, 1], [0, 1, 0, 1],
+                     [1, 1, 0, 1], [1, 1, 1, 1], [1, 0, 1, 1], [1, 0, 0, 1]]
+    vertices = VertexBuffer(V)
+    I = [0,1,2, 0,2,3,  0,3,4, 0,4,5,  0,5,6, 0,6,1,
+         1,6,7, 1,7,2,  7,4,3, 7,3,2,  4,7,6, 4,6,5]
+    indices = IndexBuffer(I)
+
+    program = Program(vertex, fragment)
+    program.bind(vertices)
+    program['model'] = np.eye(4,dtype=np.float32)
+    program['view'] = np.eye(4,dtype=np.float32)
+    program['projection'] = np.eye(4,dtype=np.float32)
+
+    def display(frame):
+        program.draw(gl.GL_TRIANGLES, indices)
+    return display
+
+
+# ------------------------------------------------------------------ quad ---
+def quad():
+    """ Quad with two textures, nothing changes between frames """
+
+    vertex = """
+        attribute vec2 position;
+        attribute vec2 texcoord;
+        varying vec2 v_texcoord;
+        void main()
+        {
+            v_texcoord = texcoord;
+            gl_Position = vec4(position, 0.0, 1.0);
+        } """
+    fragment = """
+        uniform sampler2D texture;
+        uniform sampler2D mask;
+        varying vec2 v_texcoord;
+        void main()
+        {
+            vec4 color = texture2D(texture, v_texcoord);
+            gl_FragColor = color * texture2D(mask, v_texcoord).r;
+        } """
+
+    data = np.random.RandomState(0).rand(64, 64, 3).astype(np.float32)
+    program = Program(vertex, fragment, count=4)
+    program['position'] = [ (-1,-1), (-1,+1), (+1,-1), (+1,+1) ]
+    program['texcoord'] = [ ( 0, 1), ( 0, 0), ( 1, 1), ( 1, 0) ]
+    program['texture'] = Texture2D(data=data)
+    program['mask'] = Texture2D(data=np.ones((64, 64), np.uint8))
+
+    def display(frame):
+        program.draw(gl.GL_TRIANGLE_STRIP)
+    return display
+
+
+# ----------------------------------------------------------------- atlas ---
+def atlas():
+    """ Quad sampling an atlas, a 16x16 image is packed at each frame """
+
+    vertex = """
+        attribute vec2 position;
+        attribute vec2 texcoord;
+        varying vec2 v_texcoord;
+        void main()
+        {
+            v_texcoord = texcoord;
+            gl_Position = vec4(position, 0.0, 1.0);
+        } """
+    fragment = """
+        uniform sampler2D atlas;
+        varying vec2 v_texcoord;
+        void main()
+        {
+            gl_FragColor = texture2D(atlas, v_texcoord);
+        } """
+
+    # Only the padded image (18x18x4 bytes) is uploaded, not the atlas
+    images = TextureAtlas((256,256,4), np.uint8)
+    program = Program(vertex, fragment, count=4)
+    program['position'] = [ (-1,-1), (-1,+1), (+1,-1), (+1,+1) ]
+    program['texcoord'] = [ ( 0, 1), ( 0, 0), ( 1, 1), ( 1, 0) ]
+    program['atlas'] = images
+
+    def display(frame):
+        images.insert(np.ones((16,16,4), np.uint8) * frame)
+        program.draw(gl.GL_TRIANGLE_STRIP)
+    return display
+
+
+# ------------------------------------------------------------- particles ---
+def particles():
+    """ Particles moving every frame, colors and radii are static """
+
+    vertex = """
+        attribute vec3 position;
+        attribute vec4 color;
+        attribute float radius;
+        varying vec4 v_color;
+        void main()
+        {
+            v_color = color;
+            gl_Position = vec4(position, 1.0);
+            gl_PointSize = radius;
+        } """
+    fragment = """
+        varying vec4 v_color;
+        void main()
+        {
+            gl_FragColor = v_color;
+        } """
+
+    # Only positions (12 bytes out of 32 per particle) are uploaded per frame
+    n = 1000
+    V = np.zeros(n, [("position", np.float32, 3),
+                     ("color",    np.float32, 4),
+                     ("radius",   np.float32)])
+    V["color"] = 1
+    V["radius"] = 5
+    layout = VertexLayout(V, {'position' : 'stream'})
+    program = Program(vertex, fragment)
+    program.bind(layout)
+    random = np.random.RandomState(0)
+
+    def display(frame):
+        if frame > 0:
+            program['position'] = random.rand(n, 3).astype(np.float32)
+        program.draw(gl.GL_POINTS)
+    return display
+
+
+# ---------------------------------------------------------------- layers ---
+def layers():
+    """ Two static layers (cube and quad) composited, nothing changes """
+
+    cache = LayerCache((256,256))
+    draw_cube, draw_quad = cube(), quad()
+    cache.add('cube', lambda: draw_cube(0))
+    cache.add('quad', lambda: draw_quad(0))
+
+    def display(frame):
+        cache.draw()
+    return display
+
+
+# ------------------------------------------------------------- instances ---
+def instances():
+    """ 10000 cubes drawn with a single instanced call, nothing changes """
+
+    vertex = """
+        attribute vec3 position;
+        attribute vec3 offset;
+        attribute vec4 color;
+        varying vec4 v_color;
+        void main()
+        {
+            v_color = color;
+            gl_Position = vec4(0.01*position + offset, 1.0);
+        } """
+    fragment = """
+        varying vec4 v_color;
+        void main()
+        {
+            gl_FragColor = v_color;
+        } """
+
+    # Cube mesh (8 vertices, 36 indices) and 10000 (offset,color) instances:
+    # 280 KB uploaded instead of 3.2 MB of vertices (and 1.4 MB of indices)
+    # with the geometry duplicated for each cube
+    n = 10000
+    V = np.zeros(8, [("position", np.float32, 3)])
+    V["position"] = [[ 1, 1, 1], [-1, 1, 1], [-1,-1, 1], [ 1,-1, 1],
+                     [ 1,-1,-1], [ 1, 1,-1], [-1, 1,-1], [-1,-1,-1]]
+    I = np.array([0,1,2, 0,2,3,  0,3,4, 0,4,5,  0,5,6, 0,6,1,
+                  1,6,7, 1,7,2,  7,4,3, 7,3,2,  4,7,6, 4,6,5], dtype=np.uint32)
+    random = np.random.RandomState(0)
+    D = np.zeros(n, [("offset", np.float32, 3),
+                     ("color",  np.float32, 4)])
+    D["offset"] = random.uniform(-1, 1, (n, 3))
+    D["color"] = random.uniform(0, 1, (n, 4))
+
+    program = Program(vertex, fragment)
+    program.bind(VertexBuffer(V))
+    program.bind(VertexBuffer(D), divisor=1)
+    indices = IndexBuffer(I)
+
+    def display(frame):
+        program.draw(gl.GL_TRIANGLES, indices, instances=n)
+    return display
+
+
+# ---------------------------------------------------------------- window ---
+def window():
+    """ Two long signals scrolled through a window, buffers never change """
+
+    vertex = """
+        attribute vec2 position;
+        void main()
+        {
+            gl_Position = vec4(position, 0.0, 1.0);
+        } """
+    fragment = """
+        void main()
+        {
+            gl_FragColor = vec4(0.0, 0.0, 0.0, 1.0);
+        } """
+
+    # Both signals (separate line strips) are in the same buffer, only the
+    # visible samples are drawn (nothing is uploaded after the first frame)
+    n, visible = 65536, 1024
+    V = np.zeros(2*n, [("position", np.float32, 2)])
+    V["position"][:,0] = np.tile(np.linspace(-1, 1, n), 2)
+    V["position"][:,1] = np.random.RandomState(0).uniform(-1, 1, 2*n)
+    program = Program(vertex, fragment)
+    program.bind(VertexBuffer(V))
+
+    def display(frame):
+        start = (frame * 128) % (n - visible)
+        program.draw(gl.GL_LINE_STRIP, ranges=[(start, visible),
+                                               (n + start, visible)])
+    return display
+
+
+# ---------------------------------------------------------------- shared ---
+def shared():
+    """ Three cubes sharing view and projection, scrolled every 4 frames """
+
+    vertex = """
+        uniform mat4 model;
+        uniform mat4 view;
+        uniform mat4 projection;
+        attribute vec3 position;
+        void main()
+        {
+            gl_Position = projection * view * model * vec4(position,1.0);
+        } """
+    fragment = """
+        void main()
+        {
+            gl_FragColor = vec4(0.0, 0.0, 0.0, 1.0);
+        } """
+
+    V = np.zeros(8, [("position", np.float32, 3)])
+    V["position"] = [[ 1, 1, 1], [-1, 1, 1], [-1,-1, 1], [ 1,-1, 1],
+                     [ 1,-1,-1], [ 1, 1,-1], [-1, 1,-1], [-1,-1,-1]]
+    vertices = VertexBuffer(V)
+    indices = IndexBuffer([0,1,2, 0,2,3,  0,3,4, 0,4,5,  0,5,6, 0,6,1,
+                           1,6,7, 1,7,2,  7,4,3, 7,3,2,  4,7,6, 4,6,5])
+
+    group = UniformGroup()
+    programs = []
+    for i in range(3):
+        program = Program(vertex, fragment)
+        program.bind(vertices)
+        model = np.eye(4, dtype=np.float32)
+        model[3,0] = i - 1
+        program['model'] = model
+        group.attach(program)
+        programs.append(program)
+
+    # view and projection are set every frame (as in an on_draw handler):
+    # only actual changes reach the programs, i.e. 3 glUniform calls every 4
+    # frames instead of 6 every frame
+    projection = np.eye(4, dtype=np.float32)
+    def display(frame):
+        view = np.eye(4, dtype=np.float32)
+        view[3,0] = 0.1 * (frame // 4)
+        group['view'] = view
+        group['projection'] = projection
+        for program in programs:
+            program.draw(gl.GL_TRIANGLES, indices)
+    return display
+
+
+scenes = { 'cube' : cube, 'quad' : quad, 'atlas' : atlas,
+           'particles' : particles, 'layers' : layers,
+           'instances' : instances, 'window' : window, 'shared' : shared }
+
+
+
+# ------------------------------------------------------------------ check ---
+def check(name, verbose=False):
+    """ Record some frames of a scene and check them against its budget """
+
+    recorder = backend.RecordingBackend(backend.NullBackend())
+    previous = backend.use(recorder)
+    try:
+        display = scenes[name]()
+        for frame in range(FRAMES):
+            display(frame)
+            recorder.next_frame()
+    finally:
+        backend.use(previous)
+
+    ok = True
+    for i, frame in enumerate(recorder.frames):
+        calls, nbytes = budgets[name]['first' if i == 0 else 'next']
+        status = 'ok'
+        if frame.count > calls or frame.uploaded > nbytes:
+            status = 'over budget (%d calls, %d bytes)' % (calls, nbytes)
+            ok = False
+        if verbose or status != 'ok':
+            print("%-8s frame %2d: %4d calls, %8d bytes uploaded -> %s" % (
+                  name, i, frame.count, frame.uploaded, status))
+            if verbose:
+                for entry, count in sorted(frame.counts.items()):
+                    print("    %-28s %d" % (entry, count))
+    if ok:
+        print("%-8s ok" % name)
+    return ok
+
+
+if __name__ == '__main__':
+    verbose = '-v' in sys.argv
+    names = [arg for arg in sys.argv[1:] if not arg.startswith('-')]
+    names = names or sorted(scenes.keys())
+    results = [check(name, verbose) for name in names]
+    sys.exit(0 if all(results) else 1)